@@ -0,0 +1,22 @@
+"""Benchmarks e verificações de carga (fora do pacote da aplicação).
+
+Cada módulo roda sozinho, a partir da raiz do repositório:
+    python -m benchmarks.<modulo>
+"""
+
+import os
+import tempfile
+
+# Administrador criado no banco temporário, para os benchmarks que passam pelas rotas
+ADMIN_EMAIL = 'admin@benchmark.local'
+ADMIN_SENHA = 'benchmark-admin'
+
+
+def banco_temporario(nome):
+    """Sem DATABASE_URL no ambiente, aponta o app para um SQLite novo (criado na partida, com administrador)"""
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/{nome}.db"
+        os.environ['INICIALIZAR_BANCO'] = 'true'
+        os.environ.setdefault('ADMIN_EMAIL', ADMIN_EMAIL)
+        os.environ.setdefault('ADMIN_SENHA', ADMIN_SENHA)
+    os.environ['AGENDADOR_ATIVO'] = 'false'
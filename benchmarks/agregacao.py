@@ -0,0 +1,70 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import banco_temporario
+from src.models.pesquisa import DIMENSOES
+from src.utils.agregacao import agregar, colunas_de_pesquisas, np
+
+
+def kernel():
+    """Só o núcleo: Python puro e NumPy sobre colunas já montadas (10 mil a 1 milhão de pesquisas)"""
+    aleatorio = random.Random(42)
+    base = datetime(2024, 1, 1)
+
+    for tamanho in (10_000, 100_000, 1_000_000):
+        colunas = {d: [aleatorio.randint(1, 10) for _ in range(tamanho)] for d in DIMENSOES}
+        colunas['data_criacao'] = [base + timedelta(seconds=i) for i in range(tamanho)]
+
+        modos = [('python', False)] + ([('numpy', True)] if np is not None else [])
+        for nome, usar_numpy in modos:
+            inicio = time.perf_counter()
+            agregar(colunas, usar_numpy=usar_numpy)
+            duracao = time.perf_counter() - inicio
+            print(f"kernel   | {tamanho:>9} pesquisas | {nome:<6} | {duracao * 1000:8.1f} ms | "
+                  f"{tamanho / duracao:,.0f} pesquisas/s")
+
+
+def caminho_completo(tamanhos=(1_000, 10_000, 100_000)):
+    """O que um relatório paga de fato: consulta das pesquisas, colunas e núcleo.
+
+    Usa o DATABASE_URL do ambiente (ou um SQLite temporário).
+    """
+    banco_temporario('agregacao')
+
+    # O app lê o ambiente ao ser importado
+    from src.main import app
+    from src.database import db
+    from src.models.pesquisa import Pesquisa
+
+    aleatorio = random.Random(42)
+    base = datetime.now() - timedelta(days=365)
+    with app.app_context():
+        for tamanho in tamanhos:
+            linha = f'BENCH-{tamanho}'
+            if Pesquisa.query.filter_by(linha_numero=linha).count() < tamanho:
+                db.session.execute(Pesquisa.__table__.insert(), [{
+                    'linha_numero': linha,
+                    **{d: aleatorio.randint(1, 10) for d in DIMENSOES},
+                    'data_criacao': base + timedelta(seconds=i * 30)
+                } for i in range(tamanho)])
+                db.session.commit()
+
+            modos = [('python', False)] + ([('numpy', True)] if np is not None else [])
+            for nome, usar_numpy in modos:
+                db.session.expunge_all()
+                inicio = time.perf_counter()
+                pesquisas = Pesquisa.query.filter_by(linha_numero=linha).order_by(Pesquisa.data_criacao.desc()).all()
+                consultado = time.perf_counter()
+                colunas = colunas_de_pesquisas(pesquisas)
+                montado = time.perf_counter()
+                agregar(colunas, usar_numpy=usar_numpy)
+                fim = time.perf_counter()
+                print(f"completo | {tamanho:>9} pesquisas | {nome:<6} | {(fim - inicio) * 1000:8.1f} ms "
+                      f"(consulta {(consultado - inicio) * 1000:.1f} | colunas {(montado - consultado) * 1000:.1f} | "
+                      f"kernel {(fim - montado) * 1000:.1f}) | {tamanho / (fim - inicio):,.0f} pesquisas/s")
+
+
+if __name__ == '__main__':
+    kernel()
+    caminho_completo()
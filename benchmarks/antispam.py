@@ -0,0 +1,67 @@
+import time
+
+from src.utils.antispam import DetectorSpam, REPETICOES_PADRAO
+
+
+def conferir_casos():
+    """Passageiros atrás do mesmo CGNAT, nova tentativa após falha e rajada de um robô"""
+    relogio = [0.0]
+    detector = DetectorSpam(relogio=lambda: relogio[0])
+    ok = True
+
+    # Mesma impressão (IP da operadora + User-Agent reduzido), passageiros diferentes na mesma linha
+    motivos = []
+    for i in range(REPETICOES_PADRAO):
+        relogio[0] += 30
+        motivos.append(detector.verificar('cgnat', '100', f'passageiro {i}'))
+        detector.registrar('cgnat', '100', f'passageiro {i}')
+    ok &= motivos == [None] * REPETICOES_PADRAO
+    print(f"{'✅' if motivos == [None] * REPETICOES_PADRAO else '❌'} {REPETICOES_PADRAO} passageiros com a "
+          f"mesma impressão: {sum(m is not None for m in motivos)} em quarentena")
+
+    # O envio falhou (500/rollback) e não foi registrado: a nova tentativa não é repetição
+    texto = 'ar condicionado quebrado há uma semana'
+    primeira = detector.verificar('cliente', '200', texto)
+    tentativa = detector.verificar('cliente', '200', texto)
+    ok &= primeira is None and tentativa is None
+    print(f"{'✅' if tentativa is None else '❌'} nova tentativa após falha: {tentativa}")
+
+    # Depois de gravado, o mesmo texto na mesma linha é repetição; a rajada além do limite também
+    detector.registrar('cliente', '200', texto)
+    copiado = detector.verificar('outro', '200', texto)
+    for i in range(REPETICOES_PADRAO):
+        detector.registrar('robo', '300', f'envio {i}')
+    rajada = detector.verificar('robo', '300', 'mais um')
+    ok &= copiado == 'conteudo_repetido' and rajada == 'cliente_repetido'
+    print(f"{'✅' if copiado == 'conteudo_repetido' else '❌'} texto repetido: {copiado} | "
+          f"{'✅' if rajada == 'cliente_repetido' else '❌'} envio {REPETICOES_PADRAO + 1} do robô: {rajada}")
+
+    # Fora da janela a contagem zera
+    relogio[0] += detector.janela_minutos * 60 + 1
+    depois = detector.verificar('robo', '300', 'mais um')
+    ok &= depois is None
+    print(f"{'✅' if depois is None else '❌'} robô depois da janela: {depois}")
+    return ok
+
+
+def executar(quantidade=200000, por_minuto=10000):
+    """Custo por verificação, falsos positivos e memória com a janela padrão (relógio simulado)"""
+    relogio = [0.0]
+    detector = DetectorSpam(relogio=lambda: relogio[0])
+    inicio = time.perf_counter()
+    marcados = 0
+    for i in range(quantidade):
+        relogio[0] = i * 60 / por_minuto
+        argumentos = (f'cliente{i}', str(i % 500), f'observação número {i} sobre o ônibus lotado')
+        if detector.verificar(*argumentos):
+            marcados += 1
+        detector.registrar(*argumentos)
+    duracao = time.perf_counter() - inicio
+    print(f"{quantidade} envios distintos ({por_minuto}/min) em {duracao * 1000:.0f} ms "
+          f"({quantidade / duracao:,.0f}/s) | {marcados} falsos positivos ({marcados / quantidade:.3%}) | "
+          f"memória {(detector.clientes.memoria_bytes() + detector.conteudos.memoria_bytes()) / 1024:.0f} KiB")
+    return conferir_casos()
+
+
+if __name__ == '__main__':
+    executar()
@@ -0,0 +1,83 @@
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import ADMIN_EMAIL, ADMIN_SENHA, banco_temporario
+from src.models.pesquisa import DIMENSOES
+from src.utils.comparativo import estatisticas_linhas, np
+
+
+def kernel(linhas=1000):
+    """Só o núcleo: estatísticas de 1.000 linhas x 5 dimensões a partir de histogramas prontos"""
+    aleatorio = random.Random(42)
+    histogramas = [[[aleatorio.randint(0, 500) for _ in range(10)] for _ in DIMENSOES] for _ in range(linhas)]
+    # Todas as dimensões de uma linha têm o mesmo total de respostas
+    for por_dimensao in histogramas:
+        total = sum(por_dimensao[0])
+        for h in por_dimensao[1:]:
+            h[-1] += total - sum(h)
+            if h[-1] < 0:
+                h[:] = por_dimensao[0]
+
+    modos = [('python', False)] + ([('numpy', True)] if np is not None else [])
+    for nome, usar_numpy in modos:
+        inicio = time.perf_counter()
+        estatisticas_linhas(histogramas, usar_numpy=usar_numpy)
+        duracao = time.perf_counter() - inicio
+        print(f"kernel   | {linhas} linhas x {len(DIMENSOES)} dimensões | {nome:<6} | {duracao * 1000:7.2f} ms")
+
+
+def caminho_completo(linhas=1000, dias=60, por_dia=2, repeticoes=5):
+    """O que a rota paga: leitura da consolidação diária (dois períodos), estatísticas e JSON.
+
+    Usa o DATABASE_URL do ambiente (ou um SQLite temporário), com o snapshot desligado.
+    """
+    banco_temporario('comparativo')
+    os.environ.setdefault('SNAPSHOT_ATIVO', 'false')
+    os.environ.setdefault('LIMITES_ATIVO', 'false')
+
+    # O app lê o ambiente ao ser importado
+    from src.main import app
+    from src.database import db
+    from src.models.pesquisa import Pesquisa
+    from src.utils.comparativo import calcular_comparativo
+    from src.utils.compactacao import compactar_pendentes
+
+    with app.app_context():
+        if not Pesquisa.query.count():
+            aleatorio = random.Random(42)
+            hoje = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+            db.session.execute(Pesquisa.__table__.insert(), [{
+                'linha_numero': f'L{linha}',
+                **{d: aleatorio.randint(1, 10) for d in DIMENSOES},
+                'data_criacao': hoje - timedelta(days=dia, minutes=vez)
+            } for linha in range(linhas) for dia in range(1, dias + 1) for vez in range(por_dia)])
+            db.session.commit()
+            compactar_pendentes()
+        total = Pesquisa.query.count()
+
+        modos = [('python', False)] + ([('numpy', True)] if np is not None else [])
+        for nome, usar_numpy in modos:
+            calcular_comparativo(usar_numpy=usar_numpy)
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                calcular_comparativo(usar_numpy=usar_numpy)
+            duracao = (time.perf_counter() - inicio) / repeticoes
+            print(f"completo | {linhas} linhas, {total} pesquisas | {nome:<6} | {duracao * 1000:7.1f} ms "
+                  f"(calcular_comparativo)")
+
+    cliente = app.test_client()
+    cliente.post('/api/auth/login', json={'email': ADMIN_EMAIL, 'senha': ADMIN_SENHA})
+    cliente.get('/api/analises/comparativo')
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        resposta = cliente.get('/api/analises/comparativo')
+    duracao = (time.perf_counter() - inicio) / repeticoes
+    print(f"rota     | GET /api/analises/comparativo | {resposta.status_code} | {duracao * 1000:7.1f} ms "
+          f"({len(resposta.data) / 1024:.0f} KiB)")
+
+
+if __name__ == '__main__':
+    kernel()
+    caminho_completo()
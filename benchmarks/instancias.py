@@ -0,0 +1,79 @@
+import os
+import tempfile
+import time
+
+from benchmarks import banco_temporario
+
+
+def _pesquisa(linha_numero, itinerario):
+    return {
+        'linha_numero': linha_numero, 'linha_itinerario': itinerario,
+        'pontualidade': 5, 'frequencia': 5, 'conforto': 5, 'atendimento': 5, 'infraestrutura': 5
+    }
+
+
+def _conferir(descricao, ok):
+    print(f"{'✅' if ok else '❌'} {descricao}")
+    return ok
+
+
+def executar():
+    """Duas instâncias do app no mesmo processo, cada uma com o seu banco, não compartilham estado.
+
+    Uma linha enviada para A não pode aparecer nas sugestões de B, e índice,
+    moderador, serviço de senhas e snapshot são objetos de cada aplicação.
+    """
+    banco_temporario('instancias')
+    os.environ['LIMITES_ATIVO'] = 'false'
+    os.environ['ANTISPAM_ATIVO'] = 'false'
+    os.environ.setdefault('SNAPSHOT_DIR', tempfile.mkdtemp())
+
+    from src.main import create_app
+    from src.utils.indice_linhas import obter_indice_linhas
+    from src.utils.moderacao import obter_moderador
+    from src.utils.senhas import obter_servico_senhas
+    from src.utils.snapshot import obter_snapshot, np
+
+    diretorio = tempfile.mkdtemp()
+    apps = [create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{diretorio}/{nome}.db',
+        'INICIALIZAR_BANCO': True
+    }) for nome in ('a', 'b')]
+    a, b = (app.test_client() for app in apps)
+
+    def sugestoes(cliente, consulta):
+        return [s['linha_numero'] for s in cliente.get(f'/api/linhas/sugestoes?q={consulta}').get_json()['sugestoes']]
+
+    # Carrega os dois índices antes do envio: o de B não pode recebê-lo incrementalmente
+    for cliente in (a, b):
+        sugestoes(cliente, '777')
+    inicio = time.perf_counter()
+    resposta = a.post('/api/pesquisas', json=_pesquisa('777', 'Praça XV - Alvorada'))
+    duracao = time.perf_counter() - inicio
+
+    ok = _conferir(f"envio para A: {resposta.status_code} em {duracao * 1000:.0f} ms", resposta.status_code == 201)
+    ok &= _conferir(f"sugestões de A para '777': {sugestoes(a, '777')}", '777' in sugestoes(a, '777'))
+    ok &= _conferir(f"sugestões de B para '777': {sugestoes(b, '777')}", not sugestoes(b, '777'))
+
+    estados = []
+    for app in apps:
+        with app.app_context():
+            estados.append((obter_indice_linhas(), obter_moderador(), obter_servico_senhas(), obter_snapshot()))
+    for nome, objeto_a, objeto_b in zip(('índice', 'moderador', 'serviço de senhas', 'snapshot'), *estados):
+        ok &= _conferir(f"{nome} próprio de cada instância", objeto_a is not objeto_b)
+    ok &= _conferir("snapshots em diretórios diferentes", estados[0][3].diretorio != estados[1][3].diretorio)
+
+    if np is not None:
+        with apps[0].app_context():
+            obter_snapshot().atualizar()
+        with apps[1].app_context():
+            dados = obter_snapshot().abrir()
+        ok &= _conferir(f"snapshot de B após atualizar o de A: {dados['meta']['total'] if dados else 0} pesquisas",
+                        not dados)
+
+    print('✅ instâncias isoladas' if ok else '❌ estado compartilhado entre instâncias')
+    return ok
+
+
+if __name__ == '__main__':
+    executar()
@@ -0,0 +1,18 @@
+import time
+
+from src.utils.limites import REGRAS, BaldesMemoria
+
+
+def executar(quantidade=100000):
+    """Consultas por segundo do bucket em memória, com 10 mil IPs distintos"""
+    baldes = BaldesMemoria()
+    regra = REGRAS['pesquisa.criar_pesquisa']
+    inicio = time.perf_counter()
+    negados = sum(1 for i in range(quantidade) if not baldes.consumir(f'ip{i % 10000}', regra)[0])
+    duracao = time.perf_counter() - inicio
+    print(f"Memória | {quantidade} consultas em {duracao * 1000:.0f} ms ({quantidade / duracao:,.0f}/s), "
+          f"{negados} negadas")
+
+
+if __name__ == '__main__':
+    executar()
@@ -0,0 +1,85 @@
+import json
+import random
+import re
+import time
+
+from src.utils.moderacao import PADROES_DADOS_PESSOAIS, Moderador
+
+# Fora de uma aplicação: um moderador com a configuração padrão
+moderador = Moderador()
+
+# Números que não são dados pessoais: horários, linhas, anos e valores não podem ser mascarados
+NEGATIVOS = [
+    'linha 2010-2015 atrasada',
+    'saídas às 1530 1600 1630 1700',
+    'paguei 1234 5678 de multa',
+    'ônibus 2345 das 0600 às 2200',
+    'frota de 2019 2020 2021',
+]
+POSITIVOS = [
+    'ligue (21) 98765-4321',
+    'whatsapp 21 98765-4321',
+    'fixo (11) 3456-7890',
+    'celular 98765-4321',
+    'meu cpf 123.456.789-09',
+    'email fulano@exemplo.com.br',
+]
+
+
+def conferir_exemplos():
+    """Exemplos fixos: os positivos são mascarados e os negativos passam intactos"""
+    ok = True
+    for texto in POSITIVOS:
+        mascarado, categorias = moderador.moderar(texto)
+        ok = ok and bool(categorias)
+        print(f"{'✅' if categorias else '❌'} mascarar   | {texto!r} -> {mascarado!r}")
+    for texto in NEGATIVOS:
+        mascarado, categorias = moderador.moderar(texto)
+        ok = ok and not categorias
+        print(f"{'❌' if categorias else '✅'} não mascarar | {texto!r} -> {mascarado!r}")
+    return ok
+
+
+def executar(quantidade=20000):
+    """Mede observações moderadas por segundo, comparando com um laço de regex por palavra"""
+    aleatorio = random.Random(42)
+    vocabulario = ('ônibus lotado atrasado motorista educado ar condicionado quebrado ponto sem cobertura '
+                   'horário nunca cumprido cobrador simpático frota velha suja limpeza demora muito').split()
+    observacoes = []
+    for i in range(quantidade):
+        palavras = [aleatorio.choice(vocabulario) for _ in range(aleatorio.randint(5, 40))]
+        if i % 10 == 0:
+            palavras.append('porra')
+        if i % 25 == 0:
+            palavras.append('ligue (21) 98765-4321')
+        if i % 40 == 0:
+            palavras.append('cpf 123.456.789-09')
+        if i % 20 == 5:
+            palavras.append(NEGATIVOS[i % len(NEGATIVOS)])
+        observacoes.append(' '.join(palavras))
+
+    moderador.moderar('aquecimento')
+    inicio = time.perf_counter()
+    sinalizadas = sum(1 for o in observacoes if moderador.moderar(o)[1])
+    duracao = time.perf_counter() - inicio
+    esperadas = sum(1 for i in range(quantidade) if i % 10 == 0 or i % 25 == 0 or i % 40 == 0)
+    print(f"Aho–Corasick + regex | {quantidade} observações em {duracao * 1000:.0f} ms | "
+          f"{quantidade / duracao:,.0f} obs/s | {sinalizadas} sinalizadas (esperadas {esperadas})")
+
+    with open(moderador.caminho, encoding='utf-8') as f:
+        palavras = json.load(f)['palavras']
+    regexes = [re.compile(rf'\b{re.escape(p)}\b', re.IGNORECASE) for p in palavras]
+    inicio = time.perf_counter()
+    for o in observacoes:
+        for r in regexes:
+            r.search(o)
+        for p in PADROES_DADOS_PESSOAIS.values():
+            p.search(o)
+    duracao = time.perf_counter() - inicio
+    print(f"Laço de regex        | {quantidade} observações em {duracao * 1000:.0f} ms | "
+          f"{quantidade / duracao:,.0f} obs/s (só detecção, sem acentos nem máscara)")
+
+
+if __name__ == '__main__':
+    conferir_exemplos()
+    executar()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, text
+
+from src.utils.perfil_sqlite import configurar_sqlite
+
+
+def conferir_trava(espera_maxima=0.5):
+    """Trava de escrita: liberada quando outra thread devolve a conexão, e sem esperar por si mesma"""
+    caminho = os.path.join(tempfile.mkdtemp(), 'trava.db')
+    engine = configurar_sqlite(create_engine(f'sqlite:///{caminho}'))
+    trava = engine.trava_escrita
+    with engine.begin() as conexao:
+        conexao.execute(text('CREATE TABLE pesquisa (id INTEGER PRIMARY KEY, nota INTEGER)'))
+    inserir = text('INSERT INTO pesquisa (nota) VALUES (1)')
+
+    # A escreve e não termina a transação; B devolve a conexão ao pool (rollback em B)
+    conexao = engine.connect()
+    escreveu = threading.Thread(target=lambda: conexao.execute(inserir))
+    escreveu.start()
+    escreveu.join()
+    presa = trava._lock.locked()
+    devolveu = threading.Thread(target=conexao.close)
+    devolveu.start()
+    devolveu.join()
+    inicio = time.perf_counter()
+    with engine.begin() as outra:
+        outra.execute(inserir)
+    depois = time.perf_counter() - inicio
+    ok_liberada = presa and not trava._lock.locked() and depois < espera_maxima
+    print(f"{'✅' if ok_liberada else '❌'} liberada pela thread que devolveu a conexão: "
+          f"próxima escrita em {depois * 1000:.0f} ms")
+
+    # Esta thread já tem a trava por uma conexão; a segunda conexão não pode esperar por ela
+    with engine.connect() as primeira:
+        primeira.execute(inserir)
+        inicio = time.perf_counter()
+        info = {}
+        trava.adquirir(info)
+        propria = time.perf_counter() - inicio
+        primeira.rollback()
+    ok_propria = propria < espera_maxima and not info and not trava._lock.locked()
+    print(f"{'✅' if ok_propria else '❌'} mesma thread em outra conexão: {propria * 1000:.0f} ms "
+          f"(a espera seria {trava.espera_segundos:.0f} s)")
+    engine.dispose()
+    return ok_liberada and ok_propria
+
+
+def executar(segundos=5, escritores=4, leitores=4):
+    """Envios e leituras do painel por segundo, concorrentes: padrão, só WAL/PRAGMAs e perfil completo"""
+    def rodar(nome, perfil, serializar=True):
+        caminho = os.path.join(tempfile.mkdtemp(), 'benchmark.db')
+        engine = create_engine(f'sqlite:///{caminho}', pool_size=escritores + leitores)
+        if perfil:
+            configurar_sqlite(engine, serializar=serializar)
+        with engine.begin() as conexao:
+            conexao.execute(text('CREATE TABLE pesquisa (id INTEGER PRIMARY KEY, linha TEXT, nota INTEGER, '
+                                 'observacoes TEXT)'))
+            conexao.execute(text('CREATE INDEX ix_pesquisa_linha ON pesquisa (linha)'))
+            conexao.execute(text('INSERT INTO pesquisa (linha, nota, observacoes) VALUES (:l, :n, :o)'),
+                            [{'l': f'L{i % 200}', 'n': i % 10, 'o': 'ônibus lotado'} for i in range(20000)])
+
+        fim = time.monotonic() + segundos
+
+        def escrever(i):
+            feitos = erros = 0
+            while time.monotonic() < fim:
+                try:
+                    with engine.begin() as conexao:
+                        conexao.execute(text('INSERT INTO pesquisa (linha, nota, observacoes) VALUES (:l, :n, :o)'),
+                                        {'l': f'L{(feitos + i) % 200}', 'n': feitos % 10, 'o': 'atrasado'})
+                    feitos += 1
+                except Exception:
+                    erros += 1
+            return 'escrita', feitos, erros
+
+        def ler(i):
+            feitos = erros = 0
+            while time.monotonic() < fim:
+                try:
+                    with engine.connect() as conexao:
+                        conexao.execute(text('SELECT linha, COUNT(*), AVG(nota) FROM pesquisa '
+                                             'WHERE linha = :l GROUP BY linha'), {'l': f'L{(feitos + i) % 200}'}).all()
+                    feitos += 1
+                except Exception:
+                    erros += 1
+            return 'leitura', feitos, erros
+
+        with ThreadPoolExecutor(max_workers=escritores + leitores) as executor:
+            tarefas = [executor.submit(escrever, i) for i in range(escritores)]
+            tarefas += [executor.submit(ler, i) for i in range(leitores)]
+            resultados = [t.result() for t in tarefas]
+        engine.dispose()
+
+        totais = {}
+        for tipo, feitos, erros in resultados:
+            feitos_total, erros_total = totais.get(tipo, (0, 0))
+            totais[tipo] = (feitos_total + feitos, erros_total + erros)
+        (escritas, erros_escrita), (leituras, erros_leitura) = totais['escrita'], totais['leitura']
+        print(f"{nome:<23} | {escritas / segundos:7,.0f} envios/s "
+              f"({erros_escrita} erros) | {leituras / segundos:7,.0f} leituras/s ({erros_leitura} erros)")
+
+    print(f"{escritores} escritores e {leitores} leitores por {segundos}s")
+    rodar('Padrão', perfil=False)
+    # Separa o ganho dos PRAGMAs (WAL, synchronous, mmap, cache) do ganho da trava de escrita
+    rodar('WAL + PRAGMAs sem trava', perfil=True, serializar=False)
+    rodar('Perfil SQLite', perfil=True)
+    return conferir_trava()
+
+
+if __name__ == '__main__':
+    executar()
+
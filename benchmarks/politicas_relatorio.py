@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import ADMIN_EMAIL, ADMIN_SENHA, banco_temporario
+
+
+def _pesquisa(linha_numero, i):
+    return {
+        'linha_numero': linha_numero,
+        'pontualidade': 1 + i % 10, 'frequencia': 5, 'conforto': 5,
+        'atendimento': 5, 'infraestrutura': 5
+    }
+
+
+def _enviar_lote(argumentos):
+    """Processo filho: app, engine e trava de escrita próprios, como um worker do gunicorn"""
+    indices, nomes, threads = argumentos
+    from src.main import app
+
+    def enviar(i):
+        return app.test_client().post('/api/pesquisas', json=_pesquisa(nomes[i % len(nomes)], i)).status_code
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(enviar, indices))
+
+
+def conferir_politica_em_linha_existente(app, existentes=23, tamanho=5):
+    """Política definida pela API numa linha que já tem pesquisas (sem política gravada).
+
+    Os relatórios antigos (a cada 10) cobrem as primeiras pesquisas; a
+    primeira janela da nova política começa logo depois deles, sem repetir
+    nem pular nenhuma.
+    """
+    from src.database import db
+    from src.models.pesquisa import Pesquisa, ContadorLinha
+    from src.models.relatorio import Relatorio
+    from src.utils.politicas_relatorio import TAMANHO_PADRAO
+
+    linha = 'LEGADO'
+    with app.app_context():
+        pesquisas = [Pesquisa(**_pesquisa(linha, i)) for i in range(existentes)]
+        db.session.add_all(pesquisas)
+        db.session.add(ContadorLinha(linha_numero=linha, contador=existentes))
+        db.session.flush()
+        ids = [p.id for p in pesquisas]
+        cobertas = existentes - existentes % TAMANHO_PADRAO
+        for inicio in range(0, cobertas, TAMANHO_PADRAO):
+            db.session.add(Relatorio(linha, pesquisas[inicio:inicio + TAMANHO_PADRAO]))
+        db.session.commit()
+
+    cliente = app.test_client()
+    cliente.post('/api/auth/login', json={'email': ADMIN_EMAIL, 'senha': ADMIN_SENHA})
+    resposta = cliente.put(f'/api/relatorios/politicas/{linha}', json={'tipo': 'contagem', 'tamanho': tamanho})
+    ultima_coberta = (resposta.get_json().get('politica') or {}).get('ultimo_pesquisa_id')
+    novas = [cliente.post('/api/pesquisas', json=_pesquisa(linha, i)).get_json()['pesquisa']['id']
+             for i in range(tamanho - existentes % TAMANHO_PADRAO)]
+
+    with app.app_context():
+        ultimo = Relatorio.query.filter_by(linha_numero=linha).order_by(Relatorio.id.desc()).first()
+        cobertas_novo = [p['id'] for p in ultimo.get_dados_pesquisas()]
+    esperado = ids[cobertas:] + novas
+    ok = resposta.status_code == 200 and ultima_coberta == ids[cobertas - 1] and cobertas_novo == esperado
+    print(f"{'✅' if ok else '❌'} política em linha com {existentes} pesquisas: última coberta "
+          f"{ultima_coberta} (esperada {ids[cobertas - 1]}), próximo relatório "
+          f"{cobertas_novo[0]}–{cobertas_novo[-1]} (esperado {esperado[0]}–{esperado[-1]})")
+    return ok
+
+
+def executar(submissoes=400, linhas=4, processos=4, threads=4):
+    """Envia pesquisas em paralelo, de vários processos, e confere que há exatamente um relatório por janela.
+
+    Cada processo tem o seu pool de conexões, então a corrida pela chave
+    (linha, sequência) da janela acontece no banco, não numa trava do processo.
+    Usa o DATABASE_URL do ambiente (ou um SQLite temporário); a corrida só é
+    real num banco com escritores simultâneos (PostgreSQL). Execute com:
+        python -m benchmarks.politicas_relatorio
+    """
+    banco_temporario('politicas_relatorio')
+    # Todas as submissões vêm do mesmo cliente: sem antispam nem limite por IP
+    os.environ.setdefault('ANTISPAM_ATIVO', 'false')
+    os.environ.setdefault('LIMITES_ATIVO', 'false')
+
+    # O app lê o ambiente ao ser importado; o banco é preparado uma vez, aqui, e não em cada processo
+    from src.main import app
+    from src.models.pesquisa import Pesquisa
+    from src.models.politica_relatorio import JanelaRelatorio
+    from src.models.relatorio import Relatorio
+    from src.utils.politicas_relatorio import TAMANHO_PADRAO
+    os.environ['INICIALIZAR_BANCO'] = 'false'
+
+    nomes = [f'ESTRESSE-{i}' for i in range(linhas)]
+    lotes = [(list(range(p, submissoes, processos)), nomes, threads) for p in range(processos)]
+    with multiprocessing.get_context('spawn').Pool(processos) as pool:
+        status = [s for lote in pool.map(_enviar_lote, lotes) for s in lote]
+
+    falhas = [s for s in status if s != 201]
+    ok = not falhas
+    with app.app_context():
+        for linha in nomes:
+            pesquisas = Pesquisa.query.filter_by(linha_numero=linha).count()
+            janelas = JanelaRelatorio.query.filter_by(linha_numero=linha).order_by(JanelaRelatorio.sequencia).all()
+            relatorios = Relatorio.query.filter_by(linha_numero=linha).all()
+            ids = sorted(p['id'] for r in relatorios for p in r.get_dados_pesquisas())
+
+            esperado = pesquisas // TAMANHO_PADRAO
+            sequencias = [j.sequencia for j in janelas]
+            linha_ok = (
+                len(relatorios) == esperado
+                and sequencias == list(range(1, esperado + 1))
+                and all(j.relatorio_id for j in janelas)
+                and len(ids) == len(set(ids)) == esperado * TAMANHO_PADRAO
+            )
+            ok = ok and linha_ok
+            print(f"{linha}: {pesquisas} pesquisas, {len(relatorios)} relatórios "
+                  f"(esperado {esperado}) {'✅' if linha_ok else '❌'}")
+
+    ok = conferir_politica_em_linha_existente(app) and ok
+    print(f"{processos} processos x {threads} threads | {len(falhas)} submissões com erro {sorted(set(falhas))}")
+    print("✅ Exatamente um relatório por janela" if ok else "❌ Janelas duplicadas ou ausentes")
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if executar() else 1)
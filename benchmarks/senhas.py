@@ -0,0 +1,34 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.senhas import ServicoSenhas, bcrypt
+
+
+def executar(logins=40):
+    """Logins (verificações de senha) por segundo em um worker, com 1 thread e com o pool"""
+    configuracoes = [('pbkdf2', 600000), ('pbkdf2', 210000)]
+    if bcrypt:
+        configuracoes += [('bcrypt', 12), ('bcrypt', 11), ('bcrypt', 10)]
+
+    for algoritmo, custo in configuracoes:
+        servico = ServicoSenhas(algoritmo, custo)
+        senha_hash = servico.gerar_hash('senha-de-teste')
+
+        inicio = time.perf_counter()
+        for _ in range(logins // 4):
+            servico._conferir(senha_hash, 'senha-de-teste')
+        sequencial = (logins // 4) / (time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=servico.threads * 4) as requisicoes:
+            list(requisicoes.map(lambda _: servico.verificar(senha_hash, 'senha-de-teste'), range(logins)))
+        paralelo = logins / (time.perf_counter() - inicio)
+
+        print(f"{algoritmo:6} custo {custo:>6} | {1000 / sequencial:6.0f} ms por login | "
+              f"{sequencial:5.1f} logins/s (1 thread) | {paralelo:5.1f} logins/s (pool de {servico.threads})")
+    print(f"CPUs: {os.cpu_count()}")
+
+
+if __name__ == '__main__':
+    executar()
@@ -0,0 +1,54 @@
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import banco_temporario
+
+
+def executar(quantidade=300000, linhas=300):
+    """Compara as estatísticas por linha lidas do banco e do snapshot.
+
+    Usa o DATABASE_URL do ambiente (ou um SQLite temporário). Execute com:
+        python -m benchmarks.snapshot
+    """
+    banco_temporario('snapshot')
+    os.environ.setdefault('SNAPSHOT_DIR', tempfile.mkdtemp())
+
+    # O app lê o ambiente ao ser importado
+    from src.main import app
+    from src.database import db
+    from src.models.pesquisa import Pesquisa, DIMENSOES
+    from src.utils.compactacao import agregados_por_linha
+    from src.utils.snapshot import obter_snapshot
+
+    with app.app_context():
+        if Pesquisa.query.count() < quantidade:
+            aleatorio = random.Random(42)
+            base = datetime.now() - timedelta(days=730)
+            registros = [{
+                'linha_numero': f'L{aleatorio.randrange(linhas)}',
+                **{d: aleatorio.randint(1, 10) for d in DIMENSOES},
+                'data_criacao': base + timedelta(seconds=i * 200)
+            } for i in range(quantidade)]
+            db.session.execute(Pesquisa.__table__.insert(), registros)
+            db.session.commit()
+
+        obter_snapshot().atualizar()
+
+        resultados = {}
+        for nome, ativo in (('banco', False), ('snapshot', True)):
+            app.config['SNAPSHOT_ATIVO'] = ativo
+            agregados_por_linha()
+            inicio = time.perf_counter()
+            for _ in range(5):
+                resultados[nome] = agregados_por_linha()
+            duracao = (time.perf_counter() - inicio) / 5 * 1000
+            print(f"{quantidade} pesquisas, {linhas} linhas | {nome:<8} | {duracao:8.1f} ms")
+
+        print("✅ Resultados idênticos" if resultados['banco'] == resultados['snapshot'] else "❌ Resultados diferentes")
+
+
+if __name__ == '__main__':
+    executar()
@@ -59,39 +59,126 @@ cloud_config = CloudConfig()
 config = cloud_config.get_config()
 
 # Configurações específicas por plataforma
+# PROXIES_CONFIAVEIS: proxies (balanceador da plataforma) na frente do app, que
+# acrescentam o IP do cliente ao X-Forwarded-For; só esses saltos são considerados.
+# DB_*: pool de conexões por worker. Mantenha (DB_POOL_SIZE + DB_MAX_OVERFLOW) x workers
+# abaixo do limite de conexões do Postgres do plano, com folga para migrações e psql.
 PLATFORM_CONFIGS = {
     'railway': {
         'CORS_ORIGINS': ['*'],
         'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,  # 16MB
         'PERMANENT_SESSION_LIFETIME': 3600,
+        'PROXIES_CONFIAVEIS': 1,
+        'DB_POOL_SIZE': 5,
+        'DB_MAX_OVERFLOW': 5,
+        'DB_POOL_RECYCLE': 1800,
+        'DB_STATEMENT_TIMEOUT_MS': 30000,
     },
     'render': {
         'CORS_ORIGINS': ['*'],
         'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,
         'PERMANENT_SESSION_LIFETIME': 3600,
         'SEND_FILE_MAX_AGE_DEFAULT': 31536000,  # Cache 1 ano
+        'PROXIES_CONFIAVEIS': 1,
+        # Postgres free: poucas conexões e conexões ociosas encerradas pelo provedor
+        'DB_POOL_SIZE': 4,
+        'DB_MAX_OVERFLOW': 2,
+        'DB_POOL_RECYCLE': 300,
+        'DB_STATEMENT_TIMEOUT_MS': 30000,
     },
     'heroku': {
         'CORS_ORIGINS': ['*'],
         'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,
         'PERMANENT_SESSION_LIFETIME': 3600,
+        'PROXIES_CONFIAVEIS': 1,
+        # Planos básicos do Heroku Postgres: 20 conexões no total
+        'DB_POOL_SIZE': 3,
+        'DB_MAX_OVERFLOW': 2,
+        'DB_POOL_RECYCLE': 1800,
+        'DB_STATEMENT_TIMEOUT_MS': 25000,  # O roteador do Heroku corta a requisição em 30s
     },
     'pythonanywhere': {
         'CORS_ORIGINS': ['*'],
         'MAX_CONTENT_LENGTH': 8 * 1024 * 1024,  # 8MB (menor para free)
         'PERMANENT_SESSION_LIFETIME': 1800,  # 30min
+        'PROXIES_CONFIAVEIS': 1,
+        'DB_POOL_SIZE': 2,
+        'DB_MAX_OVERFLOW': 1,
+        'DB_POOL_RECYCLE': 280,  # Conexões ociosas são encerradas em 300s
+        'DB_STATEMENT_TIMEOUT_MS': 30000,
     },
     'local': {
         'CORS_ORIGINS': ['http://localhost:3000', 'http://127.0.0.1:3000'],
         'MAX_CONTENT_LENGTH': 16 * 1024 * 1024,
         'PERMANENT_SESSION_LIFETIME': 3600,
+        'PROXIES_CONFIAVEIS': 0,
+        'DB_POOL_SIZE': 5,
+        'DB_MAX_OVERFLOW': 10,
+        'DB_POOL_RECYCLE': 3600,
+        'DB_STATEMENT_TIMEOUT_MS': 0,  # Sem limite
     }
 }
 
+# Espera máxima por uma conexão livre do pool antes de falhar a requisição
+DB_POOL_TIMEOUT = 10
+
 # Aplicar configurações específicas da plataforma
-platform_config = PLATFORM_CONFIGS.get(cloud_config.platform, PLATFORM_CONFIGS['local'])
+platform_config = dict(PLATFORM_CONFIGS.get(cloud_config.platform, PLATFORM_CONFIGS['local']))
+
+# Variáveis de ambiente com o mesmo nome prevalecem sobre o perfil (ex.: DB_POOL_SIZE=10)
+for _chave in ('PROXIES_CONFIAVEIS', 'DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_RECYCLE', 'DB_STATEMENT_TIMEOUT_MS'):
+    if os.environ.get(_chave):
+        platform_config[_chave] = int(os.environ[_chave])
+
 config.update(platform_config)
 
+def get_platform_config():
+    """Perfil da plataforma detectada (com os ajustes vindos do ambiente)"""
+    return platform_config
+
+def get_engine_options(database_url, perfil=None):
+    """SQLALCHEMY_ENGINE_OPTIONS para a URL, conforme o perfil da plataforma"""
+    perfil = perfil or platform_config
+    # pre_ping: testa a conexão ao retirá-la do pool (o provedor pode tê-la encerrado)
+    opcoes = {'pool_pre_ping': True}
+    if database_url.startswith('sqlite'):
+        # SQLite não tem servidor nem limite de conexões: o pool padrão basta
+        return opcoes
+
+    opcoes.update({
+        'pool_size': perfil['DB_POOL_SIZE'],
+        'max_overflow': perfil['DB_MAX_OVERFLOW'],
+        'pool_recycle': perfil['DB_POOL_RECYCLE'],
+        'pool_timeout': DB_POOL_TIMEOUT,
+    })
+    if database_url.startswith('postgresql') and perfil['DB_STATEMENT_TIMEOUT_MS']:
+        opcoes['connect_args'] = {'options': f"-c statement_timeout={perfil['DB_STATEMENT_TIMEOUT_MS']}"}
+    return opcoes
+
+def describe_config(app_config):
+    """Linha de log com as configurações efetivas (sem credenciais)"""
+    url = urlparse(app_config['SQLALCHEMY_DATABASE_URI'])
+    opcoes = app_config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    partes = [
+        f"plataforma {get_platform()}",
+        f"banco {url.scheme}://{url.hostname or ''}{url.path if url.scheme.startswith('sqlite') else ''}",
+    ]
+    if 'pool_size' in opcoes:
+        partes.append(f"pool {opcoes['pool_size']}+{opcoes['max_overflow']} (espera {opcoes['pool_timeout']}s, "
+                      f"recycle {opcoes['pool_recycle']}s, pre_ping {'sim' if opcoes.get('pool_pre_ping') else 'não'})")
+    if 'LIMITE_CONCORRENCIA' in app_config:
+        partes.append(f"concorrência {app_config['LIMITE_CONCORRENCIA']} por worker "
+                      f"({app_config['LIMITE_CONCORRENCIA_PUBLICA']} públicas)")
+    timeout = opcoes.get('connect_args', {}).get('options', '').partition('=')[2]
+    partes.append(f"statement_timeout {timeout + ' ms' if timeout else 'sem limite'}")
+    partes.append(f"upload máx {app_config.get('MAX_CONTENT_LENGTH', 0) // (1024 * 1024)} MB")
+    partes.append(f"sessão {app_config.get('PERMANENT_SESSION_LIFETIME')}")
+    if app_config.get('SEND_FILE_MAX_AGE_DEFAULT'):
+        partes.append(f"cache estático {app_config['SEND_FILE_MAX_AGE_DEFAULT']}s")
+    partes.append(f"proxies confiáveis {app_config.get('PROXIES_CONFIAVEIS', 0)}")
+    partes.append(f"CORS {', '.join(app_config.get('CORS_ORIGINS', ['*']))}")
+    return ' | '.join(partes)
+
 def get_database_url():
     """Retorna URL do banco configurada"""
     return config['SQLALCHEMY_DATABASE_URI']
@@ -2,3 +2,73 @@ from flask_sqlalchemy import SQLAlchemy
 
 # Instância única do SQLAlchemy para toda a aplicação
 db = SQLAlchemy()
+
+
+def garantir_indices():
+    """Cria índices declarados nos modelos que ainda não existem no banco.
+
+    O db.create_all() só cria índices junto com tabelas novas, então tabelas
+    que já existiam em produção não recebem índices adicionados depois.
+    """
+    engine = db.engine
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(bind=engine, checkfirst=True)
+
+
+def inserir_ou_ignorar(tabela, **valores):
+    """INSERT que ignora conflito de chave única; retorna True se a linha foi inserida.
+
+    Usa ON CONFLICT DO NOTHING no PostgreSQL e no SQLite, de modo que tentativas
+    repetidas e corridas entre workers são inofensivas.
+    """
+    dialeto = db.engine.dialect.name
+    if dialeto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialeto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.exc import IntegrityError
+        try:
+            with db.session.begin_nested():
+                db.session.execute(tabela.insert().values(**valores))
+            return True
+        except IntegrityError:
+            return False
+
+    resultado = db.session.execute(insert(tabela).values(**valores).on_conflict_do_nothing())
+    return resultado.rowcount == 1
+
+
+def somar_ou_inserir(tabela, registros, chaves, colunas_soma):
+    """Upsert em lote que soma contadores: insere as linhas novas e, em conflito
+    nas `chaves`, acrescenta os valores de `colunas_soma` aos já existentes.
+
+    Os registros são ordenados pela chave para que transações concorrentes
+    bloqueiem as linhas sempre na mesma ordem (sem deadlock).
+    """
+    if not registros:
+        return
+    registros = sorted(registros, key=lambda r: tuple(r[c] for c in chaves))
+
+    dialeto = db.engine.dialect.name
+    if dialeto in ('postgresql', 'sqlite'):
+        if dialeto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        comando = insert(tabela).values(registros)
+        comando = comando.on_conflict_do_update(
+            index_elements=chaves,
+            set_={c: tabela.c[c] + comando.excluded[c] for c in colunas_soma}
+        )
+        db.session.execute(comando)
+        return
+
+    for registro in registros:
+        condicao = db.and_(*(tabela.c[c] == registro[c] for c in chaves))
+        atualizadas = db.session.execute(
+            tabela.update().where(condicao).values({c: tabela.c[c] + registro[c] for c in colunas_soma})
+        ).rowcount
+        if not atualizadas:
+            db.session.execute(tabela.insert().values(**registro))
@@ -1,97 +1,254 @@
 import os
 import sys
+import tempfile
+import weakref
 from datetime import timedelta
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, current_app, send_from_directory
 from flask_cors import CORS
 from flask_mail import Mail
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Importar instância única do banco de dados
 from src.database import db
-from src.config_cloud import get_database_url
+from src.config_cloud import get_database_url, get_platform_config, get_engine_options, describe_config
 
 # Importar todos os modelos
 from src.models.user import User
 from src.models.pesquisa import Pesquisa, ContadorLinha
 from src.models.usuario import Usuario
 from src.models.relatorio import Relatorio
+from src.models.pesquisa_diaria import PesquisaDiaria, MarcadorProcessamento
+from src.models.politica_relatorio import PoliticaRelatorio, JanelaRelatorio
+from src.models.agendamento import TarefaAgendada, ExecucaoTarefa
+from src.models.envio_email import EnvioEmail, GrupoEmail, RelatorioResumido
+from src.models.termo_diario import TermoDiario
+from src.models.moderacao import ModeracaoPesquisa
+from src.models.quarentena import PesquisaQuarentena
+from src.models.idempotencia import ChaveIdempotencia
+from src.models.balde_limite import BaldeLimite
 
 # Importar rotas
 from src.routes.user import user_bp
 from src.routes.pesquisa import pesquisa_bp
 from src.routes.auth import auth_bp
 from src.routes.relatorios import relatorios_bp
+from src.routes.analises import analises_bp
+from src.routes.agendador import agendador_bp
+from src.routes.email import email_bp
+from src.routes.busca import busca_bp
+
+from src.utils.indice_linhas import obter_indice_linhas
+from src.utils.compactacao import comando_backfill
+from src.utils.snapshot import comando_snapshot
+from src.utils.termos import comando_recontar_termos
+from src.utils.agendador import Agendador
+from src.utils.tarefas import registrar_tarefas
+from src.utils.limites import registrar_limites, limites_concorrencia
+from src.utils.inicializacao import inicializar_banco, comando_inicializar_banco
+from src.utils.perfil_sqlite import configurar_sqlite
+
+def _configurar(app):
+    """Configurações padrão, lidas do ambiente"""
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+    
+    # Perfil da plataforma (config_cloud): CORS, limite de upload, sessão, cache de estáticos e pool do banco
+    perfil = get_platform_config()
+    app.config['CORS_ORIGINS'] = perfil['CORS_ORIGINS']
+    app.config['MAX_CONTENT_LENGTH'] = perfil['MAX_CONTENT_LENGTH']
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(seconds=perfil['PERMANENT_SESSION_LIFETIME'])
+    if 'SEND_FILE_MAX_AGE_DEFAULT' in perfil:
+        app.config['SEND_FILE_MAX_AGE_DEFAULT'] = perfil['SEND_FILE_MAX_AGE_DEFAULT']
+    app.config['PROXIES_CONFIAVEIS'] = perfil['PROXIES_CONFIAVEIS']
+    
+    # Configurar Flask-Mail
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    app.config['MAIL_PORT'] = int(os.environ.get('MAIL_PORT', 587))
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'true').lower() != 'false'
+    app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME', 'sistema.pesquisa.transporte@gmail.com')
+    app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD', 'senha_do_email')
+    app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_DEFAULT_SENDER', 'sistema.pesquisa.transporte@gmail.com')
+    
+    # Destinatários dos relatórios (separados por vírgula)
+    app.config['EMAIL_DESTINATARIOS'] = os.environ.get('EMAIL_DESTINATARIOS', 'dih.al@hotmail.com')
+    
+    # 'individual': um e-mail por relatório; 'resumo': um e-mail por período com todas as linhas
+    app.config['EMAIL_MODO'] = os.environ.get('EMAIL_MODO', 'individual')
+    app.config['EMAIL_RESUMO_CRON'] = os.environ.get('EMAIL_RESUMO_CRON', '0 7 * * *')
+    
+    # Snapshot colunar das pesquisas (arquivos mapeados em memória, compartilhados entre os workers)
+    app.config['SNAPSHOT_ATIVO'] = os.environ.get('SNAPSHOT_ATIVO', 'true').lower() != 'false'
+    app.config['SNAPSHOT_DIR'] = os.environ.get('SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'pesquisa_snapshot'))
+    
+    # Envios repetidos (mesmo cliente e linha além de ANTISPAM_REPETICOES vezes, ou mesmo texto)
+    # dentro da janela vão para a quarentena
+    app.config['ANTISPAM_ATIVO'] = os.environ.get('ANTISPAM_ATIVO', 'true').lower() != 'false'
+    app.config['ANTISPAM_JANELA_MINUTOS'] = int(os.environ.get('ANTISPAM_JANELA_MINUTOS', 10))
+    app.config['ANTISPAM_REPETICOES'] = int(os.environ.get('ANTISPAM_REPETICOES', 5))
+    
+    # Limite de requisições por IP nas rotas públicas ('memoria': por worker; 'banco': compartilhado)
+    # e descarte de carga quando há requisições simultâneas demais no worker
+    app.config['LIMITES_ATIVO'] = os.environ.get('LIMITES_ATIVO', 'true').lower() != 'false'
+    app.config['LIMITES_BACKEND'] = os.environ.get('LIMITES_BACKEND', 'memoria')
+    # Vagas por worker derivadas das threads do gunicorn (GUNICORN_THREADS) e do pool do banco
+    maximo, maximo_publico = limites_concorrencia(
+        int(os.environ['GUNICORN_THREADS']) if os.environ.get('GUNICORN_THREADS') else None,
+        perfil['DB_POOL_SIZE'] + perfil['DB_MAX_OVERFLOW']
+    )
+    app.config['LIMITE_CONCORRENCIA'] = int(os.environ.get('LIMITE_CONCORRENCIA', maximo))
+    app.config['LIMITE_CONCORRENCIA_PUBLICA'] = int(os.environ.get('LIMITE_CONCORRENCIA_PUBLICA', maximo_publico))
+    
+    # Configurar banco de dados
+    # Configure the SQLAlchemy database URI using the cloud-aware configuration.
+    # This will use the DATABASE_URL environment variable when running on Render and
+    # fall back to a local SQLite database when no DATABASE_URL is provided.
+    app.config['SQLALCHEMY_DATABASE_URI'] = get_database_url()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    
+    # Tabelas, índices e administrador são criados por `flask --app src.main inicializar-banco`,
+    # uma vez por deploy; o worker só lê. INICIALIZAR_BANCO=true faz isso na partida (desenvolvimento)
+    app.config['INICIALIZAR_BANCO'] = os.environ.get('INICIALIZAR_BANCO', 'false').lower() == 'true'
+    
+    app.config['AGENDADOR_ATIVO'] = os.environ.get('AGENDADOR_ATIVO', 'true').lower() != 'false'
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 
-# Configurar sessões
-app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
+def _descartar_conexoes_apos_fork(app):
+    """No processo filho, abandona as conexões herdadas do pai (gunicorn --preload).
 
-# Configurar CORS
-CORS(app, supports_credentials=True)
+    Um socket de conexão não pode ser usado por dois processos; dispose(close=False)
+    troca o pool sem fechar as conexões, que continuam sendo do processo pai.
+    """
+    referencia = weakref.ref(app)
 
-# Configurar Flask-Mail
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = 'sistema.pesquisa.transporte@gmail.com'
-app.config['MAIL_PASSWORD'] = 'senha_do_email'  # Em produção, usar variável de ambiente
-app.config['MAIL_DEFAULT_SENDER'] = 'sistema.pesquisa.transporte@gmail.com'
+    def no_filho():
+        app = referencia()
+        if app is None:
+            return
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
 
-mail = Mail(app)
+    os.register_at_fork(after_in_child=no_filho)
 
-# Disponibilizar mail globalmente
-app.mail = mail
 
-# Registrar blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(pesquisa_bp, url_prefix='/api')
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(relatorios_bp, url_prefix='/api')
+def _iniciar_agendador_sob_demanda(app):
+    """Inicia o agendador na primeira requisição de cada processo.
 
-# Configurar banco de dados
-# Configure the SQLAlchemy database URI using the cloud-aware configuration.
-# This will use the DATABASE_URL environment variable when running on Render and
-# fall back to a local SQLite database when no DATABASE_URL is provided.
-app.config['SQLALCHEMY_DATABASE_URI'] = get_database_url()
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    Com --preload o app é montado no processo mestre do gunicorn, antes do fork;
+    uma thread iniciada ali não existiria nos workers (e não deve rodar no mestre).
+    """
+    iniciado_em = {'pid': None}
 
-# Inicializar banco de dados único
-db.init_app(app)
+    @app.before_request
+    def iniciar_agendador():
+        if iniciado_em['pid'] != os.getpid():
+            iniciado_em['pid'] = os.getpid()
+            app.agendador.iniciar()
 
-with app.app_context():
-    db.create_all()
-    
-    # Criar usuário administrador padrão
-    Usuario.criar_admin_padrao()
 
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
+    static_folder_path = current_app.static_folder
     if static_folder_path is None:
             return "Static folder not configured", 404
 
-    # Rotas específicas
+    # Rotas específicas (páginas sem cache: o cache longo do perfil da plataforma vale só para os demais arquivos)
     if path == 'login':
-        return send_from_directory(static_folder_path, 'login.html')
+        return send_from_directory(static_folder_path, 'login.html', max_age=0)
     elif path == 'admin':
-        return send_from_directory(static_folder_path, 'admin.html')
+        return send_from_directory(static_folder_path, 'admin.html', max_age=0)
     elif path == 'relatorios':
-        return send_from_directory(static_folder_path, 'relatorios.html')
+        return send_from_directory(static_folder_path, 'relatorios.html', max_age=0)
     elif path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
+        return send_from_directory(static_folder_path, path, max_age=0 if path.endswith('.html') else None)
     else:
         index_path = os.path.join(static_folder_path, 'index.html')
         if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+            return send_from_directory(static_folder_path, 'index.html', max_age=0)
         else:
             return "index.html not found", 404
 
 
+def create_app(config=None):
+    """Monta a aplicação; `config` sobrescreve as configurações lidas do ambiente.
+
+    Várias instâncias (com bancos diferentes, por exemplo) podem coexistir no
+    mesmo processo, cada uma com seu engine, agendador e limites.
+    """
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    _configurar(app)
+    if config:
+        app.config.update(config)
+    
+    # Pool do banco conforme a URL efetiva (que `config` pode ter trocado)
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    print(f"⚙️ {describe_config(app.config)}")
+    
+    # Configurar CORS
+    CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
+    
+    # Atrás do balanceador, remote_addr passa a ser o IP que ele recebeu (o último salto
+    # que ele acrescentou ao X-Forwarded-For), não o que o cliente declarou
+    if app.config['PROXIES_CONFIAVEIS']:
+        proxies = app.config['PROXIES_CONFIAVEIS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+    
+    # Disponibilizar mail globalmente
+    app.mail = Mail(app)
+    
+    # Registrar blueprints
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(pesquisa_bp, url_prefix='/api')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(relatorios_bp, url_prefix='/api')
+    app.register_blueprint(analises_bp, url_prefix='/api')
+    app.register_blueprint(agendador_bp, url_prefix='/api')
+    app.register_blueprint(email_bp, url_prefix='/api')
+    app.register_blueprint(busca_bp, url_prefix='/api')
+    
+    registrar_limites(app)
+    
+    # Inicializar banco de dados único
+    db.init_app(app)
+    _descartar_conexoes_apos_fork(app)
+    
+    with app.app_context():
+        # Implantações de um único servidor com SQLite: WAL, PRAGMAs e um escritor por vez
+        if db.engine.dialect.name == 'sqlite':
+            configurar_sqlite(db.engine)
+        
+        if app.config['INICIALIZAR_BANCO']:
+            inicializar_banco(os.environ.get('ADMIN_EMAIL'), os.environ.get('ADMIN_SENHA'))
+        
+        # Montar índice de sugestões de linhas em memória
+        try:
+            obter_indice_linhas().carregar_do_banco()
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️ Banco não inicializado? Rode `flask --app src.main inicializar-banco` ({str(e).splitlines()[0]})")
+    
+    # Tarefas periódicas: todos os workers rodam o agendador, mas o lease no banco
+    # garante que cada tarefa execute em apenas um deles
+    app.agendador = registrar_tarefas(Agendador(app))
+    if app.config['AGENDADOR_ATIVO']:
+        _iniciar_agendador_sob_demanda(app)
+    
+    app.cli.add_command(comando_inicializar_banco)
+    app.cli.add_command(comando_backfill)
+    app.cli.add_command(comando_snapshot)
+    app.cli.add_command(comando_recontar_termos)
+    
+    app.add_url_rule('/', 'serve', serve, defaults={'path': ''})
+    app.add_url_rule('/<path:path>', 'serve', serve)
+    
+    return app
+
+
+app = create_app()
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True)
 
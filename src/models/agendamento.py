@@ -0,0 +1,71 @@
+from src.database import db
+from datetime import datetime
+
+class TarefaAgendada(db.Model):
+    """Estado compartilhado de uma tarefa agendada, incluindo o lease do worker líder"""
+    __tablename__ = 'tarefas_agendadas'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), unique=True, nullable=False)
+    expressao = db.Column(db.String(100), nullable=False)
+    proxima_execucao = db.Column(db.DateTime, nullable=False)
+    
+    # Lease: apenas o worker `lider` pode executar a tarefa até `lease_ate`
+    lider = db.Column(db.String(200), nullable=True)
+    lease_ate = db.Column(db.DateTime, nullable=True)
+    
+    ultima_execucao = db.Column(db.DateTime, nullable=True)
+    ultima_duracao_ms = db.Column(db.Integer, nullable=True)
+    ultimo_sucesso = db.Column(db.Boolean, nullable=True)
+    execucoes_perdidas = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'nome': self.nome,
+            'expressao': self.expressao,
+            'proxima_execucao': self.proxima_execucao.isoformat() if self.proxima_execucao else None,
+            'lider': self.lider,
+            'lease_ate': self.lease_ate.isoformat() if self.lease_ate else None,
+            'ultima_execucao': self.ultima_execucao.isoformat() if self.ultima_execucao else None,
+            'ultima_duracao_ms': self.ultima_duracao_ms,
+            'ultimo_sucesso': self.ultimo_sucesso,
+            'execucoes_perdidas': self.execucoes_perdidas
+        }
+    
+    def __repr__(self):
+        return f'<TarefaAgendada {self.nome} ({self.expressao})>'
+
+class ExecucaoTarefa(db.Model):
+    """Histórico de execuções das tarefas agendadas"""
+    __tablename__ = 'execucoes_tarefa'
+    __table_args__ = (
+        db.Index('ix_execucoes_tarefa_nome_inicio', 'nome', 'inicio'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), nullable=False)
+    executor = db.Column(db.String(200), nullable=False)
+    agendada_para = db.Column(db.DateTime, nullable=False)
+    inicio = db.Column(db.DateTime, nullable=False)
+    fim = db.Column(db.DateTime, nullable=True)
+    duracao_ms = db.Column(db.Integer, nullable=True)
+    sucesso = db.Column(db.Boolean, nullable=True)
+    erro = db.Column(db.Text, nullable=True)
+    perdidas = db.Column(db.Integer, nullable=False, default=0)  # execuções não realizadas antes desta
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'executor': self.executor,
+            'agendada_para': self.agendada_para.isoformat(),
+            'inicio': self.inicio.isoformat(),
+            'fim': self.fim.isoformat() if self.fim else None,
+            'duracao_ms': self.duracao_ms,
+            'sucesso': self.sucesso,
+            'erro': self.erro,
+            'perdidas': self.perdidas
+        }
+    
+    def __repr__(self):
+        return f'<ExecucaoTarefa {self.nome} {self.inicio}>'
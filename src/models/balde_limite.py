@@ -0,0 +1,16 @@
+from src.database import db
+
+class BaldeLimite(db.Model):
+    """Balde de tokens compartilhado entre os workers (backend 'banco' do limite de requisições)"""
+    __tablename__ = 'baldes_limite'
+    __table_args__ = (
+        db.Index('ix_baldes_limite_atualizado', 'atualizado'),
+    )
+    
+    chave = db.Column(db.String(200), primary_key=True)  # rota|ip
+    tokens = db.Column(db.Float, nullable=False)
+    atualizado = db.Column(db.Float, nullable=False)  # time.time() da última consulta
+    permitido = db.Column(db.Boolean, nullable=False, default=True)  # Resultado da última consulta
+    
+    def __repr__(self):
+        return f'<BaldeLimite {self.chave} {self.tokens:.2f}>'
@@ -0,0 +1,90 @@
+from src.database import db
+from datetime import datetime
+
+class EnvioEmail(db.Model):
+    """Mensagem na fila de envio, com o status de entrega"""
+    __tablename__ = 'envios_email'
+    __table_args__ = (
+        db.Index('ix_envios_email_status_proxima', 'status', 'proxima_tentativa'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False, default='relatorio')  # relatorio, teste
+    relatorio_id = db.Column(db.Integer, db.ForeignKey('relatorios.id'), nullable=True, index=True)
+    destinatarios = db.Column(db.Text, nullable=False)  # separados por vírgula
+    assunto = db.Column(db.String(255), nullable=True)
+    html = db.Column(db.Text, nullable=True)  # vazio = renderizado a partir do relatório no envio
+    
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # pendente, enviado, falhou
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    erro = db.Column(db.Text, nullable=True)
+    
+    # Use local time for queue timestamps
+    data_criacao = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    enviado_em = db.Column(db.DateTime, nullable=True)
+    
+    def get_destinatarios(self):
+        return [d.strip() for d in self.destinatarios.split(',') if d.strip()]
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'relatorio_id': self.relatorio_id,
+            'destinatarios': self.get_destinatarios(),
+            'assunto': self.assunto,
+            'status': self.status,
+            'tentativas': self.tentativas,
+            'proxima_tentativa': self.proxima_tentativa.isoformat() if self.status == 'pendente' else None,
+            'erro': self.erro,
+            'data_criacao': self.data_criacao.isoformat(),
+            'enviado_em': self.enviado_em.isoformat() if self.enviado_em else None
+        }
+    
+    def __repr__(self):
+        return f'<EnvioEmail {self.id} {self.status}>'
+
+class RelatorioResumido(db.Model):
+    """Relatório já incluído num resumo; a chave única impede que entre em dois resumos"""
+    __tablename__ = 'relatorios_resumidos'
+    
+    relatorio_id = db.Column(db.Integer, db.ForeignKey('relatorios.id'), primary_key=True)
+    data_criacao = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    
+    def __repr__(self):
+        return f'<RelatorioResumido {self.relatorio_id}>'
+
+class GrupoEmail(db.Model):
+    """Grupo de linhas com sua lista de destinatários para o e-mail resumo"""
+    __tablename__ = 'grupos_email'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), unique=True, nullable=False)
+    linhas = db.Column(db.Text, nullable=True)  # separadas por vírgula; vazio = todas as linhas
+    destinatarios = db.Column(db.Text, nullable=False)  # separados por vírgula
+    ativo = db.Column(db.Boolean, default=True, nullable=False)
+    data_criacao = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    
+    def get_linhas(self):
+        return [l.strip() for l in (self.linhas or '').split(',') if l.strip()]
+    
+    def get_destinatarios(self):
+        return [d.strip() for d in self.destinatarios.split(',') if d.strip()]
+    
+    def abrange(self, linha_numero):
+        linhas = self.get_linhas()
+        return not linhas or linha_numero in linhas
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'linhas': self.get_linhas(),
+            'destinatarios': self.get_destinatarios(),
+            'ativo': self.ativo,
+            'data_criacao': self.data_criacao.isoformat()
+        }
+    
+    def __repr__(self):
+        return f'<GrupoEmail {self.nome}>'
@@ -0,0 +1,22 @@
+from datetime import datetime
+from src.database import db
+
+class ChaveIdempotencia(db.Model):
+    """Resposta já dada a um envio com o cabeçalho Idempotency-Key, para repetir em novas tentativas"""
+    __tablename__ = 'chaves_idempotencia'
+    __table_args__ = (
+        # Limpeza em lote das chaves vencidas
+        db.Index('ix_chaves_idempotencia_expira_em', 'expira_em'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    chave = db.Column(db.String(100), unique=True, nullable=False)  # sha256 da Idempotency-Key
+    hash_requisicao = db.Column(db.String(64), nullable=False)  # Mesmo corpo exigido ao reutilizar a chave
+    status = db.Column(db.String(20), nullable=False, default='em_andamento')  # em_andamento, concluida
+    codigo_status = db.Column(db.Integer, nullable=True)
+    resposta = db.Column(db.Text, nullable=True)  # JSON
+    data_criacao = db.Column(db.DateTime, default=datetime.now)
+    expira_em = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<ChaveIdempotencia {self.chave} {self.status}>'
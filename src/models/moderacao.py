@@ -0,0 +1,23 @@
+from datetime import datetime
+from src.database import db
+
+class ModeracaoPesquisa(db.Model):
+    """Pesquisa cujas observações foram mascaradas pela moderação (o texto original não é guardado)"""
+    __tablename__ = 'moderacoes_pesquisa'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    pesquisa_id = db.Column(db.Integer, db.ForeignKey('pesquisa.id'), nullable=False, unique=True)
+    categorias = db.Column(db.String(200), nullable=False)  # Ex.: "palavrao,telefone"
+    ocorrencias = db.Column(db.Integer, nullable=False, default=0)
+    data_criacao = db.Column(db.DateTime, default=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'pesquisa_id': self.pesquisa_id,
+            'categorias': self.categorias.split(','),
+            'ocorrencias': self.ocorrencias,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None
+        }
+    
+    def __repr__(self):
+        return f'<ModeracaoPesquisa {self.pesquisa_id} {self.categorias}>'
@@ -1,7 +1,15 @@
 from src.database import db
 from datetime import datetime
 
+# Dimensões avaliadas em cada pesquisa, na ordem do formulário
+DIMENSOES = ['pontualidade', 'frequencia', 'conforto', 'atendimento', 'infraestrutura']
+
 class Pesquisa(db.Model):
+    __table_args__ = (
+        # Consultas por linha e período (tendências, relatórios)
+        db.Index('ix_pesquisa_linha_data', 'linha_numero', 'data_criacao'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     linha_numero = db.Column(db.String(50), nullable=False)
     linha_itinerario = db.Column(db.String(200), nullable=True)
@@ -0,0 +1,60 @@
+from src.database import db
+from datetime import datetime
+import json
+
+class PesquisaDiaria(db.Model):
+    """Consolidação diária das pesquisas de uma linha (dias já encerrados)"""
+    __tablename__ = 'pesquisa_diaria'
+    __table_args__ = (
+        db.UniqueConstraint('linha_numero', 'dia', name='uq_pesquisa_diaria_linha_dia'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    linha_numero = db.Column(db.String(50), nullable=False)
+    dia = db.Column(db.Date, nullable=False, index=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Somas por dimensão (médias = soma / total)
+    soma_pontualidade = db.Column(db.Integer, nullable=False, default=0)
+    soma_frequencia = db.Column(db.Integer, nullable=False, default=0)
+    soma_conforto = db.Column(db.Integer, nullable=False, default=0)
+    soma_atendimento = db.Column(db.Integer, nullable=False, default=0)
+    soma_infraestrutura = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Histogramas em JSON: {dimensao: [qtd nota 1, ..., qtd nota 10]}
+    histogramas = db.Column(db.Text, nullable=False)
+    
+    def get_histogramas(self):
+        """Retorna os histogramas como dicionário"""
+        return json.loads(self.histogramas)
+    
+    def __repr__(self):
+        return f'<PesquisaDiaria {self.linha_numero} {self.dia}: {self.total}>'
+
+class MarcadorProcessamento(db.Model):
+    """Marca d'água de processos incrementais (até onde já foi processado)"""
+    __tablename__ = 'marcadores_processamento'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nome = db.Column(db.String(100), unique=True, nullable=False)
+    valor = db.Column(db.String(100), nullable=True)
+    atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    @staticmethod
+    def obter(nome):
+        """Retorna o valor atual do marcador ou None"""
+        marcador = MarcadorProcessamento.query.filter_by(nome=nome).first()
+        return marcador.valor if marcador else None
+    
+    @staticmethod
+    def definir(nome, valor):
+        """Atualiza o marcador (sem commit)"""
+        marcador = MarcadorProcessamento.query.filter_by(nome=nome).first()
+        if not marcador:
+            marcador = MarcadorProcessamento(nome=nome)
+            db.session.add(marcador)
+        marcador.valor = valor
+        return marcador
+    
+    def __repr__(self):
+        return f'<MarcadorProcessamento {self.nome}={self.valor}>'
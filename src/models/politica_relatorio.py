@@ -0,0 +1,85 @@
+from src.database import db
+from datetime import datetime
+
+TIPOS_POLITICA = ('contagem', 'periodo', 'janela')
+
+class PoliticaRelatorio(db.Model):
+    """Política de geração automática de relatórios de uma linha e o estado da janela atual.
+
+    - contagem: um relatório a cada `tamanho` pesquisas, sem sobreposição
+    - periodo: um relatório por dia, semana ou mês (`periodo`)
+    - janela: a cada `passo` pesquisas, relatório das últimas `tamanho` (janela deslizante)
+    """
+    __tablename__ = 'politicas_relatorio'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    linha_numero = db.Column(db.String(50), unique=True, nullable=False)
+    tipo = db.Column(db.String(20), nullable=False, default='contagem')
+    tamanho = db.Column(db.Integer, nullable=False, default=10)
+    passo = db.Column(db.Integer, nullable=True)
+    periodo = db.Column(db.String(10), nullable=True)  # dia, semana ou mes
+    
+    # Estado da janela: contador da linha e última pesquisa já incluídos em relatório
+    contador_base = db.Column(db.Integer, nullable=False, default=0)
+    ultimo_pesquisa_id = db.Column(db.Integer, nullable=False, default=0)
+    sequencia = db.Column(db.Integer, nullable=False, default=0)
+    inicio_periodo_atual = db.Column(db.Date, nullable=True)
+    atualizado_em = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    def __init__(self, linha_numero, tipo='contagem', tamanho=10, passo=None, periodo=None):
+        self.linha_numero = linha_numero
+        self.tipo = tipo
+        self.tamanho = tamanho
+        self.passo = passo
+        self.periodo = periodo
+        self.contador_base = 0
+        self.ultimo_pesquisa_id = 0
+        self.sequencia = 0
+    
+    def pesquisas_pendentes(self, contador):
+        """Pesquisas da linha ainda não cobertas pela janela atual"""
+        return contador - self.contador_base
+    
+    def faltam_para_relatorio(self, contador):
+        """Quantas pesquisas faltam para o próximo relatório (None para política por período)"""
+        if self.tipo == 'contagem':
+            return self.tamanho - self.pesquisas_pendentes(contador)
+        if self.tipo == 'janela':
+            return (self.passo or self.tamanho) - self.pesquisas_pendentes(contador)
+        return None
+    
+    def to_dict(self):
+        return {
+            'linha_numero': self.linha_numero,
+            'tipo': self.tipo,
+            'tamanho': self.tamanho,
+            'passo': self.passo,
+            'periodo': self.periodo,
+            'sequencia': self.sequencia,
+            'ultimo_pesquisa_id': self.ultimo_pesquisa_id,
+            'inicio_periodo_atual': self.inicio_periodo_atual.isoformat() if self.inicio_periodo_atual else None,
+            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
+    
+    def __repr__(self):
+        return f'<PoliticaRelatorio {self.linha_numero}: {self.tipo}>'
+
+class JanelaRelatorio(db.Model):
+    """Chave única (linha, sequência da janela) de cada relatório automático.
+
+    A restrição única garante no banco que cada janela gera exatamente um
+    relatório, mesmo com vários workers ou requisições repetidas.
+    """
+    __tablename__ = 'janelas_relatorio'
+    __table_args__ = (
+        db.UniqueConstraint('linha_numero', 'sequencia', name='uq_janela_relatorio_linha_sequencia'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    linha_numero = db.Column(db.String(50), nullable=False)
+    sequencia = db.Column(db.Integer, nullable=False)
+    relatorio_id = db.Column(db.Integer, db.ForeignKey('relatorios.id'), nullable=True)
+    data_criacao = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    
+    def __repr__(self):
+        return f'<JanelaRelatorio {self.linha_numero}#{self.sequencia}>'
@@ -0,0 +1,41 @@
+from datetime import datetime
+from src.database import db
+
+class PesquisaQuarentena(db.Model):
+    """Envio marcado como repetido/spam: guardado para revisão, sem contar para a linha"""
+    __tablename__ = 'pesquisas_quarentena'
+    __table_args__ = (
+        db.Index('ix_pesquisas_quarentena_data', 'data_criacao'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    linha_numero = db.Column(db.String(50), nullable=False)
+    linha_itinerario = db.Column(db.String(200), nullable=True)
+    pontualidade = db.Column(db.Integer, nullable=False)
+    frequencia = db.Column(db.Integer, nullable=False)
+    conforto = db.Column(db.Integer, nullable=False)
+    atendimento = db.Column(db.Integer, nullable=False)
+    infraestrutura = db.Column(db.Integer, nullable=False)
+    observacoes = db.Column(db.Text, nullable=True)
+    motivo = db.Column(db.String(30), nullable=False)  # cliente_repetido, conteudo_repetido
+    impressao = db.Column(db.String(32), nullable=False)  # Hash de IP + User-Agent, não o IP em si
+    data_criacao = db.Column(db.DateTime, default=datetime.now)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'linha_numero': self.linha_numero,
+            'linha_itinerario': self.linha_itinerario,
+            'pontualidade': self.pontualidade,
+            'frequencia': self.frequencia,
+            'conforto': self.conforto,
+            'atendimento': self.atendimento,
+            'infraestrutura': self.infraestrutura,
+            'observacoes': self.observacoes,
+            'motivo': self.motivo,
+            'impressao': self.impressao,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None
+        }
+    
+    def __repr__(self):
+        return f'<PesquisaQuarentena {self.linha_numero} {self.motivo}>'
@@ -1,4 +1,5 @@
 from src.database import db
+from src.utils.agregacao import agregar_pesquisas
 from datetime import datetime
 import json
 
@@ -32,20 +33,17 @@ class Relatorio(db.Model):
         self.linha_numero = linha_numero
         self.total_pesquisas = len(pesquisas)
         
-        # Calcular período
-        datas = [p.data_criacao for p in pesquisas]
-        self.periodo_inicio = min(datas)
-        self.periodo_fim = max(datas)
+        # Período e médias em uma única agregação sobre as pesquisas
+        agregado = agregar_pesquisas(pesquisas)
+        self.periodo_inicio = agregado['periodo_inicio']
+        self.periodo_fim = agregado['periodo_fim']
         
-        # Calcular médias
-        self.media_pontualidade = sum(p.pontualidade for p in pesquisas) / len(pesquisas)
-        self.media_frequencia = sum(p.frequencia for p in pesquisas) / len(pesquisas)
-        self.media_conforto = sum(p.conforto for p in pesquisas) / len(pesquisas)
-        self.media_atendimento = sum(p.atendimento for p in pesquisas) / len(pesquisas)
-        self.media_infraestrutura = sum(p.infraestrutura for p in pesquisas) / len(pesquisas)
-        self.media_geral = (self.media_pontualidade + self.media_frequencia + 
-                           self.media_conforto + self.media_atendimento + 
-                           self.media_infraestrutura) / 5
+        self.media_pontualidade = agregado['medias']['pontualidade']
+        self.media_frequencia = agregado['medias']['frequencia']
+        self.media_conforto = agregado['medias']['conforto']
+        self.media_atendimento = agregado['medias']['atendimento']
+        self.media_infraestrutura = agregado['medias']['infraestrutura']
+        self.media_geral = agregado['media_geral']
         
         # Armazenar dados das pesquisas
         dados = []
@@ -74,6 +72,14 @@ class Relatorio(db.Model):
         """Retorna os dados das pesquisas como lista de dicionários"""
         return json.loads(self.dados_pesquisas)
     
+    def get_histogramas(self):
+        """Retorna o histograma de notas (1..10) de cada dimensão das pesquisas do relatório"""
+        from src.models.pesquisa import DIMENSOES
+        from src.utils.histogramas import histograma_de_notas
+        
+        dados = self.get_dados_pesquisas()
+        return {d: histograma_de_notas(p[d] for p in dados) for d in DIMENSOES}
+    
     def get_observacoes_lista(self):
         """Retorna as observações como lista"""
         if not self.observacoes:
@@ -0,0 +1,27 @@
+from src.database import db
+
+class TermoDiario(db.Model):
+    """Quantas pesquisas de uma linha citaram um termo (palavra ou bigrama) em um dia"""
+    __tablename__ = 'termos_diarios'
+    __table_args__ = (
+        db.UniqueConstraint('linha_numero', 'dia', 'termo', name='uq_termo_diario_linha_dia_termo'),
+        # Top termos por período (todas as linhas ou algumas)
+        db.Index('ix_termos_diarios_dia_linha', 'dia', 'linha_numero'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    linha_numero = db.Column(db.String(50), nullable=False)
+    dia = db.Column(db.Date, nullable=False)
+    termo = db.Column(db.String(100), nullable=False)
+    contador = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'linha_numero': self.linha_numero,
+            'dia': self.dia.isoformat(),
+            'termo': self.termo,
+            'contador': self.contador
+        }
+    
+    def __repr__(self):
+        return f'<TermoDiario {self.linha_numero} {self.dia} {self.termo}={self.contador}>'
@@ -1,8 +1,17 @@
-from src.database import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from src.database import db, inserir_ou_ignorar
+from src.utils.senhas import obter_servico_senhas
 from datetime import datetime, timedelta
+import os
 import secrets
 
+def _gravar_senha(caminho, senha):
+    """Grava a senha num arquivo legível só pelo dono (0600)"""
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    descritor = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.fchmod(descritor, 0o600)  # Arquivo já existente mantém as permissões antigas no open
+    with os.fdopen(descritor, 'w') as arquivo:
+        arquivo.write(senha + '\n')
+
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
     
@@ -20,24 +29,38 @@ class Usuario(db.Model):
     def __init__(self, email, nome, senha, is_admin=False):
         self.email = email.lower().strip()
         self.nome = nome.strip()
-        self.senha_hash = generate_password_hash(senha)
+        self.senha_hash = obter_servico_senhas().gerar_hash(senha)
         self.is_admin = is_admin
         self.token_sessao = secrets.token_urlsafe(32)
     
     def verificar_senha(self, senha):
         """Verifica se a senha fornecida está correta"""
-        return check_password_hash(self.senha_hash, senha)
+        return obter_servico_senhas().verificar(self.senha_hash, senha)
+    
+    def atualizar_hash_senha(self, senha):
+        """Refaz o hash com o algoritmo/custo atuais, se mudaram (chamar só após verificar a senha)"""
+        if obter_servico_senhas().precisa_rehash(self.senha_hash):
+            self.senha_hash = obter_servico_senhas().gerar_hash(senha)
+            return True
+        return False
     
-    def alterar_senha(self, nova_senha):
-        """Altera a senha do usuário"""
-        self.senha_hash = generate_password_hash(nova_senha)
-        self.token_sessao = secrets.token_urlsafe(32)  # Invalida sessões existentes
+    def alterar_senha(self, nova_senha, sessao_atual=None):
+        """Altera a senha do usuário e encerra as sessões dos outros dispositivos"""
+        self.senha_hash = obter_servico_senhas().gerar_hash(nova_senha)
+        outras = SessaoUsuario.query.filter(SessaoUsuario.usuario_id == self.id)
+        if sessao_atual is not None:
+            outras = outras.filter(SessaoUsuario.id != sessao_atual.id)
+        outras.delete(synchronize_session=False)
     
-    def fazer_login(self):
-        """Registra o login do usuário usando o horário local"""
+    def fazer_login(self, ip_address=None, user_agent=None):
+        """Registra o login e abre uma nova sessão (as de outros dispositivos continuam válidas)"""
         # Use local time instead of UTC for login timestamps
         self.ultimo_login = datetime.now()
-        self.token_sessao = secrets.token_urlsafe(32)
+        sessao = SessaoUsuario(self.id)
+        sessao.ip_address = (ip_address or '')[:45] or None
+        sessao.user_agent = user_agent
+        db.session.add(sessao)
+        return sessao
     
     def to_dict(self):
         """Converte o usuário para dicionário (sem dados sensíveis)"""
@@ -52,33 +75,60 @@ class Usuario(db.Model):
         }
     
     @staticmethod
-    def criar_admin_padrao():
-        """Cria o usuário administrador padrão se não existir"""
-        admin_email = "dih.al@hotmail.com"
-        admin_existente = Usuario.query.filter_by(email=admin_email).first()
+    def criar_admin_padrao(email=None, senha=None, arquivo_senha=None):
+        """Cria o usuário administrador padrão se não existir; retorna True se criou.
+
+        Sem senha informada, gera uma aleatória e a grava em `arquivo_senha`
+        (permissão 0600), nunca na saída; sem arquivo, a senha é obrigatória.
+        """
+        admin_email = (email or "dih.al@hotmail.com").lower().strip()
         
-        # Remover admin existente para recriar com senha correta
-        if admin_existente:
-            db.session.delete(admin_existente)
-            db.session.commit()
-            print(f"🔄 Usuário administrador existente removido para recriação")
+        # Já existe: nada a fazer (sem gerar hash de senha)
+        if Usuario.query.filter_by(email=admin_email).first():
+            return False
         
-        # Senha padrão para o admin (deve ser alterada no primeiro login)
-        senha_padrao = "admin123"
+        if not senha and not arquivo_senha:
+            raise ValueError('Senha do administrador não informada (defina ADMIN_SENHA)')
+        senha_gerada = not senha
+        senha = senha or secrets.token_urlsafe(12)
         admin = Usuario(
             email=admin_email,
             nome="Administrador do Sistema",
-            senha=senha_padrao,
+            senha=senha,
             is_admin=True
         )
-        db.session.add(admin)
+        # Inserção idempotente: duas inicializações simultâneas não duplicam nem falham
+        criado = inserir_ou_ignorar(
+            Usuario.__table__,
+            email=admin.email,
+            nome=admin.nome,
+            senha_hash=admin.senha_hash,
+            is_admin=True,
+            ativo=True,
+            data_criacao=datetime.now(),
+            token_sessao=admin.token_sessao
+        )
         db.session.commit()
-        print(f"✅ Usuário administrador criado: {admin_email}")
-        print(f"🔑 Senha padrão: {senha_padrao}")
-        return admin
+        if criado:
+            print(f"✅ Usuário administrador criado: {admin_email}")
+            if senha_gerada:
+                _gravar_senha(arquivo_senha, senha)
+                print(f"🔑 Senha gerada gravada em {arquivo_senha} (altere no primeiro login e apague o arquivo)")
+        return criado
 
 class SessaoUsuario(db.Model):
+    """Sessão de um dispositivo: cada login cria a sua, com expiração deslizante"""
     __tablename__ = 'sessoes_usuario'
+    __table_args__ = (
+        # Limpeza em lote das sessões vencidas
+        db.Index('ix_sessoes_usuario_data_expiracao', 'data_expiracao'),
+    )
+    
+    # Cada uso empurra a expiração para DURACAO_HORAS adiante, mas no máximo uma
+    # escrita a cada RENOVACAO_MINUTOS por sessão (não um UPDATE por requisição)
+    DURACAO_HORAS = 24
+    RENOVACAO_MINUTOS = 5
+    LOTE_LIMPEZA = 1000
     
     id = db.Column(db.Integer, primary_key=True)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
@@ -92,11 +142,11 @@ class SessaoUsuario(db.Model):
     
     usuario = db.relationship('Usuario', backref=db.backref('sessoes', lazy=True))
     
-    def __init__(self, usuario_id, duracao_horas=24):
+    def __init__(self, usuario_id, duracao_horas=None):
         self.usuario_id = usuario_id
         self.token = secrets.token_urlsafe(32)
         # Use local time for the expiration calculation
-        self.data_expiracao = datetime.now() + timedelta(hours=duracao_horas)
+        self.data_expiracao = datetime.now() + timedelta(hours=duracao_horas or self.DURACAO_HORAS)
     
     def is_valida(self):
         """Verifica se a sessão ainda é válida usando horário local"""
@@ -106,17 +156,45 @@ class SessaoUsuario(db.Model):
         """Invalida a sessão"""
         self.ativo = False
     
-    @staticmethod
-    def limpar_sessoes_expiradas():
-        """Remove sessões expiradas do banco de dados usando horário local"""
-        sessoes_expiradas = SessaoUsuario.query.filter(
-            SessaoUsuario.data_expiracao < datetime.now()
-        ).all()
-
-        for sessao in sessoes_expiradas:
-            db.session.delete(sessao)
+    def renovar(self, agora=None):
+        """Estende a expiração se a última renovação tiver mais de RENOVACAO_MINUTOS (sem commit).
 
-        if sessoes_expiradas:
+        O último acesso é data_expiracao - DURACAO_HORAS, então não há coluna extra para gravar.
+        """
+        agora = agora or datetime.now()
+        ultima_renovacao = self.data_expiracao - timedelta(hours=self.DURACAO_HORAS)
+        if agora - ultima_renovacao < timedelta(minutes=self.RENOVACAO_MINUTOS):
+            return False
+        self.data_expiracao = agora + timedelta(hours=self.DURACAO_HORAS)
+        return True
+    
+    @staticmethod
+    def buscar_valida(token):
+        """Sessão ativa e não vencida do token, de um usuário ativo (uma consulta pelo índice do token)"""
+        return SessaoUsuario.query.join(Usuario).filter(
+            SessaoUsuario.token == token,
+            SessaoUsuario.ativo.is_(True),
+            SessaoUsuario.data_expiracao > datetime.now(),
+            Usuario.ativo.is_(True)
+        ).first()
+    
+    @staticmethod
+    def limpar_sessoes_expiradas(lote=None):
+        """Remove sessões vencidas ou invalidadas em DELETEs de até `lote` linhas"""
+        lote = lote or SessaoUsuario.LOTE_LIMPEZA
+        tabela = SessaoUsuario.__table__
+        total = 0
+        while True:
+            # Lotes curtos: cada DELETE segura os locks por pouco tempo
+            ids = db.select(tabela.c.id).where(
+                db.or_(tabela.c.data_expiracao < datetime.now(), tabela.c.ativo.is_(False))
+            ).limit(lote).scalar_subquery()
+            removidas = db.session.execute(db.delete(tabela).where(tabela.c.id.in_(ids))).rowcount
             db.session.commit()
-            print(f"🧹 {len(sessoes_expiradas)} sessões expiradas removidas")
+            total += removidas
+            if removidas < lote:
+                break
 
+        if total:
+            print(f"🧹 {total} sessões expiradas removidas")
+        return total
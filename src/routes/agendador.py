@@ -0,0 +1,42 @@
+from flask import Blueprint, request, jsonify, current_app
+from src.models.agendamento import TarefaAgendada, ExecucaoTarefa
+from src.routes.auth import requer_admin
+
+agendador_bp = Blueprint('agendador', __name__)
+
+@agendador_bp.route('/agendador/tarefas', methods=['GET'])
+@requer_admin
+def listar_tarefas(usuario_atual):
+    """Lista as tarefas agendadas com seu estado e execuções perdidas (apenas admin)"""
+    try:
+        tarefas = TarefaAgendada.query.order_by(TarefaAgendada.nome).all()
+        
+        return jsonify({
+            'tarefas': [t.to_dict() for t in tarefas],
+            'total': len(tarefas),
+            'worker': current_app.agendador.id_worker
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@agendador_bp.route('/agendador/execucoes', methods=['GET'])
+@requer_admin
+def listar_execucoes(usuario_atual):
+    """Histórico de execuções, com duração e falhas (apenas admin)"""
+    try:
+        tarefa = request.args.get('tarefa')
+        limite = min(request.args.get('limite', 50, type=int), 500)
+        
+        query = ExecucaoTarefa.query
+        if tarefa:
+            query = query.filter_by(nome=tarefa)
+        execucoes = query.order_by(ExecucaoTarefa.inicio.desc()).limit(limite).all()
+        
+        return jsonify({
+            'execucoes': [e.to_dict() for e in execucoes],
+            'total': len(execucoes)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
@@ -0,0 +1,105 @@
+from flask import Blueprint, request, jsonify
+from src.routes.auth import requer_login, requer_admin
+from src.utils.tendencias import calcular_tendencias, ErroTendencia
+from src.utils.comparativo import calcular_comparativo
+from src.utils.consulta import executar_consulta, ErroConsulta
+from src.utils.termos import top_termos
+from datetime import datetime
+
+analises_bp = Blueprint('analises', __name__)
+
+def obter_linhas_parametro():
+    """Lê linhas de ?linhas=101,102 ou de ?linha=101&linha=102"""
+    linhas = request.args.getlist('linha')
+    if request.args.get('linhas'):
+        linhas += request.args['linhas'].split(',')
+    # Remover vazias e duplicadas mantendo a ordem
+    return list(dict.fromkeys(l.strip() for l in linhas if l.strip()))
+
+def obter_data_parametro(nome):
+    """Lê uma data no formato AAAA-MM-DD"""
+    valor = request.args.get(nome)
+    if not valor:
+        return None
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise ErroTendencia(f'Data inválida em {nome}. Use o formato AAAA-MM-DD')
+
+@analises_bp.route('/analises/tendencias', methods=['GET'])
+@requer_login
+def obter_tendencias(usuario_atual):
+    """Tendências por dia, semana ou mês para uma ou mais linhas"""
+    try:
+        resultado = calcular_tendencias(
+            obter_linhas_parametro(),
+            request.args.get('granularidade', 'dia'),
+            obter_data_parametro('inicio'),
+            obter_data_parametro('fim')
+        )
+        return jsonify(resultado), 200
+        
+    except ErroTendencia as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@analises_bp.route('/analises/comparativo', methods=['GET'])
+@requer_login
+def obter_comparativo(usuario_atual):
+    """Compara as linhas com a rede: z-scores, ranking com intervalo de confiança e maiores variações"""
+    try:
+        resultado = calcular_comparativo(
+            obter_linhas_parametro() or None,
+            obter_data_parametro('inicio'),
+            obter_data_parametro('fim'),
+            min_pesquisas=max(request.args.get('min_pesquisas', 1, type=int), 1),
+            limite_movimentos=min(max(request.args.get('limite', 10, type=int), 1), 100)
+        )
+        return jsonify(resultado), 200
+        
+    except ErroTendencia as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@analises_bp.route('/analises/consulta', methods=['POST'])
+@requer_admin
+def consulta_analitica(usuario_atual):
+    """Consulta livre sobre as pesquisas: filtros, agrupamentos e agregados de uma lista branca (apenas admin)"""
+    try:
+        return jsonify(executar_consulta(request.get_json(silent=True))), 200
+        
+    except ErroConsulta as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@analises_bp.route('/analises/termos', methods=['GET'])
+@requer_login
+def obter_termos(usuario_atual):
+    """Termos mais citados nas observações (padrão: últimos 7 dias), no geral ou por linha"""
+    try:
+        tipo = request.args.get('tipo', 'todos')
+        if tipo not in ('todos', 'palavras', 'bigramas'):
+            return jsonify({'erro': 'Tipo inválido. Use: todos, palavras, bigramas'}), 400
+        
+        inicio = obter_data_parametro('inicio')
+        fim = obter_data_parametro('fim')
+        if inicio and fim and inicio > fim:
+            return jsonify({'erro': 'Data inicial deve ser anterior à data final'}), 400
+        
+        resultado = top_termos(
+            k=request.args.get('k', 20, type=int),
+            linhas=obter_linhas_parametro(),
+            inicio=inicio,
+            fim=fim,
+            tipo=tipo,
+            por_linha=request.args.get('por_linha', 'false').lower() == 'true'
+        )
+        return jsonify(resultado), 200
+        
+    except ErroTendencia as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
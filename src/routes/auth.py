@@ -1,11 +1,18 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, g
 from src.database import db
 from src.models.usuario import Usuario, SessaoUsuario
+from src.utils.senhas import obter_servico_senhas, ErroServicoSenhas
+from src.utils.limites import ip_cliente
 from datetime import datetime, timedelta
-import secrets
 
 auth_bp = Blueprint('auth', __name__)
 
+def servico_senhas_ocupado(erro):
+    """503 com Retry-After quando a fila de hash/verificação de senhas está cheia"""
+    resposta = jsonify({'erro': str(erro)})
+    resposta.headers['Retry-After'] = '1'
+    return resposta, 503
+
 def verificar_sessao():
     """Verifica se o usuário está logado"""
     token = request.headers.get('Authorization')
@@ -19,8 +26,16 @@ def verificar_sessao():
     if token.startswith('Bearer '):
         token = token[7:]
     
-    usuario = Usuario.query.filter_by(token_sessao=token, ativo=True).first()
-    return usuario
+    sessao = SessaoUsuario.buscar_valida(token)
+    if not sessao:
+        return None
+    
+    # Expiração deslizante, gravada no máximo a cada RENOVACAO_MINUTOS
+    if sessao.renovar():
+        db.session.commit()
+    
+    g.sessao_atual = sessao
+    return sessao.usuario
 
 def requer_login(f):
     """Decorator para rotas que requerem login"""
@@ -59,25 +74,37 @@ def login():
         # Buscar usuário
         usuario = Usuario.query.filter_by(email=email, ativo=True).first()
         
-        if not usuario or not usuario.verificar_senha(senha):
+        # Usuário inexistente também passa pela verificação, para não revelar quais e-mails existem
+        try:
+            senha_correta = obter_servico_senhas().verificar(usuario.senha_hash if usuario else None, senha)
+        except ErroServicoSenhas as e:
+            return servico_senhas_ocupado(e)
+        
+        if not usuario or not senha_correta:
             return jsonify({'erro': 'Email ou senha incorretos'}), 401
         
-        # Fazer login
-        usuario.fazer_login()
+        # Hash antigo (algoritmo ou custo mudou): refazer agora que temos a senha
+        if usuario.atualizar_hash_senha(senha):
+            print(f"🔐 Hash de senha atualizado para {usuario.email}")
+        
+        # Fazer login: nova sessão para este dispositivo
+        sessao = usuario.fazer_login(ip_cliente(request), request.headers.get('User-Agent'))
         db.session.commit()
         
         # Armazenar token na sessão
-        session['token_usuario'] = usuario.token_sessao
+        session['token_usuario'] = sessao.token
         session['usuario_id'] = usuario.id
         
         return jsonify({
             'sucesso': True,
             'mensagem': 'Login realizado com sucesso',
             'usuario': usuario.to_dict(),
-            'token': usuario.token_sessao
+            'token': sessao.token,
+            'expira_em': sessao.data_expiracao.isoformat()
         }), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'erro': str(e)}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
@@ -85,8 +112,8 @@ def login():
 def logout(usuario_atual):
     """Rota de logout"""
     try:
-        # Invalidar token
-        usuario_atual.token_sessao = secrets.token_urlsafe(32)
+        # Encerrar só a sessão deste dispositivo
+        SessaoUsuario.query.filter_by(id=g.sessao_atual.id).delete(synchronize_session=False)
         db.session.commit()
         
         # Limpar sessão
@@ -127,20 +154,21 @@ def alterar_senha(usuario_atual):
         if len(nova_senha) < 6:
             return jsonify({'erro': 'Nova senha deve ter pelo menos 6 caracteres'}), 400
         
-        # Alterar senha
-        usuario_atual.alterar_senha(nova_senha)
+        # Alterar senha (as sessões dos outros dispositivos são encerradas)
+        usuario_atual.alterar_senha(nova_senha, g.sessao_atual)
         db.session.commit()
         
-        # Atualizar token na sessão
-        session['token_usuario'] = usuario_atual.token_sessao
-        
         return jsonify({
             'sucesso': True,
             'mensagem': 'Senha alterada com sucesso',
-            'token': usuario_atual.token_sessao
+            'token': g.sessao_atual.token
         }), 200
         
+    except ErroServicoSenhas as e:
+        db.session.rollback()
+        return servico_senhas_ocupado(e)
     except Exception as e:
+        db.session.rollback()
         return jsonify({'erro': str(e)}), 500
 
 @auth_bp.route('/usuarios', methods=['GET'])
@@ -202,6 +230,9 @@ def criar_usuario(usuario_atual):
             'usuario': novo_usuario.to_dict()
         }), 201
         
+    except ErroServicoSenhas as e:
+        db.session.rollback()
+        return servico_senhas_ocupado(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'erro': str(e)}), 500
@@ -0,0 +1,37 @@
+from flask import Blueprint, request, jsonify
+from src.routes.auth import requer_login
+from src.routes.analises import obter_linhas_parametro
+from src.utils.busca import buscar, ErroBusca
+from datetime import datetime
+
+busca_bp = Blueprint('busca', __name__)
+
+@busca_bp.route('/busca', methods=['GET'])
+@requer_login
+def buscar_observacoes(usuario_atual):
+    """Busca textual nas observações das pesquisas ou dos relatórios, ordenada por relevância"""
+    try:
+        datas = {}
+        for nome in ('inicio', 'fim'):
+            valor = request.args.get(nome)
+            if valor:
+                try:
+                    datas[nome] = datetime.strptime(valor, '%Y-%m-%d').date()
+                except ValueError:
+                    return jsonify({'erro': f'Data inválida em {nome}. Use o formato AAAA-MM-DD'}), 400
+        
+        resultado = buscar(
+            request.args.get('q', ''),
+            fonte=request.args.get('fonte', 'pesquisas'),
+            linhas=obter_linhas_parametro(),
+            inicio=datas.get('inicio'),
+            fim=datas.get('fim'),
+            limite=request.args.get('limite', 20, type=int),
+            deslocamento=request.args.get('deslocamento', 0, type=int)
+        )
+        return jsonify(resultado), 200
+        
+    except ErroBusca as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
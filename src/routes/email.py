@@ -0,0 +1,125 @@
+from flask import Blueprint, request, jsonify, current_app
+from src.database import db
+from src.models.envio_email import EnvioEmail, GrupoEmail
+from src.routes.auth import requer_admin
+from src.utils.resumo_email import validar_grupo, enfileirar_resumos, relatorios_pendentes
+
+email_bp = Blueprint('email', __name__)
+
+@email_bp.route('/email/grupos', methods=['GET'])
+@requer_admin
+def listar_grupos(usuario_atual):
+    """Lista os grupos de linhas e seus destinatários (apenas admin)"""
+    try:
+        grupos = GrupoEmail.query.order_by(GrupoEmail.nome).all()
+        
+        return jsonify({
+            'grupos': [g.to_dict() for g in grupos],
+            'total': len(grupos),
+            'modo': current_app.config.get('EMAIL_MODO'),
+            'destinatarios_padrao': current_app.config['EMAIL_DESTINATARIOS']
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@email_bp.route('/email/grupos', methods=['POST'])
+@requer_admin
+def criar_grupo(usuario_atual):
+    """Cria um grupo de linhas com sua lista de destinatários (apenas admin)"""
+    try:
+        campos = validar_grupo(request.get_json() or {})
+        
+        if GrupoEmail.query.filter_by(nome=campos['nome']).first():
+            return jsonify({'erro': 'Já existe um grupo com este nome'}), 409
+        
+        grupo = GrupoEmail(**campos)
+        db.session.add(grupo)
+        db.session.commit()
+        
+        return jsonify({'mensagem': 'Grupo criado com sucesso', 'grupo': grupo.to_dict()}), 201
+        
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 500
+
+@email_bp.route('/email/grupos/<int:grupo_id>', methods=['PUT'])
+@requer_admin
+def atualizar_grupo(usuario_atual, grupo_id):
+    """Atualiza um grupo de e-mail (apenas admin)"""
+    try:
+        grupo = GrupoEmail.query.get_or_404(grupo_id)
+        dados = {**grupo.to_dict(), **(request.get_json() or {})}
+        campos = validar_grupo(dados)
+        
+        existente = GrupoEmail.query.filter_by(nome=campos['nome']).first()
+        if existente and existente.id != grupo.id:
+            return jsonify({'erro': 'Já existe um grupo com este nome'}), 409
+        
+        for campo, valor in campos.items():
+            setattr(grupo, campo, valor)
+        db.session.commit()
+        
+        return jsonify({'mensagem': 'Grupo atualizado com sucesso', 'grupo': grupo.to_dict()}), 200
+        
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 500
+
+@email_bp.route('/email/grupos/<int:grupo_id>', methods=['DELETE'])
+@requer_admin
+def remover_grupo(usuario_atual, grupo_id):
+    """Remove um grupo de e-mail (apenas admin)"""
+    try:
+        grupo = GrupoEmail.query.get_or_404(grupo_id)
+        db.session.delete(grupo)
+        db.session.commit()
+        
+        return jsonify({'mensagem': 'Grupo removido com sucesso'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 500
+
+@email_bp.route('/email/resumo', methods=['POST'])
+@requer_admin
+def enviar_resumo(usuario_atual):
+    """Enfileira agora o resumo com os relatórios pendentes, em qualquer modo (apenas admin)"""
+    try:
+        pendentes = len(relatorios_pendentes())
+        envios = enfileirar_resumos(forcar=True)
+        
+        return jsonify({
+            'mensagem': f'{len(envios)} resumo(s) enfileirado(s)' if envios else 'Nenhum relatório pendente',
+            'relatorios': pendentes,
+            'envios': [e.to_dict() for e in envios]
+        }), 202 if envios else 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 500
+
+@email_bp.route('/email/envios', methods=['GET'])
+@requer_admin
+def listar_envios(usuario_atual):
+    """Fila de e-mails com o status de entrega (apenas admin)"""
+    try:
+        status = request.args.get('status')
+        limite = min(request.args.get('limite', 50, type=int), 500)
+        
+        query = EnvioEmail.query
+        if status:
+            query = query.filter_by(status=status)
+        envios = query.order_by(EnvioEmail.id.desc()).limit(limite).all()
+        
+        return jsonify({
+            'envios': [e.to_dict() for e in envios],
+            'total': len(envios)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
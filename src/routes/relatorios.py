@@ -2,8 +2,14 @@ from flask import Blueprint, request, jsonify, send_file
 from src.database import db
 from src.models.relatorio import Relatorio
 from src.models.pesquisa import Pesquisa
-from src.routes.auth import requer_login
+from src.models.pesquisa import ContadorLinha
+from src.models.politica_relatorio import PoliticaRelatorio
+from src.models.envio_email import EnvioEmail
+from src.routes.auth import requer_login, requer_admin
 from src.utils.geradores_simples import gerar_excel_simples, gerar_pdf_simples, gerar_word_simples
+from src.utils.compactacao import agregados_por_linha
+from src.utils.histogramas import resumir_dimensoes
+from src.utils.politicas_relatorio import validar_politica, obter_politica
 from datetime import datetime
 import io
 import json
@@ -59,6 +65,10 @@ def obter_relatorio(usuario_atual, relatorio_id):
         dados_completos = relatorio.to_dict()
         dados_completos['pesquisas'] = relatorio.get_dados_pesquisas()
         dados_completos['observacoes_lista'] = relatorio.get_observacoes_lista()
+        dados_completos['distribuicoes'] = resumir_dimensoes(relatorio.get_histogramas())
+        dados_completos['envios_email'] = [
+            e.to_dict() for e in EnvioEmail.query.filter_by(relatorio_id=relatorio_id).order_by(EnvioEmail.id)
+        ]
         
         return jsonify(dados_completos), 200
         
@@ -80,13 +90,18 @@ def obter_estatisticas_relatorios(usuario_atual):
             db.func.max(Relatorio.data_criacao).label('ultimo_relatorio')
         ).group_by(Relatorio.linha_numero).all()
         
+        # Distribuição das notas por linha, a partir dos histogramas consolidados
+        agregados = agregados_por_linha([linha for linha, _, _, _ in relatorios_por_linha])
+        
         linhas_stats = []
         for linha, total, media, ultimo in relatorios_por_linha:
+            agregado = agregados.get(linha)
             linhas_stats.append({
                 'linha': linha,
                 'total_relatorios': total,
                 'media_geral': round(media, 1) if media else 0,
-                'ultimo_relatorio': ultimo.isoformat() if ultimo else None
+                'ultimo_relatorio': ultimo.isoformat() if ultimo else None,
+                'distribuicoes': resumir_dimensoes(agregado['histogramas']) if agregado else None
             })
         
         # Ordenar por média geral (pior primeiro para destacar problemas)
@@ -101,6 +116,56 @@ def obter_estatisticas_relatorios(usuario_atual):
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
+@relatorios_bp.route('/relatorios/politicas', methods=['GET'])
+@requer_login
+def listar_politicas(usuario_atual):
+    """Lista as políticas de geração de relatórios configuradas por linha"""
+    try:
+        politicas = PoliticaRelatorio.query.order_by(PoliticaRelatorio.linha_numero).all()
+        
+        return jsonify({
+            'politicas': [p.to_dict() for p in politicas],
+            'total': len(politicas)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@relatorios_bp.route('/relatorios/politicas/<linha_numero>', methods=['PUT'])
+@requer_admin
+def definir_politica(usuario_atual, linha_numero):
+    """Define a política de geração de relatórios de uma linha (apenas admin)"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'erro': 'Dados não fornecidos'}), 400
+        
+        try:
+            campos = validar_politica(data)
+        except ValueError as e:
+            return jsonify({'erro': str(e)}), 400
+        
+        # O estado da janela (última pesquisa coberta) é preservado ao trocar de política,
+        # para que nenhuma pesquisa seja repetida ou pulada; aqui não há pesquisa nova na transação
+        contador = ContadorLinha.query.filter_by(linha_numero=linha_numero).first()
+        politica = obter_politica(linha_numero, contador.contador if contador else 0, pesquisa_pendente=False)
+        if politica.tipo != campos['tipo'] or politica.periodo != campos['periodo']:
+            politica.inicio_periodo_atual = None
+        for campo, valor in campos.items():
+            setattr(politica, campo, valor)
+        
+        db.session.commit()
+        
+        return jsonify({
+            'sucesso': True,
+            'mensagem': 'Política de relatório atualizada com sucesso',
+            'politica': politica.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 500
+
 @relatorios_bp.route('/relatorios/<int:relatorio_id>/download/<formato>', methods=['GET'])
 @requer_login
 def download_relatorio(usuario_atual, relatorio_id, formato):
@@ -131,6 +196,7 @@ def download_json(relatorio):
     dados = relatorio.to_dict()
     dados['pesquisas'] = relatorio.get_dados_pesquisas()
     dados['observacoes_lista'] = relatorio.get_observacoes_lista()
+    dados['distribuicoes'] = resumir_dimensoes(relatorio.get_histogramas())
     
     # Criar arquivo temporário
     with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False, encoding='utf-8') as f:
@@ -0,0 +1,282 @@
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+from src.database import db, inserir_ou_ignorar
+from src.models.agendamento import TarefaAgendada, ExecucaoTarefa
+
+# Limite de ocorrências contadas como perdidas (evita laços longos após muito tempo parado)
+MAX_PERDIDAS_CONTADAS = 1000
+
+
+class ExpressaoCron:
+    """Expressão cron de 5 campos: minuto hora dia-do-mês mês dia-da-semana.
+
+    Cada campo aceita '*', valores ('5'), listas ('1,15'), intervalos ('1-5')
+    e passos ('*/10', '8-18/2'). Dia da semana: 0 ou 7 = domingo.
+    """
+
+    LIMITES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, texto):
+        campos = texto.split()
+        if len(campos) != 5:
+            raise ValueError(f'Expressão cron inválida: {texto!r}')
+
+        self.texto = texto
+        valores = [self._interpretar(campo, *limites) for campo, limites in zip(campos, self.LIMITES)]
+        self.minutos, self.horas, self.dias, self.meses, semana = valores
+        self.dias_semana = {d % 7 for d in semana}
+        self.dia_restrito = campos[2] != '*'
+        self.semana_restrita = campos[4] != '*'
+
+    @staticmethod
+    def _interpretar(campo, minimo, maximo):
+        valores = set()
+        for parte in campo.split(','):
+            passo = 1
+            if '/' in parte:
+                parte, passo = parte.split('/')
+                passo = int(passo)
+            if parte == '*':
+                inicio, fim = minimo, maximo
+            elif '-' in parte:
+                inicio, fim = (int(v) for v in parte.split('-'))
+            else:
+                inicio = fim = int(parte)
+            if inicio < minimo or fim > maximo or inicio > fim or passo < 1:
+                raise ValueError(f'Campo cron fora do intervalo: {campo!r}')
+            valores.update(range(inicio, fim + 1, passo))
+        return valores
+
+    def _dia_confere(self, momento):
+        dia_semana = (momento.weekday() + 1) % 7
+        no_mes = momento.day in self.dias
+        na_semana = dia_semana in self.dias_semana
+        # Como no cron: se ambos os campos são restritos, basta um deles conferir
+        if self.dia_restrito and self.semana_restrita:
+            return no_mes or na_semana
+        return no_mes and na_semana
+
+    def proxima(self, apos):
+        """Primeiro instante que confere com a expressão, estritamente depois de `apos`"""
+        momento = apos.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = momento + timedelta(days=366 * 5)
+
+        while momento < limite:
+            if momento.month not in self.meses:
+                ano, mes = (momento.year + 1, 1) if momento.month == 12 else (momento.year, momento.month + 1)
+                momento = momento.replace(year=ano, month=mes, day=1, hour=0, minute=0)
+            elif not self._dia_confere(momento):
+                momento = momento.replace(hour=0, minute=0) + timedelta(days=1)
+            elif momento.hour not in self.horas:
+                momento = momento.replace(minute=0) + timedelta(hours=1)
+            elif momento.minute not in self.minutos:
+                momento += timedelta(minutes=1)
+            else:
+                return momento
+
+        raise ValueError(f'Expressão cron sem ocorrências: {self.texto!r}')
+
+    def contar_ocorrencias(self, apos, ate, maximo=MAX_PERDIDAS_CONTADAS):
+        """Quantas ocorrências existem em (apos, ate]"""
+        total = 0
+        momento = self.proxima(apos)
+        while momento <= ate and total < maximo:
+            total += 1
+            momento = self.proxima(momento)
+        return total
+
+
+class Agendador:
+    """Agendador de tarefas com eleição de líder via lease no banco.
+
+    Todos os workers (e nós) rodam o mesmo laço, mas cada execução só acontece
+    no worker que conseguir o lease da tarefa com um UPDATE condicional, então
+    cada tarefa roda exatamente uma vez por horário agendado. Enquanto a tarefa
+    roda, o líder renova o lease a cada terço da duração; o fim da execução só
+    é gravado se o lease ainda for dele.
+    """
+
+    def __init__(self, app, intervalo=30, duracao_lease=600):
+        self.app = app
+        self.intervalo = intervalo
+        self.duracao_lease = timedelta(seconds=duracao_lease)
+        self.tarefas = {}
+        # Expressões já gravadas em tarefas_agendadas por este worker (sincroniza só o que mudou)
+        self._sincronizadas = {}
+        self.id_worker = self._identificar()
+        self._parar = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _identificar():
+        return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+
+    def registrar(self, nome, expressao, funcao):
+        """Registra uma tarefa; `funcao` é chamada sem argumentos dentro do app context"""
+        self.tarefas[nome] = (ExpressaoCron(expressao), funcao)
+
+    def tarefa(self, nome, expressao):
+        """Decorator equivalente a registrar()"""
+        def decorator(funcao):
+            self.registrar(nome, expressao, funcao)
+            return funcao
+        return decorator
+
+    def _sincronizar(self, agora):
+        """Garante que cada tarefa registrada tem sua linha em tarefas_agendadas.
+
+        Escreve só na primeira passada do worker e quando uma expressão
+        registrada muda, não a cada volta do laço.
+        """
+        pendentes = {nome: cron for nome, (cron, _) in self.tarefas.items()
+                     if self._sincronizadas.get(nome) != cron.texto}
+        if not pendentes:
+            return
+        for nome, cron in pendentes.items():
+            inserir_ou_ignorar(
+                TarefaAgendada.__table__,
+                nome=nome,
+                expressao=cron.texto,
+                proxima_execucao=cron.proxima(agora),
+                execucoes_perdidas=0
+            )
+            # Expressão alterada no código: recalcular o próximo horário
+            TarefaAgendada.query.filter(
+                TarefaAgendada.nome == nome,
+                TarefaAgendada.expressao != cron.texto
+            ).update({'expressao': cron.texto, 'proxima_execucao': cron.proxima(agora)},
+                     synchronize_session=False)
+        db.session.commit()
+        self._sincronizadas.update((nome, cron.texto) for nome, cron in pendentes.items())
+
+    def _adquirir_lease(self, nome, agora):
+        """Tenta se tornar líder da tarefa; só um worker consegue por horário agendado"""
+        atualizadas = TarefaAgendada.query.filter(
+            TarefaAgendada.nome == nome,
+            TarefaAgendada.proxima_execucao <= agora,
+            db.or_(TarefaAgendada.lease_ate.is_(None), TarefaAgendada.lease_ate < agora)
+        ).update({'lider': self.id_worker, 'lease_ate': agora + self.duracao_lease},
+                 synchronize_session=False)
+        db.session.commit()
+        return atualizadas == 1
+
+    def _do_lider(self, nome):
+        return TarefaAgendada.query.filter(TarefaAgendada.nome == nome, TarefaAgendada.lider == self.id_worker)
+
+    def _manter_lease(self, nome, parar):
+        """Thread da execução: estende o lease enquanto a tarefa roda (sessão própria, no app context)"""
+        with self.app.app_context():
+            try:
+                while not parar.wait(self.duracao_lease.total_seconds() / 3):
+                    try:
+                        renovado = self._do_lider(nome).update(
+                            {'lease_ate': datetime.now() + self.duracao_lease}, synchronize_session=False
+                        )
+                        db.session.commit()
+                    except Exception as e:
+                        # Ex.: banco ocupado pela própria tarefa; tenta de novo na próxima volta
+                        db.session.rollback()
+                        print(f"❌ ERRO ao renovar o lease da tarefa {nome}: {str(e)}")
+                        continue
+                    if not renovado:
+                        print(f"⚠️ Tarefa {nome}: lease perdido durante a execução")
+                        return
+            finally:
+                db.session.remove()
+
+    def _executar(self, nome, agora):
+        cron, funcao = self.tarefas[nome]
+        tarefa = TarefaAgendada.query.filter_by(nome=nome).one()
+        agendada_para = tarefa.proxima_execucao
+
+        # Execuções perdidas: horários que passaram sem ninguém executar
+        perdidas = cron.contar_ocorrencias(agendada_para, agora)
+        if perdidas:
+            print(f"⚠️ Tarefa {nome}: {perdidas} execução(ões) perdida(s) desde {agendada_para.isoformat()}")
+
+        execucao = ExecucaoTarefa(nome=nome, executor=self.id_worker, agendada_para=agendada_para,
+                                  inicio=datetime.now(), perdidas=perdidas)
+        db.session.add(execucao)
+        db.session.commit()
+
+        inicio = time.perf_counter()
+        erro = None
+        parar_renovacao = threading.Event()
+        renovacao = threading.Thread(target=self._manter_lease, args=(nome, parar_renovacao),
+                                     name=f'lease-{nome}', daemon=True)
+        renovacao.start()
+        try:
+            funcao()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            erro = traceback.format_exc()
+            print(f"❌ ERRO na tarefa agendada {nome}: {erro.splitlines()[-1]}")
+        finally:
+            parar_renovacao.set()
+            renovacao.join()
+        duracao_ms = int((time.perf_counter() - inicio) * 1000)
+
+        execucao = db.session.get(ExecucaoTarefa, execucao.id)
+        execucao.fim = datetime.now()
+        execucao.duracao_ms = duracao_ms
+        execucao.sucesso = erro is None
+        execucao.erro = erro
+
+        # Só o dono do lease fecha a execução: se outro worker o assumiu, o estado é dele
+        finalizada = self._do_lider(nome).update({
+            'proxima_execucao': cron.proxima(max(agora, datetime.now())),
+            'lease_ate': None,
+            'ultima_execucao': execucao.inicio,
+            'ultima_duracao_ms': duracao_ms,
+            'ultimo_sucesso': erro is None,
+            'execucoes_perdidas': TarefaAgendada.execucoes_perdidas + perdidas
+        }, synchronize_session=False)
+        db.session.commit()
+        if not finalizada:
+            print(f"⚠️ Tarefa {nome}: lease assumido por outro worker, estado da tarefa não atualizado")
+        return execucao
+
+    def executar_pendentes(self, agora=None):
+        """Executa as tarefas vencidas cujo lease este worker conseguir; retorna os nomes executados"""
+        executadas = []
+        with self.app.app_context():
+            agora = agora or datetime.now()
+            try:
+                self._sincronizar(agora)
+                for nome in self.tarefas:
+                    if self._adquirir_lease(nome, agora):
+                        self._executar(nome, agora)
+                        executadas.append(nome)
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ ERRO no agendador: {str(e)}")
+            finally:
+                db.session.remove()
+        return executadas
+
+    def iniciar(self):
+        """Inicia o laço do agendador em uma thread daemon"""
+        if self._thread and self._thread.is_alive():
+            return
+        # Montado em outro processo (antes do fork do gunicorn): cada worker tem sua identidade
+        if f':{os.getpid()}:' not in self.id_worker:
+            self.id_worker = self._identificar()
+
+        def laco():
+            while not self._parar.is_set():
+                self.executar_pendentes()
+                self._parar.wait(self.intervalo)
+
+        self._thread = threading.Thread(target=laco, name='agendador', daemon=True)
+        self._thread.start()
+        print(f"⏰ Agendador iniciado ({len(self.tarefas)} tarefas) no worker {self.id_worker}")
+
+    def parar(self):
+        self._parar.set()
@@ -0,0 +1,124 @@
+import math
+import operator
+
+from src.models.pesquisa import DIMENSOES
+
+# NumPy é opcional: sem ele, o cálculo cai para Python puro
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+
+def colunas_de_pesquisas(pesquisas):
+    """Converte uma lista de pesquisas (objetos ou dicionários) em colunas"""
+    colunas = {d: [] for d in DIMENSOES}
+    colunas['data_criacao'] = []
+
+    # Única passada pelos objetos; o restante trabalha só com as colunas
+    for p in pesquisas:
+        if isinstance(p, dict):
+            for d in DIMENSOES:
+                colunas[d].append(p[d])
+            colunas['data_criacao'].append(p.get('data_criacao'))
+        else:
+            for d in DIMENSOES:
+                colunas[d].append(getattr(p, d))
+            colunas['data_criacao'].append(p.data_criacao)
+
+    return colunas
+
+
+def _resultado(total, somas, somas_quadrados, minimos, maximos, inicio=None, fim=None):
+    """Monta o resultado a partir das somas por dimensão"""
+    medias, desvios = {}, {}
+    for d in DIMENSOES:
+        media = somas[d] / total
+        # Desvio padrão amostral (n - 1)
+        variancia = (somas_quadrados[d] - total * media * media) / (total - 1) if total > 1 else 0.0
+        medias[d] = media
+        desvios[d] = math.sqrt(max(variancia, 0.0))
+
+    return {
+        'total': total,
+        'medias': medias,
+        'desvios': desvios,
+        'minimos': minimos,
+        'maximos': maximos,
+        'media_geral': sum(medias.values()) / len(DIMENSOES),
+        'periodo_inicio': inicio,
+        'periodo_fim': fim
+    }
+
+
+def _agregar_python(colunas, total):
+    somas, somas_quadrados, minimos, maximos = {}, {}, {}, {}
+
+    # Funções nativas percorrem cada coluna em C, bem mais rápido que um laço Python
+    for d in DIMENSOES:
+        coluna = colunas[d]
+        somas[d] = sum(coluna)
+        somas_quadrados[d] = sum(map(operator.mul, coluna, coluna))
+        minimos[d] = min(coluna)
+        maximos[d] = max(coluna)
+
+    return somas, somas_quadrados, minimos, maximos
+
+
+def _agregar_numpy(colunas, total):
+    matriz = np.vstack([np.asarray(colunas[d], dtype=np.int64) for d in DIMENSOES])
+    somas_v = matriz.sum(axis=1)
+    somas_q_v = np.einsum('ij,ij->i', matriz, matriz)
+    minimos_v = matriz.min(axis=1)
+    maximos_v = matriz.max(axis=1)
+
+    return (
+        {d: int(somas_v[i]) for i, d in enumerate(DIMENSOES)},
+        {d: int(somas_q_v[i]) for i, d in enumerate(DIMENSOES)},
+        {d: int(minimos_v[i]) for i, d in enumerate(DIMENSOES)},
+        {d: int(maximos_v[i]) for i, d in enumerate(DIMENSOES)},
+    )
+
+
+def agregar(colunas, usar_numpy=None):
+    """Contagem, médias, desvios, mínimos/máximos e período de um lote em colunas.
+
+    Retorna None para um lote vazio. `usar_numpy=None` usa NumPy quando disponível.
+    """
+    total = len(colunas[DIMENSOES[0]])
+    if not total:
+        return None
+
+    if usar_numpy is None:
+        usar_numpy = np is not None
+    calcular = _agregar_numpy if usar_numpy and np is not None else _agregar_python
+    somas, somas_quadrados, minimos, maximos = calcular(colunas, total)
+
+    datas = [d for d in colunas.get('data_criacao', []) if d is not None]
+    inicio = min(datas) if datas else None
+    fim = max(datas) if datas else None
+
+    return _resultado(total, somas, somas_quadrados, minimos, maximos, inicio, fim)
+
+
+def agregar_pesquisas(pesquisas, usar_numpy=None):
+    """Atalho para agregar uma lista de pesquisas"""
+    return agregar(colunas_de_pesquisas(pesquisas), usar_numpy)
+
+
+def agregar_histogramas(histogramas):
+    """Mesmo resultado de agregar(), calculado a partir de {dimensao: histograma 1..10}"""
+    total = sum(histogramas[DIMENSOES[0]])
+    if not total:
+        return None
+
+    somas, somas_quadrados, minimos, maximos = {}, {}, {}, {}
+    for d in DIMENSOES:
+        histograma = histogramas[d]
+        somas[d] = sum(nota * qtd for nota, qtd in enumerate(histograma, 1))
+        somas_quadrados[d] = sum(nota * nota * qtd for nota, qtd in enumerate(histograma, 1))
+        notas_presentes = [nota for nota, qtd in enumerate(histograma, 1) if qtd]
+        minimos[d] = notas_presentes[0]
+        maximos[d] = notas_presentes[-1]
+
+    return _resultado(total, somas, somas_quadrados, minimos, maximos)
@@ -0,0 +1,226 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from src.database import db
+from src.models.quarentena import PesquisaQuarentena
+from src.utils.indice_linhas import normalizar_texto
+from src.utils.limites import ip_cliente
+
+JANELA_PADRAO_MINUTOS = 10
+FATIAS = 10
+
+# Capacidade de cada fatia e taxa de falso positivo de cada filtro: com 10 fatias
+# consultadas juntas, a chance de marcar uma pesquisa legítima fica em ~0,1%
+CAPACIDADE_FATIA = 20000
+TAXA_ERRO_FATIA = 0.0001
+
+# Envios em quarentena são descartados depois deste prazo
+DIAS_QUARENTENA = 30
+
+# Observações curtas ("ok", "lotado") se repetem naturalmente entre pessoas diferentes
+TAMANHO_MINIMO_CONTEUDO = 20
+
+# Envios da mesma impressão para a mesma linha tolerados na janela: atrás de um CGNAT
+# de operadora, vários passageiros da mesma linha podem ter o mesmo IP e User-Agent
+REPETICOES_PADRAO = 5
+
+
+class FiltroBloom:
+    """Conjunto probabilístico de tamanho fixo: sem falsos negativos, falsos positivos raros"""
+
+    def __init__(self, capacidade, taxa_erro):
+        self.bits = max(8, int(-capacidade * math.log(taxa_erro) / math.log(2) ** 2))
+        self.funcoes = max(1, round(self.bits / capacidade * math.log(2)))
+        self.dados = bytearray((self.bits + 7) // 8)
+        self.itens = 0
+
+    def posicoes(self, chave):
+        # Hashing duplo (Kirsch–Mitzenmacher): k posições a partir de um único digest
+        digest = hashlib.blake2b(chave.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [((h1 + i * h2) % self.bits) for i in range(self.funcoes)]
+
+    def adicionar(self, posicoes):
+        dados = self.dados
+        for p in posicoes:
+            dados[p >> 3] |= 1 << (p & 7)
+        self.itens += 1
+
+    def contem(self, posicoes):
+        dados = self.dados
+        for p in posicoes:
+            if not dados[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def contar(self, posicoes):
+        return 1 if self.contem(posicoes) else 0
+
+    def limpar(self):
+        self.dados[:] = bytes(len(self.dados))
+        self.itens = 0
+
+
+class FiltroContagem(FiltroBloom):
+    """Filtro de Bloom com um contador (byte) por posição: estima quantas vezes a
+    chave entrou, nunca para menos (o mínimo dos contadores das suas posições)"""
+
+    def __init__(self, capacidade, taxa_erro):
+        super().__init__(capacidade, taxa_erro)
+        self.dados = bytearray(self.bits)
+
+    def adicionar(self, posicoes):
+        dados = self.dados
+        for p in posicoes:
+            if dados[p] < 255:
+                dados[p] += 1
+        self.itens += 1
+
+    def contar(self, posicoes):
+        dados = self.dados
+        menor = 255
+        for p in posicoes:
+            valor = dados[p]
+            if not valor:
+                return 0  # Como em contem: a maioria das consultas para na primeira posição zerada
+            if valor < menor:
+                menor = valor
+        return menor
+
+    def contem(self, posicoes):
+        return self.contar(posicoes) > 0
+
+
+class FiltroBloomRotativo:
+    """"Visto nos últimos N segundos" com memória fixa.
+
+    A janela é dividida em fatias, cada uma com o seu filtro de Bloom (todos
+    do mesmo tamanho, então as posições de uma chave são calculadas uma vez);
+    a chave entra na fatia atual e a consulta soma todas. Quando o tempo
+    avança, a fatia mais antiga é zerada e reaproveitada. Se uma rajada lotar
+    a fatia atual antes do tempo, ela também avança: a janela encurta, mas a
+    taxa de falsos positivos não passa da calculada.
+    """
+
+    def __init__(self, janela_segundos, fatias=FATIAS, capacidade=CAPACIDADE_FATIA, taxa_erro=TAXA_ERRO_FATIA,
+                 relogio=time.monotonic, classe=FiltroBloom):
+        self.duracao_fatia = janela_segundos / fatias
+        self.capacidade = capacidade
+        self.relogio = relogio
+        self.filtros = [classe(capacidade, taxa_erro) for _ in range(fatias)]
+        self.atual = 0
+        self.inicio_fatia = relogio()
+        self._lock = threading.Lock()
+
+    def _avancar(self):
+        self.atual = (self.atual + 1) % len(self.filtros)
+        self.filtros[self.atual].limpar()
+
+    def _rotacionar(self):
+        agora = self.relogio()
+        vencidas = int((agora - self.inicio_fatia) // self.duracao_fatia)
+        if vencidas <= 0:
+            return
+        for _ in range(min(vencidas, len(self.filtros))):
+            self._avancar()
+        self.inicio_fatia += vencidas * self.duracao_fatia
+
+    def contar(self, chave):
+        """Vezes que a chave entrou na janela (com FiltroBloom, em quantas fatias); não registra nada"""
+        posicoes = self.filtros[0].posicoes(chave)
+        with self._lock:
+            self._rotacionar()
+            return sum(filtro.contar(posicoes) for filtro in self.filtros if filtro.itens)
+
+    def adicionar(self, chave):
+        posicoes = self.filtros[0].posicoes(chave)
+        with self._lock:
+            self._rotacionar()
+            if self.filtros[self.atual].itens >= self.capacidade:
+                self._avancar()
+                self.inicio_fatia = self.relogio()
+            self.filtros[self.atual].adicionar(posicoes)
+
+    def memoria_bytes(self):
+        return sum(len(f.dados) for f in self.filtros)
+
+
+def impressao_cliente(requisicao):
+    """Hash do IP do cliente (ip_cliente) com User-Agent e idioma"""
+    partes = [ip_cliente(requisicao), requisicao.headers.get('User-Agent', ''), requisicao.headers.get('Accept-Language', '')]
+    return hashlib.sha256('|'.join(partes).encode('utf-8')).hexdigest()[:32]
+
+
+def hash_conteudo(linha_numero, observacoes):
+    """Hash das observações normalizadas (sem acentos, caixa e espaços extras) da linha"""
+    texto = ' '.join(normalizar_texto(observacoes or '').split())
+    if len(texto) < TAMANHO_MINIMO_CONTEUDO:
+        return None
+    return hashlib.sha256(f'{linha_numero}|{texto}'.encode('utf-8')).hexdigest()[:32]
+
+
+class DetectorSpam:
+    """Marca envios repetidos: a mesma impressão avaliando a mesma linha mais de
+    `repeticoes` vezes dentro da janela, ou o mesmo texto de observação enviado
+    para a linha por qualquer cliente.
+
+    O estado é do processo (cada worker tem o seu), o que basta para barrar
+    rajadas de um mesmo robô sem ir ao banco a cada envio. `verificar` só
+    consulta; o envio entra nos filtros por `registrar`, depois do commit,
+    então uma tentativa que falhou (500, rollback) não marca a seguinte.
+    """
+
+    def __init__(self, janela_minutos=JANELA_PADRAO_MINUTOS, repeticoes=REPETICOES_PADRAO, relogio=time.monotonic):
+        self.janela_minutos = janela_minutos
+        self.repeticoes = repeticoes
+        self.clientes = FiltroBloomRotativo(janela_minutos * 60, relogio=relogio, classe=FiltroContagem)
+        self.conteudos = FiltroBloomRotativo(janela_minutos * 60, relogio=relogio)
+
+    def verificar(self, impressao, linha_numero, observacoes):
+        """Motivo para colocar o envio em quarentena, ou None"""
+        if self.clientes.contar(f'{impressao}|{linha_numero}') >= self.repeticoes:
+            return 'cliente_repetido'
+        conteudo = hash_conteudo(linha_numero, observacoes)
+        if conteudo is not None and self.conteudos.contar(conteudo):
+            return 'conteudo_repetido'
+        return None
+
+    def registrar(self, impressao, linha_numero, observacoes):
+        """Conta um envio já gravado (pesquisa ou quarentena)"""
+        self.clientes.adicionar(f'{impressao}|{linha_numero}')
+        conteudo = hash_conteudo(linha_numero, observacoes)
+        if conteudo is not None:
+            self.conteudos.adicionar(conteudo)
+
+
+_detector_lock = threading.Lock()
+
+
+def obter_detector(janela_minutos=JANELA_PADRAO_MINUTOS, repeticoes=REPETICOES_PADRAO):
+    """Detector da aplicação atual (instâncias diferentes do app não compartilham estado)"""
+    detector = current_app.extensions.get('detector_spam')
+    if detector is None or detector.janela_minutos != janela_minutos:
+        with _detector_lock:
+            detector = current_app.extensions.get('detector_spam')
+            if detector is None or detector.janela_minutos != janela_minutos:
+                detector = current_app.extensions['detector_spam'] = DetectorSpam(janela_minutos, repeticoes)
+    detector.repeticoes = repeticoes
+    return detector
+
+
+def limpar_quarentena(agora=None):
+    """Remove de uma vez os envios em quarentena mais antigos que DIAS_QUARENTENA"""
+    limite = (agora or datetime.now()) - timedelta(days=DIAS_QUARENTENA)
+    removidos = PesquisaQuarentena.query.filter(
+        PesquisaQuarentena.data_criacao < limite
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    if removidos:
+        print(f"🧹 {removidos} envio(s) em quarentena removidos")
+    return removidos
@@ -0,0 +1,197 @@
+import re
+from datetime import datetime, timedelta
+
+from markupsafe import escape
+
+from src.database import db
+
+# Tabelas com texto livre pesquisável: tabela -> coluna de texto
+FONTES = {
+    'pesquisas': ('pesquisa', 'observacoes'),
+    'relatorios': ('relatorios', 'observacoes'),
+}
+
+MAX_RESULTADOS = 100
+MAX_TERMOS = 10
+
+# Marcadores do destaque vindos do banco (uso privado do Unicode); viram <mark> depois de escapar o texto
+INICIO_DESTAQUE = '\ue000'
+FIM_DESTAQUE = '\ue001'
+
+
+class ErroBusca(ValueError):
+    """Parâmetros de busca inválidos"""
+
+
+def _sqlite_tem_fts5(conexao):
+    try:
+        conexao.exec_driver_sql("CREATE VIRTUAL TABLE IF NOT EXISTS temp.teste_fts5 USING fts5(x)")
+        conexao.exec_driver_sql("DROP TABLE IF EXISTS temp.teste_fts5")
+        return True
+    except Exception:
+        return False
+
+
+def criar_indices_busca():
+    """Cria o índice invertido das observações, atualizado pelo próprio banco a cada INSERT.
+
+    - PostgreSQL: índice GIN sobre to_tsvector('portuguese', observacoes);
+    - SQLite: tabela FTS5 externa (content=) mantida por triggers.
+    """
+    engine = db.engine
+    dialeto = engine.dialect.name
+
+    with engine.begin() as conexao:
+        if dialeto == 'postgresql':
+            for tabela, coluna in FONTES.values():
+                conexao.exec_driver_sql(
+                    f"CREATE INDEX IF NOT EXISTS ix_{tabela}_{coluna}_fts ON {tabela} "
+                    f"USING GIN (to_tsvector('portuguese', coalesce({coluna}, '')))"
+                )
+            return True
+
+        if dialeto != 'sqlite' or not _sqlite_tem_fts5(conexao):
+            print("⚠️ Busca textual sem índice: o banco não suporta tsvector nem FTS5")
+            return False
+
+        for tabela, coluna in FONTES.values():
+            fts = f'{tabela}_fts'
+            existia = conexao.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,)
+            ).first()
+            conexao.exec_driver_sql(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                f"{coluna}, content='{tabela}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            )
+            conexao.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+                f"INSERT INTO {fts}(rowid, {coluna}) VALUES (new.id, new.{coluna}); END"
+            )
+            conexao.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {coluna}) VALUES ('delete', old.id, old.{coluna}); END"
+            )
+            conexao.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {coluna} ON {tabela} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {coluna}) VALUES ('delete', old.id, old.{coluna}); "
+                f"INSERT INTO {fts}(rowid, {coluna}) VALUES (new.id, new.{coluna}); END"
+            )
+            if not existia:
+                # Indexar o que já existia antes da tabela FTS
+                conexao.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    return True
+
+
+def extrair_termos(texto):
+    """Separa a busca em termos e frases entre aspas: 'ar "motorista grosso"' -> ['ar', 'motorista grosso']"""
+    termos = []
+    for frase, palavra in re.findall(r'"([^"]*)"|(\S+)', texto or ''):
+        # Só letras e números chegam ao banco; o resto vira separador
+        termo = ' '.join(re.findall(r'\w+', frase or palavra))
+        if termo:
+            termos.append(termo)
+    if not termos:
+        raise ErroBusca('Informe o texto a buscar')
+    if len(termos) > MAX_TERMOS:
+        raise ErroBusca(f'Use no máximo {MAX_TERMOS} termos')
+    return termos
+
+
+def _consulta_fts5(termos):
+    """Expressão MATCH do FTS5: todos os termos, cada frase entre aspas"""
+    return ' '.join(f'"{termo}"' for termo in termos)
+
+
+def _consulta_tsquery(termos):
+    """Texto para websearch_to_tsquery: frases entre aspas, termos combinados com E"""
+    return ' '.join(f'"{termo}"' if ' ' in termo else termo for termo in termos)
+
+
+def _filtros(alias, linhas, inicio, fim, parametros):
+    condicoes = []
+    if linhas:
+        nomes = []
+        for i, linha in enumerate(linhas):
+            parametros[f'linha{i}'] = linha
+            nomes.append(f':linha{i}')
+        condicoes.append(f"{alias}.linha_numero IN ({', '.join(nomes)})")
+    if inicio:
+        parametros['inicio'] = datetime.combine(inicio, datetime.min.time())
+        condicoes.append(f"{alias}.data_criacao >= :inicio")
+    if fim:
+        parametros['fim'] = datetime.combine(fim + timedelta(days=1), datetime.min.time())
+        condicoes.append(f"{alias}.data_criacao < :fim")
+    return ''.join(f' AND {c}' for c in condicoes)
+
+
+def trecho_html(trecho):
+    """Trecho pronto para HTML: o texto das observações é escapado e só os destaques viram <mark>"""
+    if trecho is None:
+        return None
+    return str(escape(trecho)).replace(INICIO_DESTAQUE, '<mark>').replace(FIM_DESTAQUE, '</mark>')
+
+
+def buscar(texto, fonte='pesquisas', linhas=None, inicio=None, fim=None, limite=20, deslocamento=0):
+    """Busca nas observações, ordenada por relevância (e data, em empates)"""
+    if fonte not in FONTES:
+        raise ErroBusca(f'Fonte inválida. Use: {", ".join(FONTES)}')
+    if inicio and fim and inicio > fim:
+        raise ErroBusca('Data inicial deve ser anterior à data final')
+
+    termos = extrair_termos(texto)
+    tabela, coluna = FONTES[fonte]
+    limite = max(1, min(limite, MAX_RESULTADOS))
+    parametros = {'limite': limite, 'deslocamento': max(deslocamento, 0)}
+    filtros = _filtros('t', linhas, inicio, fim, parametros)
+    dialeto = db.engine.dialect.name
+
+    if dialeto == 'postgresql':
+        parametros['consulta'] = _consulta_tsquery(termos)
+        parametros['opcoes_trecho'] = f'StartSel={INICIO_DESTAQUE}, StopSel={FIM_DESTAQUE}, MaxFragments=2, MaxWords=20'
+        vetor = f"to_tsvector('portuguese', coalesce(t.{coluna}, ''))"
+        sql = f"""
+            SELECT t.id, t.linha_numero, t.data_criacao,
+                   ts_rank({vetor}, q) AS relevancia,
+                   ts_headline('portuguese', t.{coluna}, q, :opcoes_trecho) AS trecho,
+                   count(*) OVER () AS total
+            FROM {tabela} t, websearch_to_tsquery('portuguese', :consulta) q
+            WHERE {vetor} @@ q{filtros}
+            ORDER BY relevancia DESC, t.data_criacao DESC
+            LIMIT :limite OFFSET :deslocamento
+        """
+    elif dialeto == 'sqlite':
+        parametros['consulta'] = _consulta_fts5(termos)
+        parametros['inicio_destaque'], parametros['fim_destaque'] = INICIO_DESTAQUE, FIM_DESTAQUE
+        fts = f'{tabela}_fts'
+        # bm25() é menor para resultados mais relevantes
+        sql = f"""
+            SELECT t.id, t.linha_numero, t.data_criacao,
+                   -bm25({fts}) AS relevancia,
+                   snippet({fts}, 0, :inicio_destaque, :fim_destaque, '…', 16) AS trecho
+            FROM {fts} JOIN {tabela} t ON t.id = {fts}.rowid
+            WHERE {fts} MATCH :consulta{filtros}
+            ORDER BY bm25({fts}), t.data_criacao DESC
+            LIMIT :limite OFFSET :deslocamento
+        """
+        # Funções auxiliares do FTS5 não podem ser usadas junto com janelas (count(*) OVER)
+        sql_total = f"SELECT count(*) FROM {fts} JOIN {tabela} t ON t.id = {fts}.rowid WHERE {fts} MATCH :consulta{filtros}"
+    else:
+        raise ErroBusca('Busca textual não suportada por este banco')
+
+    registros = db.session.execute(db.text(sql), parametros).all()
+    if dialeto == 'postgresql':
+        total = registros[0].total if registros else 0
+    else:
+        total = db.session.execute(db.text(sql_total), parametros).scalar()
+    return {
+        'fonte': fonte,
+        'termos': termos,
+        'total': total,
+        'resultados': [{
+            'id': r.id,
+            'linha_numero': r.linha_numero,
+            'data_criacao': r.data_criacao.isoformat() if isinstance(r.data_criacao, datetime) else str(r.data_criacao),
+            'relevancia': round(float(r.relevancia), 4),
+            'trecho': trecho_html(r.trecho)
+        } for r in registros]
+    }
@@ -0,0 +1,257 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import IntegrityError
+
+from src.database import db
+from src.models.pesquisa import Pesquisa, DIMENSOES
+from src.models.pesquisa_diaria import PesquisaDiaria, MarcadorProcessamento
+from src.utils.tendencias import expressao_periodo, converter_periodo
+from src.utils.snapshot import agregados_snapshot, agregados_diarios_snapshot
+
+MARCADOR = 'pesquisa_diaria'
+NOTAS = range(1, 11)
+
+
+def histograma_vazio():
+    """Histograma zerado para todas as dimensões"""
+    return {d: [0] * 10 for d in DIMENSOES}
+
+
+def inicio_do_dia(dia):
+    return datetime.combine(dia, datetime.min.time())
+
+
+def colunas_agregadas():
+    """Colunas SQL de contagem, somas e histogramas (1..10) por dimensão"""
+    colunas = [db.func.count(Pesquisa.id).label('total')]
+    for d in DIMENSOES:
+        campo = getattr(Pesquisa, d)
+        colunas.append(db.func.sum(campo).label(f'soma_{d}'))
+        for nota in NOTAS:
+            colunas.append(db.func.sum(db.case((campo == nota, 1), else_=0)).label(f'h_{d}_{nota}'))
+    return colunas
+
+
+def ler_agregado(registro):
+    """Converte uma linha de colunas_agregadas() em dicionário"""
+    return {
+        'total': int(registro.total or 0),
+        'somas': {d: int(getattr(registro, f'soma_{d}') or 0) for d in DIMENSOES},
+        'histogramas': {
+            d: [int(getattr(registro, f'h_{d}_{nota}') or 0) for nota in NOTAS]
+            for d in DIMENSOES
+        }
+    }
+
+
+def somar_agregado(destino, origem):
+    """Acumula `origem` em `destino` (ambos no formato de ler_agregado)"""
+    destino['total'] += origem['total']
+    for d in DIMENSOES:
+        destino['somas'][d] += origem['somas'][d]
+        destino['histogramas'][d] = [a + b for a, b in zip(destino['histogramas'][d], origem['histogramas'][d])]
+    return destino
+
+
+def agregado_vazio():
+    return {'total': 0, 'somas': {d: 0 for d in DIMENSOES}, 'histogramas': histograma_vazio()}
+
+
+def agregado_de_diaria(diaria):
+    return {
+        'total': diaria.total,
+        'somas': {d: getattr(diaria, f'soma_{d}') for d in DIMENSOES},
+        'histogramas': diaria.get_histogramas()
+    }
+
+
+def obter_marca_dagua():
+    """Último dia já consolidado, ou None se nada foi consolidado ainda"""
+    valor = MarcadorProcessamento.obter(MARCADOR)
+    return date.fromisoformat(valor) if valor else None
+
+
+def compactar_dia(dia):
+    """Recalcula a consolidação de um dia para todas as linhas (idempotente, sem commit)"""
+    registros = db.session.query(Pesquisa.linha_numero, *colunas_agregadas()).filter(
+        Pesquisa.data_criacao >= inicio_do_dia(dia),
+        Pesquisa.data_criacao < inicio_do_dia(dia + timedelta(days=1))
+    ).group_by(Pesquisa.linha_numero).all()
+
+    PesquisaDiaria.query.filter_by(dia=dia).delete(synchronize_session=False)
+    for registro in registros:
+        agregado = ler_agregado(registro)
+        db.session.add(PesquisaDiaria(
+            linha_numero=registro.linha_numero,
+            dia=dia,
+            total=agregado['total'],
+            histogramas=json.dumps(agregado['histogramas']),
+            **{f'soma_{d}': agregado['somas'][d] for d in DIMENSOES}
+        ))
+    return len(registros)
+
+
+def compactar_pendentes(ate=None):
+    """Consolida os dias encerrados desde a marca d'água até ontem (ou `ate`)"""
+    ate = ate or date.today() - timedelta(days=1)
+    marca = obter_marca_dagua()
+
+    if marca is None:
+        primeira = db.session.query(db.func.min(Pesquisa.data_criacao)).scalar()
+        if primeira is None:
+            return 0
+        dia = primeira.date()
+    else:
+        dia = marca + timedelta(days=1)
+
+    dias = 0
+    while dia <= ate:
+        try:
+            compactar_dia(dia)
+            MarcadorProcessamento.definir(MARCADOR, dia.isoformat())
+            db.session.commit()
+        except IntegrityError:
+            # Outro processo consolidou o mesmo dia ao mesmo tempo
+            db.session.rollback()
+            return dias
+        dias += 1
+        dia += timedelta(days=1)
+
+    if dias:
+        print(f"🗜️ {dias} dia(s) consolidados em pesquisa_diaria (até {ate.isoformat()})")
+    return dias
+
+
+def backfill(app, inicio, fim, workers=4):
+    """Reconsolida um intervalo de dias em paralelo, um dia por tarefa"""
+    fim = min(fim, date.today() - timedelta(days=1))
+    dias = [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+
+    def processar(dia):
+        with app.app_context():
+            linhas = compactar_dia(dia)
+            db.session.commit()
+            return linhas
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        total_linhas = sum(executor.map(processar, dias))
+
+    # Avançar a marca d'água apenas se o intervalo emenda com o que já foi consolidado
+    with app.app_context():
+        marca = obter_marca_dagua()
+        if marca is None:
+            primeira = db.session.query(db.func.min(Pesquisa.data_criacao)).scalar()
+            emenda = primeira is None or inicio <= primeira.date()
+        else:
+            emenda = inicio <= marca + timedelta(days=1)
+        if dias and emenda and (marca is None or fim > marca):
+            MarcadorProcessamento.definir(MARCADOR, fim.isoformat())
+            db.session.commit()
+
+    return len(dias), total_linhas
+
+
+def _somar_brutas_por_linha(resultado, linhas, inicio, fim, *condicoes):
+    """Soma ao resultado os agregados por linha lidos direto das pesquisas"""
+    consulta = db.session.query(Pesquisa.linha_numero, *colunas_agregadas()).filter(*condicoes)
+    if linhas:
+        consulta = consulta.filter(Pesquisa.linha_numero.in_(linhas))
+    if inicio:
+        consulta = consulta.filter(Pesquisa.data_criacao >= inicio_do_dia(inicio))
+    if fim:
+        consulta = consulta.filter(Pesquisa.data_criacao < inicio_do_dia(fim + timedelta(days=1)))
+    for registro in consulta.group_by(Pesquisa.linha_numero).all():
+        somar_agregado(resultado.setdefault(registro.linha_numero, agregado_vazio()), ler_agregado(registro))
+    return resultado
+
+
+def _somar_brutas_diarias(resultado, linhas, inicio, fim, *condicoes):
+    """Soma ao resultado os agregados por (linha, dia) lidos direto das pesquisas"""
+    dia = expressao_periodo(Pesquisa.data_criacao, 'dia').label('dia')
+    registros = db.session.query(dia, Pesquisa.linha_numero, *colunas_agregadas()).filter(
+        Pesquisa.linha_numero.in_(linhas),
+        Pesquisa.data_criacao >= inicio_do_dia(inicio),
+        Pesquisa.data_criacao < inicio_do_dia(fim + timedelta(days=1)),
+        *condicoes
+    ).group_by(dia, Pesquisa.linha_numero).all()
+    for registro in registros:
+        chave = (registro.linha_numero, converter_periodo(registro.dia))
+        somar_agregado(resultado.setdefault(chave, agregado_vazio()), ler_agregado(registro))
+    return resultado
+
+
+def agregados_por_linha(linhas=None, inicio=None, fim=None):
+    """Agregados por linha: consolidação para dias encerrados, pesquisas brutas só depois da marca d'água.
+
+    Com o snapshot colunar ativo, tudo até o último id exportado vem dele e só o
+    restante é lido do banco.
+    """
+    if current_app.config.get('SNAPSHOT_ATIVO'):
+        parcial = agregados_snapshot(linhas, inicio, fim)
+        if parcial is not None:
+            resultado, ultimo_id = parcial
+            return _somar_brutas_por_linha(resultado, linhas, inicio, fim, Pesquisa.id > ultimo_id)
+
+    resultado = {}
+    marca = obter_marca_dagua()
+
+    if marca is not None and (inicio is None or inicio <= marca):
+        consulta = PesquisaDiaria.query.filter(PesquisaDiaria.dia <= marca)
+        if linhas:
+            consulta = consulta.filter(PesquisaDiaria.linha_numero.in_(linhas))
+        if inicio:
+            consulta = consulta.filter(PesquisaDiaria.dia >= inicio)
+        if fim:
+            consulta = consulta.filter(PesquisaDiaria.dia <= fim)
+        for diaria in consulta.all():
+            somar_agregado(resultado.setdefault(diaria.linha_numero, agregado_vazio()), agregado_de_diaria(diaria))
+
+    condicoes = []
+    if marca is not None:
+        condicoes.append(Pesquisa.data_criacao >= inicio_do_dia(marca + timedelta(days=1)))
+    return _somar_brutas_por_linha(resultado, linhas, inicio, fim, *condicoes)
+
+
+def agregados_diarios(linhas, inicio, fim):
+    """Agregados por (linha, dia) no intervalo, da consolidação e das pesquisas brutas"""
+    if current_app.config.get('SNAPSHOT_ATIVO'):
+        parcial = agregados_diarios_snapshot(linhas, inicio, fim)
+        if parcial is not None:
+            resultado, ultimo_id = parcial
+            return _somar_brutas_diarias(resultado, linhas, inicio, fim, Pesquisa.id > ultimo_id)
+
+    marca = obter_marca_dagua()
+    resultado = {}
+
+    if marca is not None and inicio <= marca:
+        diarias = PesquisaDiaria.query.filter(
+            PesquisaDiaria.linha_numero.in_(linhas),
+            PesquisaDiaria.dia >= inicio,
+            PesquisaDiaria.dia <= min(fim, marca)
+        ).all()
+        for diaria in diarias:
+            resultado[(diaria.linha_numero, diaria.dia)] = agregado_de_diaria(diaria)
+
+    inicio_bruto = max(inicio, marca + timedelta(days=1)) if marca is not None else inicio
+    if inicio_bruto <= fim:
+        _somar_brutas_diarias(resultado, linhas, inicio_bruto, fim)
+
+    return resultado
+
+
+@click.command('backfill-diario')
+@click.option('--inicio', required=True, help='Primeiro dia (AAAA-MM-DD)')
+@click.option('--fim', default=None, help='Último dia (AAAA-MM-DD), padrão: ontem')
+@click.option('--workers', default=4, show_default=True, help='Dias processados em paralelo')
+@with_appcontext
+def comando_backfill(inicio, fim, workers):
+    """Reconsolida pesquisa_diaria para um intervalo de dias"""
+    inicio = date.fromisoformat(inicio)
+    fim = date.fromisoformat(fim) if fim else date.today() - timedelta(days=1)
+    dias, linhas = backfill(current_app._get_current_object(), inicio, fim, workers)
+    click.echo(f"✅ {dias} dia(s) consolidados ({linhas} registros linha/dia)")
@@ -0,0 +1,172 @@
+import math
+from datetime import date, timedelta
+
+from src.models.pesquisa import DIMENSOES
+from src.utils.tendencias import ErroTendencia
+
+# NumPy é opcional: sem ele, o cálculo cai para Python puro
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+# Quantil da normal para o intervalo de confiança de 95%
+Z_95 = 1.96
+
+# Janela padrão quando o início não é informado
+DIAS_PADRAO = 30
+
+NOTAS = list(range(1, 11))
+
+
+def _estatisticas_numpy(histogramas):
+    """Contagens, médias e desvios por linha e dimensão a partir de uma matriz (linhas, dimensões, 10)"""
+    h = np.asarray(histogramas, dtype=np.float64).reshape(-1, len(DIMENSOES), 10)
+    notas = np.arange(1, 11, dtype=np.float64)
+    totais = h[:, 0, :].sum(axis=1)
+    somas = h @ notas
+    somas_quadrados = h @ (notas * notas)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        medias = somas / totais[:, None]
+        variancias = (somas_quadrados - totais[:, None] * medias * medias) / (totais[:, None] - 1)
+    desvios = np.sqrt(np.clip(np.nan_to_num(variancias), 0, None))
+    return totais, somas, somas_quadrados, medias, desvios
+
+
+def _estatisticas_python(histogramas):
+    totais, somas, somas_quadrados, medias, desvios = [], [], [], [], []
+    for por_dimensao in histogramas:
+        n = sum(por_dimensao[0])
+        s = [sum(nota * qtd for nota, qtd in zip(NOTAS, h)) for h in por_dimensao]
+        q = [sum(nota * nota * qtd for nota, qtd in zip(NOTAS, h)) for h in por_dimensao]
+        m = [si / n if n else math.nan for si in s]
+        v = [(qi - n * mi * mi) / (n - 1) if n > 1 else 0.0 for qi, mi in zip(q, m)]
+        totais.append(n)
+        somas.append(s)
+        somas_quadrados.append(q)
+        medias.append(m)
+        desvios.append([math.sqrt(max(vi, 0.0)) for vi in v])
+    return totais, somas, somas_quadrados, medias, desvios
+
+
+def estatisticas_linhas(histogramas, usar_numpy=None):
+    """Estatísticas de todas as linhas em uma única passada sobre os histogramas.
+
+    `histogramas` é uma lista, por linha, de 5 histogramas (um por dimensão).
+    Retorna listas por linha: total, médias e desvios por dimensão, além dos
+    totais da rede (soma e soma dos quadrados por dimensão).
+    """
+    if usar_numpy is None:
+        usar_numpy = np is not None
+    calcular = _estatisticas_numpy if usar_numpy and np is not None else _estatisticas_python
+    totais, somas, somas_quadrados, medias, desvios = calcular(histogramas)
+
+    if usar_numpy and np is not None:
+        rede = (float(totais.sum()), somas.sum(axis=0).tolist(), somas_quadrados.sum(axis=0).tolist())
+        return totais.tolist(), medias.tolist(), desvios.tolist(), rede
+
+    rede = (
+        sum(totais),
+        [sum(s[i] for s in somas) for i in range(len(DIMENSOES))],
+        [sum(q[i] for q in somas_quadrados) for i in range(len(DIMENSOES))]
+    )
+    return totais, medias, desvios, rede
+
+
+def _estatisticas_por_linha(agregados, usar_numpy=None):
+    """Dicionário linha -> (total, médias, desvios) e estatísticas da rede"""
+    linhas = [l for l, a in agregados.items() if a['total']]
+    histogramas = [[agregados[l]['histogramas'][d] for d in DIMENSOES] for l in linhas]
+    if not linhas:
+        return {}, None
+
+    totais, medias, desvios, (n_rede, somas_rede, quadrados_rede) = estatisticas_linhas(histogramas, usar_numpy)
+    medias_rede = [s / n_rede for s in somas_rede]
+    desvios_rede = [
+        math.sqrt(max((q - n_rede * m * m) / (n_rede - 1), 0.0)) if n_rede > 1 else 0.0
+        for q, m in zip(quadrados_rede, medias_rede)
+    ]
+    por_linha = {l: (int(totais[i]), medias[i], desvios[i]) for i, l in enumerate(linhas)}
+    return por_linha, (int(n_rede), medias_rede, desvios_rede)
+
+
+def _validar_periodo(inicio, fim):
+    fim = fim or date.today()
+    inicio = inicio or fim - timedelta(days=DIAS_PADRAO - 1)
+    if inicio > fim:
+        raise ErroTendencia('Data inicial deve ser anterior à data final')
+    return inicio, fim
+
+
+def calcular_comparativo(linhas=None, inicio=None, fim=None, min_pesquisas=1, limite_movimentos=10,
+                         usar_numpy=None):
+    """Comparação entre linhas no período, contra a rede inteira.
+
+    - z-score por dimensão: (média da linha - média da rede) / (desvio da rede / raiz(n)),
+      ou seja, quantos erros padrão a linha está acima ou abaixo da rede;
+    - ranking pela média geral com intervalo de confiança de 95% (conservador: usa a
+      soma dos desvios das dimensões, válido qualquer que seja a correlação entre elas);
+    - maiores variações da média geral em relação ao período anterior de mesma duração.
+    """
+    from src.utils.compactacao import agregados_por_linha
+
+    inicio, fim = _validar_periodo(inicio, fim)
+    duracao = fim - inicio + timedelta(days=1)
+    inicio_anterior, fim_anterior = inicio - duracao, inicio - timedelta(days=1)
+
+    # A rede é sempre o conjunto de todas as linhas, mesmo quando só algumas são pedidas
+    atual, rede = _estatisticas_por_linha(agregados_por_linha(None, inicio, fim), usar_numpy)
+    anterior, _ = _estatisticas_por_linha(agregados_por_linha(None, inicio_anterior, fim_anterior), usar_numpy)
+
+    selecionadas = [l for l in (linhas or atual) if l in atual and atual[l][0] >= min_pesquisas]
+
+    comparacao = []
+    for linha in selecionadas:
+        n, medias, desvios = atual[linha]
+        media_geral = sum(medias) / len(DIMENSOES)
+        margem = Z_95 * (sum(desvios) / len(DIMENSOES)) / math.sqrt(n)
+        z_scores = {
+            d: round((medias[i] - rede[1][i]) / (rede[2][i] / math.sqrt(n)), 2) if rede[2][i] else 0.0
+            for i, d in enumerate(DIMENSOES)
+        }
+        item = {
+            'linha': linha,
+            'total_pesquisas': n,
+            'media_geral': round(media_geral, 2),
+            'intervalo_confianca': [round(max(media_geral - margem, 1.0), 2), round(min(media_geral + margem, 10.0), 2)],
+            'medias': {d: round(medias[i], 2) for i, d in enumerate(DIMENSOES)},
+            'z_scores': z_scores,
+            'pior_dimensao': min(z_scores, key=z_scores.get)
+        }
+        if linha in anterior and anterior[linha][0] >= min_pesquisas:
+            medias_anteriores = anterior[linha][1]
+            item['media_geral_anterior'] = round(sum(medias_anteriores) / len(DIMENSOES), 2)
+            item['variacao'] = round(media_geral - sum(medias_anteriores) / len(DIMENSOES), 2)
+            item['variacoes'] = {d: round(medias[i] - medias_anteriores[i], 2) for i, d in enumerate(DIMENSOES)}
+        comparacao.append(item)
+
+    ranking = sorted(comparacao, key=lambda i: (-i['media_geral'], i['linha']))
+    for posicao, item in enumerate(ranking, 1):
+        item['posicao'] = posicao
+
+    com_variacao = [i for i in ranking if 'variacao' in i]
+    movimentos = sorted(com_variacao, key=lambda i: -abs(i['variacao']))[:limite_movimentos]
+
+    return {
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'periodo_anterior': {'inicio': inicio_anterior.isoformat(), 'fim': fim_anterior.isoformat()},
+        'rede': {
+            'total_pesquisas': rede[0] if rede else 0,
+            'total_linhas': len(atual),
+            'medias': {d: round(rede[1][i], 2) for i, d in enumerate(DIMENSOES)} if rede else None,
+            'desvios': {d: round(rede[2][i], 2) for i, d in enumerate(DIMENSOES)} if rede else None
+        },
+        'ranking': ranking,
+        'maiores_variacoes': [
+            {'linha': i['linha'], 'variacao': i['variacao'], 'media_geral': i['media_geral'],
+             'media_geral_anterior': i['media_geral_anterior']}
+            for i in movimentos
+        ]
+    }
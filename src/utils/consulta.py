@@ -0,0 +1,268 @@
+import time
+from datetime import datetime, timedelta
+
+from src.database import db
+from src.models.pesquisa import Pesquisa, DIMENSOES
+from src.utils.tendencias import expressao_periodo, converter_periodo
+
+# Limites de custo de uma consulta
+MAX_LINHAS_RESULTADO = 5000
+MAX_AGREGADOS = 12
+MAX_DIAS = 731
+MAX_GRUPOS_ESTIMADOS = 200000
+TIMEOUT_MS = 5000
+
+AGRUPAMENTOS = ('linha', 'dia', 'hora', 'dia_semana')
+FUNCOES = ('count', 'avg', 'min', 'max', 'histograma')
+
+
+class ErroConsulta(ValueError):
+    """Consulta analítica inválida ou acima dos limites de custo"""
+
+
+def expressao_hora(coluna):
+    """Hora do dia (0-23) de `coluna`, conforme o banco"""
+    if db.engine.dialect.name == 'postgresql':
+        return db.cast(db.extract('hour', coluna), db.Integer)
+    return db.cast(db.func.strftime('%H', coluna), db.Integer)
+
+
+def expressao_dia_semana(coluna):
+    """Dia da semana de `coluna` (0 = domingo ... 6 = sábado), conforme o banco"""
+    if db.engine.dialect.name == 'postgresql':
+        return db.cast(db.extract('dow', coluna), db.Integer)
+    return db.cast(db.func.strftime('%w', coluna), db.Integer)
+
+
+def _data(valor, campo):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ErroConsulta(f'Data inválida em {campo}. Use o formato AAAA-MM-DD')
+
+
+def _inteiro(valor, campo, minimo, maximo):
+    if not isinstance(valor, int) or isinstance(valor, bool) or valor < minimo or valor > maximo:
+        raise ErroConsulta(f'{campo} aceita apenas inteiros de {minimo} a {maximo}')
+    return valor
+
+
+def _inteiros(valor, campo, minimo, maximo):
+    """Filtro de inteiros em [minimo, maximo]: lista de valores ou intervalo {'de': x, 'ate': y}.
+
+    Retorna ((de, ate) ou lista ordenada, quantidade de valores); o intervalo
+    não é expandido, vira um BETWEEN.
+    """
+    if isinstance(valor, dict):
+        de = _inteiro(valor.get('de', minimo), f'{campo}.de', minimo, maximo)
+        ate = _inteiro(valor.get('ate', maximo), f'{campo}.ate', minimo, maximo)
+        if de > ate:
+            raise ErroConsulta(f'{campo}: "de" deve ser menor ou igual a "ate"')
+        return (de, ate), ate - de + 1
+    if not isinstance(valor, list) or not valor:
+        raise ErroConsulta(f'{campo} deve ser uma lista ou um intervalo {{"de", "ate"}}')
+    valores = sorted({_inteiro(v, campo, minimo, maximo) for v in valor})
+    return valores, len(valores)
+
+
+def _condicao_inteiros(expressao, filtro):
+    if isinstance(filtro, tuple):
+        return expressao.between(*filtro)
+    return expressao.in_(filtro)
+
+
+def _nota(valor, campo):
+    if not isinstance(valor, int) or isinstance(valor, bool) or valor < 1 or valor > 10:
+        raise ErroConsulta(f'{campo} deve ser um inteiro de 1 a 10')
+    return valor
+
+
+def compilar_consulta(especificacao):
+    """Valida a especificação JSON e monta um único SELECT parametrizado.
+
+    Retorna (select, nomes das colunas de agrupamento, descrição dos agregados).
+    Só campos e funções da lista branca chegam ao SQL; valores vão como parâmetros.
+    """
+    if not isinstance(especificacao, dict):
+        raise ErroConsulta('A consulta deve ser um objeto JSON')
+
+    filtros = especificacao.get('filtros') or {}
+    agrupar = especificacao.get('agrupar') or []
+    agregados = especificacao.get('agregados') or [{'funcao': 'count'}]
+    if not isinstance(filtros, dict) or not isinstance(agrupar, list) or not isinstance(agregados, list):
+        raise ErroConsulta('Use "filtros" (objeto), "agrupar" (lista) e "agregados" (lista)')
+
+    condicoes = []
+    grupos_estimados = 1
+
+    # Filtros
+    linhas = filtros.get('linhas')
+    if linhas is not None:
+        if not isinstance(linhas, list) or not linhas or len(linhas) > 1000:
+            raise ErroConsulta('"linhas" deve ser uma lista com 1 a 1000 linhas')
+        condicoes.append(Pesquisa.linha_numero.in_([str(l) for l in linhas]))
+
+    inicio = _data(filtros['inicio'], 'inicio') if filtros.get('inicio') else None
+    fim = _data(filtros['fim'], 'fim') if filtros.get('fim') else None
+    if inicio and fim and inicio > fim:
+        raise ErroConsulta('Data inicial deve ser anterior à data final')
+    if inicio:
+        condicoes.append(Pesquisa.data_criacao >= datetime.combine(inicio, datetime.min.time()))
+    if fim:
+        condicoes.append(Pesquisa.data_criacao < datetime.combine(fim + timedelta(days=1), datetime.min.time()))
+
+    quantidade_horas, quantidade_dias_semana = 24, 7
+    if filtros.get('horas') is not None:
+        horas, quantidade_horas = _inteiros(filtros['horas'], 'horas', 0, 23)
+        condicoes.append(_condicao_inteiros(expressao_hora(Pesquisa.data_criacao), horas))
+    if filtros.get('dias_semana') is not None:
+        dias_semana, quantidade_dias_semana = _inteiros(filtros['dias_semana'], 'dias_semana', 0, 6)
+        condicoes.append(_condicao_inteiros(expressao_dia_semana(Pesquisa.data_criacao), dias_semana))
+
+    notas = filtros.get('notas') or {}
+    if not isinstance(notas, dict):
+        raise ErroConsulta('"notas" deve ser um objeto {dimensao: {"min", "max"}}')
+    for dimensao, limites in notas.items():
+        if dimensao not in DIMENSOES or not isinstance(limites, dict):
+            raise ErroConsulta(f'Dimensão inválida em notas: {dimensao}. Use: {", ".join(DIMENSOES)}')
+        coluna = getattr(Pesquisa, dimensao)
+        if 'min' in limites:
+            condicoes.append(coluna >= _nota(limites['min'], f'notas.{dimensao}.min'))
+        if 'max' in limites:
+            condicoes.append(coluna <= _nota(limites['max'], f'notas.{dimensao}.max'))
+
+    # Agrupamentos
+    # Só nomes (texto): um objeto na lista quebraria o set() abaixo
+    if (not all(isinstance(g, str) for g in agrupar) or len(set(agrupar)) != len(agrupar)
+            or any(g not in AGRUPAMENTOS for g in agrupar)):
+        raise ErroConsulta(f'Agrupamento inválido. Use: {", ".join(AGRUPAMENTOS)}')
+
+    colunas_grupo = []
+    for grupo in agrupar:
+        if grupo == 'linha':
+            colunas_grupo.append(Pesquisa.linha_numero.label('linha'))
+            grupos_estimados *= len(linhas) if linhas else 1000
+        elif grupo == 'dia':
+            if not inicio or not fim:
+                raise ErroConsulta('Agrupar por dia exige "inicio" e "fim"')
+            dias = (fim - inicio).days + 1
+            if dias > MAX_DIAS:
+                raise ErroConsulta(f'Agrupar por dia permite no máximo {MAX_DIAS} dias')
+            colunas_grupo.append(expressao_periodo(Pesquisa.data_criacao, 'dia').label('dia'))
+            grupos_estimados *= dias
+        elif grupo == 'hora':
+            colunas_grupo.append(expressao_hora(Pesquisa.data_criacao).label('hora'))
+            grupos_estimados *= quantidade_horas
+        else:
+            colunas_grupo.append(expressao_dia_semana(Pesquisa.data_criacao).label('dia_semana'))
+            grupos_estimados *= quantidade_dias_semana
+
+    if grupos_estimados > MAX_GRUPOS_ESTIMADOS:
+        raise ErroConsulta(
+            f'Consulta muito cara: até {grupos_estimados} grupos estimados excede o limite de '
+            f'{MAX_GRUPOS_ESTIMADOS}. Restrinja linhas, datas ou horas'
+        )
+
+    # Agregados
+    if len(agregados) > MAX_AGREGADOS:
+        raise ErroConsulta(f'No máximo {MAX_AGREGADOS} agregados por consulta')
+
+    colunas_agregado, descricao, nomes = [], [], set()
+    for i, agregado in enumerate(agregados):
+        if not isinstance(agregado, dict):
+            raise ErroConsulta('Cada agregado deve ser um objeto {"funcao", "dimensao"}')
+        funcao = agregado.get('funcao')
+        dimensao = agregado.get('dimensao')
+        if funcao not in FUNCOES:
+            raise ErroConsulta(f'Função inválida: {funcao}. Use: {", ".join(FUNCOES)}')
+
+        if funcao != 'count' and dimensao not in DIMENSOES:
+            raise ErroConsulta(f'Dimensão inválida: {dimensao}. Use: {", ".join(DIMENSOES)}')
+        # O nome é a chave no resultado: agregados repetidos se sobrescreveriam
+        nome = 'total' if funcao == 'count' else f'{funcao}_{dimensao}'
+        if nome in nomes:
+            raise ErroConsulta(f'Agregado repetido: {nome}')
+        nomes.add(nome)
+
+        if funcao == 'count':
+            colunas_agregado.append(db.func.count(Pesquisa.id).label(f'a{i}'))
+            descricao.append((nome, funcao, 1))
+            continue
+
+        coluna = getattr(Pesquisa, dimensao)
+
+        if funcao == 'histograma':
+            colunas_agregado += [
+                db.func.sum(db.case((coluna == nota, 1), else_=0)).label(f'a{i}_{nota}')
+                for nota in range(1, 11)
+            ]
+            descricao.append((nome, funcao, 10))
+        else:
+            sql = {'avg': db.func.avg, 'min': db.func.min, 'max': db.func.max}[funcao]
+            colunas_agregado.append(sql(coluna).label(f'a{i}'))
+            descricao.append((nome, funcao, 1))
+
+    consulta = db.select(*colunas_grupo, *colunas_agregado).select_from(Pesquisa.__table__)
+    if condicoes:
+        consulta = consulta.where(*condicoes)
+    if colunas_grupo:
+        consulta = consulta.group_by(*colunas_grupo).order_by(*colunas_grupo)
+
+    limite = _inteiro(especificacao.get('limite', 1000), '"limite"', 1, MAX_LINHAS_RESULTADO)
+    # Uma linha a mais indica que o resultado foi truncado
+    consulta = consulta.limit(limite + 1)
+
+    return consulta, list(agrupar), descricao, limite
+
+
+def _valor_grupo(nome, valor):
+    if nome == 'dia':
+        return converter_periodo(valor).isoformat()
+    if nome in ('hora', 'dia_semana'):
+        return int(valor)
+    return valor
+
+
+def executar_consulta(especificacao):
+    """Compila e executa a consulta, retornando as linhas e o tempo gasto em cada etapa"""
+    inicio = time.perf_counter()
+    consulta, agrupar, descricao, limite = compilar_consulta(especificacao)
+    compilada = time.perf_counter()
+
+    if db.engine.dialect.name == 'postgresql':
+        # Vale só para esta transação
+        db.session.execute(db.text(f'SET LOCAL statement_timeout = {int(TIMEOUT_MS)}'))
+    registros = db.session.execute(consulta).all()
+    executada = time.perf_counter()
+    db.session.rollback()
+
+    truncado = len(registros) > limite
+    resultado = []
+    for registro in registros[:limite]:
+        item = {nome: _valor_grupo(nome, valor) for nome, valor in zip(agrupar, registro)}
+        posicao = len(agrupar)
+        for nome, funcao, largura in descricao:
+            valores = registro[posicao:posicao + largura]
+            posicao += largura
+            if funcao == 'histograma':
+                item[nome] = [int(v or 0) for v in valores]
+            elif funcao == 'avg':
+                item[nome] = round(float(valores[0]), 2) if valores[0] is not None else None
+            else:
+                item[nome] = valores[0]
+        resultado.append(item)
+
+    return {
+        'agrupar': agrupar,
+        'agregados': [nome for nome, _, _ in descricao],
+        'linhas': resultado,
+        'total': len(resultado),
+        'truncado': truncado,
+        # Listas do IN expandidas (sem os marcadores POSTCOMPILE_); os valores seguem como parâmetros
+        'sql': str(consulta.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})),
+        'tempo_ms': {
+            'compilacao': round((compilada - inicio) * 1000, 2),
+            'execucao': round((executada - compilada) * 1000, 2),
+            'total': round((time.perf_counter() - inicio) * 1000, 2)
+        }
+    }
@@ -0,0 +1,372 @@
+import socketserver
+import threading
+from datetime import datetime, timedelta
+from smtplib import SMTPServerDisconnected
+
+from flask import current_app
+from flask_mail import Message
+from markupsafe import escape
+
+from src.database import db
+from src.models.envio_email import EnvioEmail
+from src.utils.agregacao import agregar_pesquisas
+
+# Tentativas antes de marcar o envio como falho, e espera base do backoff exponencial
+MAX_TENTATIVAS = 6
+ESPERA_BASE_SEGUNDOS = 60
+
+
+def classificar_nota(nota):
+    """Classificação textual de uma nota de 0 a 10"""
+    if nota >= 9: return "Excelente"
+    elif nota >= 7: return "Bom"
+    elif nota >= 4: return "Regular"
+    else: return "Ruim"
+
+
+def gerar_relatorio_email(linha_numero, pesquisas):
+    """Monta o assunto e o HTML do e-mail de relatório de uma linha"""
+    # Calcular estatísticas
+    agregado = agregar_pesquisas(pesquisas)
+    total_pesquisas = agregado['total']
+    media_pontualidade = agregado['medias']['pontualidade']
+    media_frequencia = agregado['medias']['frequencia']
+    media_conforto = agregado['medias']['conforto']
+    media_atendimento = agregado['medias']['atendimento']
+    media_infraestrutura = agregado['medias']['infraestrutura']
+    media_geral = agregado['media_geral']
+    periodo = f"{agregado['periodo_inicio'].strftime('%d/%m/%Y')} a {agregado['periodo_fim'].strftime('%d/%m/%Y')}"
+    
+    # Criar conteúdo do e-mail
+    html_content = f"""
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 0; padding: 0; background-color: #f4f4f4; }}
+            .container {{ max-width: 800px; margin: 0 auto; background-color: white; }}
+            .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; }}
+            .content {{ padding: 30px; }}
+            .metric {{ margin: 15px 0; padding: 20px; border-radius: 8px; border-left: 5px solid #667eea; background-color: #f8f9fa; }}
+            .excellent {{ border-left-color: #28a745; background-color: #d4edda; }}
+            .good {{ border-left-color: #17a2b8; background-color: #d1ecf1; }}
+            .regular {{ border-left-color: #ffc107; background-color: #fff3cd; }}
+            .poor {{ border-left-color: #dc3545; background-color: #f8d7da; }}
+            .summary {{ background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); color: white; padding: 25px; border-radius: 10px; margin: 20px 0; text-align: center; }}
+            .observations {{ background-color: #e9ecef; padding: 20px; border-radius: 8px; margin: 20px 0; }}
+            .score {{ font-size: 28px; font-weight: bold; margin: 10px 0; }}
+            .footer {{ background-color: #343a40; color: white; padding: 20px; text-align: center; font-size: 12px; }}
+            h1 {{ margin: 0; font-size: 28px; }}
+            h2 {{ color: #495057; border-bottom: 2px solid #667eea; padding-bottom: 10px; }}
+            h3 {{ color: #495057; }}
+            .grid {{ display: flex; flex-wrap: wrap; gap: 15px; margin: 20px 0; }}
+            .grid-item {{ flex: 1; min-width: 200px; text-align: center; padding: 15px; background-color: #f8f9fa; border-radius: 8px; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>🚌 Relatório de Satisfação</h1>
+                <h2>Sistema Municipal de Transporte Coletivo</h2>
+                <p style="font-size: 18px; margin: 10px 0;">Linha: <strong>{escape(linha_numero)}</strong></p>
+                <p style="font-size: 14px; opacity: 0.9;">Relatório automático baseado em {total_pesquisas} pesquisas</p>
+            </div>
+            
+            <div class="content">
+                <div class="summary">
+                    <h2 style="color: white; border: none; margin-bottom: 20px;">📊 Resumo Executivo</h2>
+                    <div class="score">{media_geral:.1f}/10</div>
+                    <p style="font-size: 18px; margin: 0;">Média Geral: {classificar_nota(media_geral)}</p>
+                    <p style="font-size: 14px; margin-top: 15px; opacity: 0.9;">
+                        Período: {periodo}
+                    </p>
+                </div>
+                
+                <h2>📈 Análise Detalhada por Categoria</h2>
+                
+                <div class="metric {classificar_nota(media_pontualidade).lower()}">
+                    <h3>🕐 1. Pontualidade e Cumprimento de Horários</h3>
+                    <p><strong>Nota:</strong> {media_pontualidade:.1f}/10 - {classificar_nota(media_pontualidade)}</p>
+                    <p>Avalia a confiabilidade do sistema em relação aos horários divulgados.</p>
+                </div>
+                
+                <div class="metric {classificar_nota(media_frequencia).lower()}">
+                    <h3>⏱️ 2. Frequência e Intervalo entre Ônibus</h3>
+                    <p><strong>Nota:</strong> {media_frequencia:.1f}/10 - {classificar_nota(media_frequencia)}</p>
+                    <p>Mede a adequação da oferta de serviço e tempo de espera.</p>
+                </div>
+                
+                <div class="metric {classificar_nota(media_conforto).lower()}">
+                    <h3>🚌 3. Conforto e Condições dos Veículos</h3>
+                    <p><strong>Nota:</strong> {media_conforto:.1f}/10 - {classificar_nota(media_conforto)}</p>
+                    <p>Analisa a qualidade da frota, limpeza e condições gerais.</p>
+                </div>
+                
+                <div class="metric {classificar_nota(media_atendimento).lower()}">
+                    <h3>👥 4. Qualidade do Atendimento</h3>
+                    <p><strong>Nota:</strong> {media_atendimento:.1f}/10 - {classificar_nota(media_atendimento)}</p>
+                    <p>Avalia o fator humano: motoristas e cobradores.</p>
+                </div>
+                
+                <div class="metric {classificar_nota(media_infraestrutura).lower()}">
+                    <h3>🏢 5. Infraestrutura dos Pontos e Terminais</h3>
+                    <p><strong>Nota:</strong> {media_infraestrutura:.1f}/10 - {classificar_nota(media_infraestrutura)}</p>
+                    <p>Examina as condições de espera, cobertura, bancos e segurança.</p>
+                </div>
+    """
+    
+    # Adicionar observações dos usuários (texto livre: escapado, nunca interpretado como HTML)
+    observacoes_validas = [p.observacoes for p in pesquisas if p.observacoes and p.observacoes.strip()]
+    if observacoes_validas:
+        html_content += f"""
+                <div class="observations">
+                    <h3>💬 Observações dos Usuários ({len(observacoes_validas)} comentários)</h3>
+                    <ul style="list-style-type: none; padding: 0;">
+        """
+        for i, obs in enumerate(observacoes_validas, 1):
+            html_content += f'<li style="margin: 10px 0; padding: 10px; background-color: white; border-radius: 5px; border-left: 3px solid #667eea;"><strong>#{i}:</strong> {escape(obs)}</li>'
+        html_content += "</ul></div>"
+    else:
+        html_content += """
+                <div class="observations">
+                    <h3>💬 Observações dos Usuários</h3>
+                    <p style="font-style: italic; color: #6c757d;">Nenhuma observação adicional foi fornecida neste período.</p>
+                </div>
+        """
+    
+    html_content += f"""
+                <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin-top: 30px;">
+                    <h3>📋 Recomendações</h3>
+                    <ul>
+    """
+    
+    # Adicionar recomendações baseadas nas notas
+    if media_pontualidade < 6:
+        html_content += "<li>🔴 <strong>Pontualidade:</strong> Revisar horários e implementar monitoramento em tempo real.</li>"
+    if media_frequencia < 6:
+        html_content += "<li>🔴 <strong>Frequência:</strong> Avaliar aumento da frota ou otimização das rotas.</li>"
+    if media_conforto < 6:
+        html_content += "<li>🔴 <strong>Conforto:</strong> Intensificar manutenção preventiva e limpeza dos veículos.</li>"
+    if media_atendimento < 6:
+        html_content += "<li>🔴 <strong>Atendimento:</strong> Implementar treinamento para motoristas e cobradores.</li>"
+    if media_infraestrutura < 6:
+        html_content += "<li>🔴 <strong>Infraestrutura:</strong> Melhorar pontos de ônibus e terminais.</li>"
+    
+    if media_geral >= 7:
+        html_content += "<li>✅ <strong>Parabéns!</strong> A linha apresenta boa avaliação geral. Manter o padrão de qualidade.</li>"
+    
+    html_content += f"""
+                    </ul>
+                </div>
+            </div>
+            
+            <div class="footer">
+                <p>📧 Este relatório foi gerado automaticamente pelo Sistema de Pesquisa de Satisfação</p>
+                <p>🌐 Sistema Municipal de Transporte Coletivo | Gerado em {datetime.now().strftime('%d/%m/%Y às %H:%M')}</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    assunto = f"Relatório de Satisfação - Linha {linha_numero} ({media_geral:.1f}/10)"
+    return assunto, html_content
+
+
+def enfileirar_email(destinatarios, assunto, html, relatorio_id=None, tipo='relatorio'):
+    """Adiciona uma mensagem à fila de envio (sem commit)"""
+    if isinstance(destinatarios, (list, tuple)):
+        destinatarios = ','.join(destinatarios)
+    envio = EnvioEmail(
+        tipo=tipo,
+        relatorio_id=relatorio_id,
+        destinatarios=destinatarios,
+        assunto=assunto,
+        html=html,
+        status='pendente',
+        tentativas=0,
+        proxima_tentativa=datetime.now()
+    )
+    db.session.add(envio)
+    db.session.flush()
+    return envio
+
+
+def enfileirar_relatorio(relatorio):
+    """Enfileira o e-mail de um relatório sem renderizá-lo (sem commit).
+
+    O HTML é montado só no envio, pelo agendador, para que a requisição que
+    gerou o relatório (submissão de pesquisa) não pague esse custo.
+    """
+    if current_app.config.get('EMAIL_MODO') == 'resumo':
+        # No modo resumo o relatório entra no e-mail consolidado do período
+        return None
+    return enfileirar_email(current_app.config['EMAIL_DESTINATARIOS'], None, None, relatorio_id=relatorio.id)
+
+
+def _renderizar_envio(envio):
+    """Preenche assunto e HTML de envios de relatório enfileirados sem conteúdo.
+
+    Se o relatório não existe mais, marca o envio como falho (novas tentativas
+    não adiantam) e retorna False.
+    """
+    if envio.html:
+        return True
+    from src.models.pesquisa import Pesquisa
+    from src.models.relatorio import Relatorio
+
+    relatorio = db.session.get(Relatorio, envio.relatorio_id)
+    if relatorio is None:
+        envio.status = 'falhou'
+        envio.erro = f'Relatório {envio.relatorio_id} não existe mais'
+        print(f"❌ Envio {envio.id} descartado: {envio.erro}")
+        return False
+    ids = [p['id'] for p in relatorio.get_dados_pesquisas()]
+    pesquisas = Pesquisa.query.filter(Pesquisa.id.in_(ids)).order_by(Pesquisa.id).all()
+    envio.assunto, envio.html = gerar_relatorio_email(relatorio.linha_numero, pesquisas)
+    return True
+
+
+def _registrar_falha(envio, erro, agora):
+    envio.tentativas += 1
+    envio.erro = str(erro)
+    if envio.tentativas >= MAX_TENTATIVAS:
+        envio.status = 'falhou'
+        print(f"❌ Envio {envio.id} falhou definitivamente após {envio.tentativas} tentativas: {erro}")
+    else:
+        # Backoff exponencial: 1, 2, 4, 8... minutos
+        envio.proxima_tentativa = agora + timedelta(seconds=ESPERA_BASE_SEGUNDOS * 2 ** (envio.tentativas - 1))
+
+
+def processar_fila_email(limite=100):
+    """Envia os e-mails pendentes em lote, reaproveitando uma única conexão SMTP"""
+    agora = datetime.now()
+    envios = EnvioEmail.query.filter(
+        EnvioEmail.status == 'pendente',
+        EnvioEmail.proxima_tentativa <= agora
+    ).order_by(EnvioEmail.id).limit(limite).all()
+
+    if not envios:
+        return 0
+
+    mail = current_app.extensions['mail']
+    enviados = 0
+    interrompido = False
+    try:
+        with mail.connect() as conexao:
+            for envio in envios:
+                try:
+                    if not _renderizar_envio(envio):
+                        db.session.commit()
+                        continue
+                    conexao.send(Message(
+                        subject=envio.assunto,
+                        recipients=envio.get_destinatarios(),
+                        html=envio.html,
+                        sender=current_app.config.get('MAIL_DEFAULT_SENDER')
+                    ))
+                    envio.status = 'enviado'
+                    envio.enviado_em = datetime.now()
+                    envio.erro = None
+                    enviados += 1
+                except SMTPServerDisconnected as e:
+                    # O servidor encerrou a conexão: as demais mensagens ficam para a
+                    # próxima execução, sem gastar tentativas em envios que nem começaram
+                    _registrar_falha(envio, e, agora)
+                    db.session.commit()
+                    interrompido = True
+                    print(f"⚠️ Conexão SMTP encerrada pelo servidor; lote interrompido no envio {envio.id}")
+                    break
+                except Exception as e:
+                    _registrar_falha(envio, e, agora)
+                # Gravar o progresso a cada mensagem para não reenviar em caso de queda
+                db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        # Após a queda, só o encerramento da conexão já fechada falhou; nada a registrar
+        if not interrompido:
+            # Falha ao conectar: o lote inteiro volta para a fila com backoff
+            for envio in envios:
+                if envio.status == 'pendente':
+                    _registrar_falha(envio, e, agora)
+            db.session.commit()
+            print(f"❌ ERRO de conexão SMTP: {str(e)}")
+
+    if enviados:
+        print(f"📧 {enviados}/{len(envios)} e-mail(s) enviados")
+    return enviados
+
+
+class ServidorSMTPLocal:
+    """Servidor SMTP mínimo em processo que guarda as mensagens recebidas.
+
+    Serve para testar o envio sem um servidor real:
+
+        with ServidorSMTPLocal() as servidor:
+            servidor.configurar(app)
+            processar_fila_email()
+            servidor.mensagens  # [(remetente, [destinatarios], dados), ...]
+    """
+
+    def __init__(self, host='127.0.0.1', porta=0):
+        self.mensagens = []
+        self.conexoes = 0
+        servidor = self
+
+        class Manipulador(socketserver.StreamRequestHandler):
+            def responder(self, texto):
+                self.wfile.write(f'{texto}\r\n'.encode())
+
+            def handle(self):
+                servidor.conexoes += 1
+                remetente, destinatarios = None, []
+                self.responder('220 localhost SMTP local')
+                while True:
+                    linha = self.rfile.readline()
+                    if not linha:
+                        return
+                    comando = linha.decode(errors='replace').strip()
+                    verbo = comando.split(' ', 1)[0].upper()
+
+                    if verbo in ('EHLO', 'HELO'):
+                        self.responder('250 localhost')
+                    elif verbo == 'MAIL':
+                        remetente, destinatarios = comando.split(':', 1)[1].strip(' <>'), []
+                        self.responder('250 OK')
+                    elif verbo == 'RCPT':
+                        destinatarios.append(comando.split(':', 1)[1].strip(' <>'))
+                        self.responder('250 OK')
+                    elif verbo == 'DATA':
+                        self.responder('354 Fim com <CRLF>.<CRLF>')
+                        partes = []
+                        while True:
+                            parte = self.rfile.readline()
+                            if parte in (b'.\r\n', b'.\n', b''):
+                                break
+                            partes.append(parte)
+                        servidor.mensagens.append((remetente, destinatarios, b''.join(partes)))
+                        self.responder('250 OK')
+                    elif verbo == 'QUIT':
+                        self.responder('221 Tchau')
+                        return
+                    else:  # RSET, NOOP e demais
+                        self.responder('250 OK')
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._servidor = socketserver.ThreadingTCPServer((host, porta), Manipulador)
+        self._servidor.daemon_threads = True
+        self.host, self.porta = self._servidor.server_address
+
+    def configurar(self, app):
+        """Aponta o Flask-Mail da aplicação para este servidor"""
+        app.config.update(MAIL_SERVER=self.host, MAIL_PORT=self.porta, MAIL_USE_TLS=False,
+                          MAIL_USE_SSL=False, MAIL_USERNAME=None, MAIL_PASSWORD=None,
+                          MAIL_SUPPRESS_SEND=False)
+        # Flask-Mail lê a configuração só no init_app
+        app.mail.init_app(app)
+
+    def __enter__(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self._servidor.shutdown()
+        self._servidor.server_close()
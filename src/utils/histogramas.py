@@ -0,0 +1,97 @@
+from src.models.pesquisa import DIMENSOES
+
+# Histogramas são listas de 10 contagens: posição 0 = nota 1, ..., posição 9 = nota 10
+
+
+def histograma_de_notas(notas):
+    """Monta o histograma de uma sequência de notas de 1 a 10"""
+    histograma = [0] * 10
+    for nota in notas:
+        histograma[nota - 1] += 1
+    return histograma
+
+
+def total(histograma):
+    return sum(histograma)
+
+
+def media(histograma):
+    n = total(histograma)
+    if not n:
+        return None
+    return sum(nota * qtd for nota, qtd in enumerate(histograma, 1)) / n
+
+
+def nota_na_posicao(histograma, posicao):
+    """Retorna a nota da k-ésima menor resposta (posição a partir de 1)"""
+    acumulado = 0
+    for nota, qtd in enumerate(histograma, 1):
+        acumulado += qtd
+        if acumulado >= posicao:
+            return nota
+    return None
+
+
+def mediana(histograma):
+    """Mediana exata (média dos dois valores centrais quando o total é par)"""
+    n = total(histograma)
+    if not n:
+        return None
+    if n % 2:
+        return float(nota_na_posicao(histograma, n // 2 + 1))
+    return (nota_na_posicao(histograma, n // 2) + nota_na_posicao(histograma, n // 2 + 1)) / 2
+
+
+def percentil(histograma, p):
+    """Percentil exato pelo método do posto mais próximo (p entre 0 e 100)"""
+    n = total(histograma)
+    if not n:
+        return None
+    # Posto = teto(p/100 * n), com no mínimo 1
+    posicao = max(1, -(-p * n // 100))
+    return nota_na_posicao(histograma, posicao)
+
+
+def nps(histograma):
+    """Participação de promotores (9-10), neutros (7-8) e detratores (1-6) e saldo NPS"""
+    n = total(histograma)
+    if not n:
+        return None
+    promotores = sum(histograma[8:10]) / n * 100
+    neutros = sum(histograma[6:8]) / n * 100
+    detratores = sum(histograma[0:6]) / n * 100
+    return {
+        'promotores': round(promotores, 1),
+        'neutros': round(neutros, 1),
+        'detratores': round(detratores, 1),
+        'nps': round(promotores - detratores, 1)
+    }
+
+
+def distribuicao(histograma):
+    """Percentual de respostas em cada nota de 1 a 10"""
+    n = total(histograma)
+    if not n:
+        return [0.0] * 10
+    return [round(qtd / n * 100, 1) for qtd in histograma]
+
+
+def resumir(histograma):
+    """Resumo completo de um histograma, em O(10)"""
+    m = media(histograma)
+    return {
+        'total': total(histograma),
+        'histograma': list(histograma),
+        'distribuicao': distribuicao(histograma),
+        'media': round(m, 2) if m is not None else None,
+        'mediana': mediana(histograma),
+        'p25': percentil(histograma, 25),
+        'p75': percentil(histograma, 75),
+        'p90': percentil(histograma, 90),
+        'nps': nps(histograma)
+    }
+
+
+def resumir_dimensoes(histogramas):
+    """Resumo por dimensão a partir de {dimensao: histograma}"""
+    return {d: resumir(histogramas.get(d, [0] * 10)) for d in DIMENSOES}
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from src.database import db, inserir_ou_ignorar
+from src.models.idempotencia import ChaveIdempotencia
+
+TTL_HORAS = 24
+
+# Uma chave "em andamento" há mais que isso é de um processo que caiu no meio do envio
+TEMPO_MAXIMO_PROCESSAMENTO = timedelta(seconds=60)
+
+TAMANHO_CACHE = 10000
+
+FORMATO_CHAVE = re.compile(r'^[\x21-\x7e]{1,100}$')
+
+
+class ErroIdempotencia(Exception):
+    """Chave inválida, reutilizada com outro conteúdo ou ainda em processamento"""
+
+    def __init__(self, mensagem, codigo, retry_after=None):
+        super().__init__(mensagem)
+        self.codigo = codigo
+        self.retry_after = retry_after
+
+
+class CacheRespostas:
+    """LRU em memória das respostas já concluídas, na frente da tabela"""
+
+    def __init__(self, tamanho=TAMANHO_CACHE):
+        self.tamanho = tamanho
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            if item[3] <= datetime.now():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return item
+
+    def guardar(self, chave, hash_requisicao, codigo, resposta, expira_em):
+        with self._lock:
+            self._itens[chave] = (hash_requisicao, codigo, resposta, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+
+
+_cache_lock = threading.Lock()
+
+
+def cache_respostas():
+    """Cache da aplicação atual (instâncias diferentes do app não compartilham respostas)"""
+    cache = current_app.extensions.get('cache_idempotencia')
+    if cache is None:
+        with _cache_lock:
+            cache = current_app.extensions.setdefault('cache_idempotencia', CacheRespostas())
+    return cache
+
+
+class EnvioIdempotente:
+    """Ciclo de vida de um envio com Idempotency-Key.
+
+    1. `reservar()` grava a chave como "em andamento" (commit próprio) ou
+       devolve a resposta original de um envio já concluído;
+    2. `registrar(codigo, resposta)` grava a resposta na mesma transação do envio;
+    3. `confirmar()` depois do commit, para que novas tentativas saiam do cache;
+    4. `liberar()` se o envio falhar, para que o cliente possa tentar de novo.
+
+    Uma repetição é a mesma chave com o mesmo corpo (hash_requisicao),
+    venha de onde vier: o celular que troca de rede (outro IP) no meio da
+    tentativa recebe a resposta original, em vez de criar outra pesquisa. A
+    chave gerada pelo cliente (UUID) não é adivinhável, e reutilizá-la com
+    outro corpo é recusado (422).
+    """
+
+    def __init__(self, chave, corpo):
+        if not FORMATO_CHAVE.match(chave):
+            raise ErroIdempotencia('Idempotency-Key deve ter de 1 a 100 caracteres visíveis (ASCII)', 400)
+        self.chave = hashlib.sha256(chave.encode('utf-8')).hexdigest()
+        self.hash_requisicao = hashlib.sha256(
+            json.dumps(corpo, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        self.expira_em = None
+        self.resposta = None
+
+    @classmethod
+    def da_requisicao(cls, requisicao, corpo):
+        """EnvioIdempotente se a requisição trouxe o cabeçalho, senão None"""
+        chave = requisicao.headers.get('Idempotency-Key')
+        return cls(chave.strip(), corpo) if chave is not None else None
+
+    def _repetir(self, hash_requisicao, codigo, resposta):
+        if hash_requisicao != self.hash_requisicao:
+            raise ErroIdempotencia('Idempotency-Key já usada com outro conteúdo', 422)
+        return codigo, resposta
+
+    def reservar(self):
+        """None se este envio deve ser processado; (código, resposta) se é uma repetição"""
+        em_cache = cache_respostas().obter(self.chave)
+        if em_cache:
+            return self._repetir(*em_cache[:3])
+
+        for _ in range(2):
+            agora = datetime.now()
+            self.expira_em = agora + timedelta(hours=TTL_HORAS)
+            inserida = inserir_ou_ignorar(
+                ChaveIdempotencia.__table__,
+                chave=self.chave,
+                hash_requisicao=self.hash_requisicao,
+                status='em_andamento',
+                data_criacao=agora,
+                expira_em=self.expira_em
+            )
+            db.session.commit()
+            if inserida:
+                return None
+
+            registro = ChaveIdempotencia.query.filter_by(chave=self.chave).first()
+            if registro is None:
+                continue
+            if registro.expira_em <= agora:
+                # Vencida, mas a limpeza ainda não passou: a chave pode ser reutilizada
+                ChaveIdempotencia.query.filter_by(id=registro.id).delete(synchronize_session=False)
+                db.session.commit()
+                continue
+
+            if registro.status == 'concluida':
+                resposta = json.loads(registro.resposta)
+                cache_respostas().guardar(self.chave, registro.hash_requisicao, registro.codigo_status,
+                                          resposta, registro.expira_em)
+                return self._repetir(registro.hash_requisicao, registro.codigo_status, resposta)
+
+            self._repetir(registro.hash_requisicao, None, None)
+            if agora - registro.data_criacao > TEMPO_MAXIMO_PROCESSAMENTO:
+                # Assumir a chave abandonada; o UPDATE condicional garante um único vencedor
+                assumida = ChaveIdempotencia.query.filter_by(
+                    id=registro.id, status='em_andamento', data_criacao=registro.data_criacao
+                ).update({'data_criacao': agora, 'expira_em': self.expira_em}, synchronize_session=False)
+                db.session.commit()
+                if assumida:
+                    return None
+            raise ErroIdempotencia('Envio com esta Idempotency-Key ainda em processamento', 409, retry_after=1)
+
+        raise ErroIdempotencia('Envio com esta Idempotency-Key ainda em processamento', 409, retry_after=1)
+
+    def registrar(self, codigo, resposta):
+        """Grava a resposta junto com o envio (sem commit)"""
+        self.resposta = (codigo, resposta)
+        ChaveIdempotencia.query.filter_by(chave=self.chave).update({
+            'status': 'concluida',
+            'codigo_status': codigo,
+            'resposta': json.dumps(resposta, ensure_ascii=False)
+        }, synchronize_session=False)
+
+    def confirmar(self):
+        if self.resposta:
+            cache_respostas().guardar(self.chave, self.hash_requisicao, *self.resposta, self.expira_em)
+
+    def liberar(self):
+        """Apaga a reserva de um envio que falhou"""
+        try:
+            ChaveIdempotencia.query.filter_by(
+                chave=self.chave, status='em_andamento'
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ ERRO ao liberar Idempotency-Key {self.chave[:12]}: {str(e)}")
+
+
+def limpar_chaves_expiradas(agora=None):
+    """Remove as chaves vencidas num único DELETE (pelo índice de expira_em)"""
+    removidas = ChaveIdempotencia.query.filter(
+        ChaveIdempotencia.expira_em < (agora or datetime.now())
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    if removidas:
+        print(f"🧹 {removidas} chave(s) de idempotência vencidas removidas")
+    return removidas
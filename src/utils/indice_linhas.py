@@ -0,0 +1,138 @@
+import bisect
+import threading
+import time
+import unicodedata
+
+from flask import current_app
+
+
+def normalizar_texto(texto):
+    """Normaliza texto para busca: minúsculas, sem acentos e espaços simples"""
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+
+class IndiceLinhas:
+    """Índice de prefixos em memória das linhas e itinerários conhecidos.
+
+    Cada entrada (linha, itinerário) é indexada pelo texto completo normalizado
+    e por cada sufixo que começa numa palavra, em uma lista ordenada. A consulta
+    é uma busca binária seguida de uma varredura curta enquanto o prefixo bate,
+    sem nenhum acesso ao banco por tecla digitada.
+    """
+
+    def __init__(self, intervalo_recarga=300):
+        self.intervalo_recarga = intervalo_recarga
+        self._lock = threading.Lock()
+        self._chaves = []
+        self._entradas = []
+        self._posicoes = {}
+        self._carregado_em = None
+
+    def _chaves_da_entrada(self, linha_numero, linha_itinerario):
+        texto = normalizar_texto(f'{linha_numero} {linha_itinerario or ""}')
+        palavras = texto.split(' ')
+        return {' '.join(palavras[i:]) for i in range(len(palavras)) if palavras[i]}
+
+    def _inserir(self, linha_numero, linha_itinerario):
+        entrada = (linha_numero, linha_itinerario or None)
+        if entrada in self._posicoes:
+            return False
+
+        indice = len(self._entradas)
+        self._entradas.append(entrada)
+        self._posicoes[entrada] = indice
+        for chave in self._chaves_da_entrada(*entrada):
+            bisect.insort(self._chaves, (chave, indice))
+        return True
+
+    def carregar(self, entradas):
+        """Reconstrói o índice a partir de pares (linha, itinerário)"""
+        novo = IndiceLinhas(self.intervalo_recarga)
+        for linha_numero, linha_itinerario in entradas:
+            if linha_numero:
+                novo._inserir(linha_numero, linha_itinerario)
+
+        with self._lock:
+            self._chaves = novo._chaves
+            self._entradas = novo._entradas
+            self._posicoes = novo._posicoes
+            self._carregado_em = time.monotonic()
+
+    def carregar_do_banco(self):
+        """Carrega as linhas do ContadorLinha e os itinerários já informados"""
+        from src.database import db
+        from src.models.pesquisa import Pesquisa, ContadorLinha
+
+        entradas = [(c.linha_numero, None) for c in ContadorLinha.query.all()]
+        itinerarios = db.session.query(
+            Pesquisa.linha_numero, Pesquisa.linha_itinerario
+        ).filter(
+            Pesquisa.linha_itinerario.isnot(None),
+            Pesquisa.linha_itinerario != ''
+        ).distinct().all()
+        entradas.extend(itinerarios)
+
+        self.carregar(entradas)
+        return len(self._entradas)
+
+    def precisa_recarregar(self):
+        """Indica se o índice nunca foi carregado ou está velho demais"""
+        if self._carregado_em is None:
+            return True
+        return time.monotonic() - self._carregado_em > self.intervalo_recarga
+
+    def adicionar(self, linha_numero, linha_itinerario=None):
+        """Adiciona incrementalmente uma linha/itinerário recém-visto"""
+        if not linha_numero:
+            return False
+        with self._lock:
+            adicionou = self._inserir(linha_numero, None)
+            if linha_itinerario:
+                adicionou = self._inserir(linha_numero, linha_itinerario) or adicionou
+            return adicionou
+
+    def sugerir(self, consulta, limite=10):
+        """Retorna até `limite` entradas cujo texto contém uma palavra iniciada pela consulta"""
+        prefixo = normalizar_texto(consulta)
+        if not prefixo:
+            return []
+
+        chaves = self._chaves
+        entradas = self._entradas
+        vistos = set()
+        resultado = []
+
+        posicao = bisect.bisect_left(chaves, (prefixo, -1))
+        while posicao < len(chaves) and len(resultado) < limite:
+            chave, indice = chaves[posicao]
+            if not chave.startswith(prefixo):
+                break
+            if indice not in vistos:
+                vistos.add(indice)
+                linha_numero, linha_itinerario = entradas[indice]
+                resultado.append({
+                    'linha_numero': linha_numero,
+                    'linha_itinerario': linha_itinerario
+                })
+            posicao += 1
+
+        return resultado
+
+    def __len__(self):
+        return len(self._entradas)
+
+
+_indice_lock = threading.Lock()
+
+
+def obter_indice_linhas():
+    """Índice da aplicação atual (instâncias diferentes do app não compartilham linhas)"""
+    indice = current_app.extensions.get('indice_linhas')
+    if indice is None:
+        with _indice_lock:
+            indice = current_app.extensions.setdefault('indice_linhas', IndiceLinhas())
+    return indice
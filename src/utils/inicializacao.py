@@ -0,0 +1,57 @@
+import os
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from src.config_cloud import is_production
+from src.database import db, garantir_indices
+from src.models.usuario import Usuario
+from src.utils.busca import criar_indices_busca
+
+ARQUIVO_SENHA_ADMIN = 'senha_admin.txt'
+
+
+def inicializar_banco(admin_email=None, admin_senha=None):
+    """Cria tabelas, índices e o administrador padrão; pode ser repetido sem efeito.
+
+    Roda uma vez por deploy (antes dos workers), não a cada inicialização de
+    worker: assim nenhum worker escreve no banco ao subir.
+    """
+    etapas = []
+    inicio = time.perf_counter()
+
+    db.create_all()
+    garantir_indices()
+    etapas.append(('tabelas e índices', time.perf_counter()))
+
+    # Índice invertido das observações (GIN no PostgreSQL, FTS5 no SQLite)
+    criar_indices_busca()
+    etapas.append(('busca textual', time.perf_counter()))
+
+    # Fora de produção, sem ADMIN_SENHA, a senha gerada vai para a pasta instance (0600), não para o log
+    arquivo_senha = None if is_production() else os.path.join(current_app.instance_path, ARQUIVO_SENHA_ADMIN)
+    Usuario.criar_admin_padrao(admin_email, admin_senha, arquivo_senha)
+    etapas.append(('administrador', time.perf_counter()))
+
+    anterior = inicio
+    for nome, momento in etapas:
+        print(f"🗄️ {nome}: {(momento - anterior) * 1000:.0f} ms")
+        anterior = momento
+    return anterior - inicio
+
+
+@click.command('inicializar-banco')
+@click.option('--admin-email', envvar='ADMIN_EMAIL', default=None, help='E-mail do administrador padrão')
+@click.option('--admin-senha', envvar='ADMIN_SENHA', default=None,
+              help=f'Senha do administrador, se for criado (obrigatória em produção; '
+                   f'fora dela é gerada em instance/{ARQUIVO_SENHA_ADMIN})')
+@with_appcontext
+def comando_inicializar_banco(admin_email, admin_senha):
+    """Prepara o banco (tabelas, índices, busca e administrador) antes de subir os workers"""
+    try:
+        duracao = inicializar_banco(admin_email, admin_senha)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"✅ Banco inicializado em {duracao * 1000:.0f} ms")
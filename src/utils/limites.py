@@ -0,0 +1,196 @@
+import math
+import threading
+import time
+from collections import namedtuple
+
+from flask import g, jsonify, request
+
+from src.database import db
+from src.models.balde_limite import BaldeLimite
+
+Regra = namedtuple('Regra', ['capacidade', 'por_minuto'])
+
+# Rotas públicas limitadas por IP: capacidade = rajada permitida, por_minuto = reposição
+REGRAS = {
+    'pesquisa.criar_pesquisa': Regra(capacidade=10, por_minuto=10),
+    'auth.login': Regra(capacidade=5, por_minuto=5),
+}
+
+# Buckets em memória: acima disso, os já cheios (clientes inativos) são descartados
+MAX_CHAVES = 100000
+
+# Buckets do banco sem uso há mais que isso são apagados pela limpeza
+HORAS_BALDES_INATIVOS = 24
+
+
+def ip_cliente(requisicao):
+    """IP do cliente: o endereço da conexão, já trocado pelo ProxyFix pelo IP que o
+    proxy confiável viu (X-Forwarded-For é escrito pelo cliente e não é lido aqui)"""
+    return requisicao.remote_addr or ''
+
+
+class BaldesMemoria:
+    """Token buckets do processo: O(1) por consulta, sem ir ao banco"""
+
+    def __init__(self, relogio=time.monotonic):
+        self.relogio = relogio
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def consumir(self, chave, regra, custo=1):
+        """(permitido, segundos até haver tokens de novo)"""
+        taxa = regra.por_minuto / 60
+        with self._lock:
+            agora = self.relogio()
+            tokens, atualizado = self._baldes.get(chave, (regra.capacidade, agora))
+            tokens = min(regra.capacidade, tokens + (agora - atualizado) * taxa)
+            permitido = tokens >= custo
+            if permitido:
+                tokens -= custo
+            if chave not in self._baldes and len(self._baldes) >= MAX_CHAVES:
+                self._descartar_cheios(agora, taxa, regra.capacidade)
+            self._baldes[chave] = (tokens, agora)
+        return permitido, 0 if permitido else math.ceil((custo - tokens) / taxa)
+
+    def _descartar_cheios(self, agora, taxa, capacidade):
+        cheios = [c for c, (t, a) in self._baldes.items() if t + (agora - a) * taxa >= capacidade]
+        for chave in cheios:
+            del self._baldes[chave]
+        # Ainda lotado: descartar os mais antigos (ordem de inserção)
+        while len(self._baldes) >= MAX_CHAVES:
+            del self._baldes[next(iter(self._baldes))]
+
+
+class BaldesBanco:
+    """Token buckets na tabela baldes_limite, exatos entre workers.
+
+    Cada consulta é um único upsert (ON CONFLICT DO UPDATE ... RETURNING) que
+    repõe os tokens pelo tempo decorrido e consome um, numa conexão própria e
+    curta, fora da sessão da requisição.
+    """
+
+    def consumir(self, chave, regra, custo=1):
+        taxa = regra.por_minuto / 60
+        agora = time.time()
+        tabela = BaldeLimite.__table__
+        dialeto = db.engine.dialect.name
+        if dialeto == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        # No DO UPDATE, as colunas referem-se à linha antiga
+        reposto = tabela.c.tokens + (agora - tabela.c.atualizado) * taxa
+        reposto = db.case((reposto > regra.capacidade, regra.capacidade), else_=reposto)
+        consulta = insert(tabela).values(
+            chave=chave, tokens=regra.capacidade - custo, atualizado=agora, permitido=True
+        ).on_conflict_do_update(
+            index_elements=['chave'],
+            set_={
+                'tokens': db.case((reposto >= custo, reposto - custo), else_=reposto),
+                'atualizado': agora,
+                'permitido': reposto >= custo
+            }
+        ).returning(tabela.c.tokens, tabela.c.permitido)
+
+        with db.engine.begin() as conexao:
+            tokens, permitido = conexao.execute(consulta).one()
+        return bool(permitido), 0 if permitido else math.ceil((custo - tokens) / taxa)
+
+
+def limpar_baldes_inativos(agora=None):
+    """Apaga de uma vez os buckets do banco sem uso recente"""
+    limite = (agora or time.time()) - HORAS_BALDES_INATIVOS * 3600
+    removidos = BaldeLimite.query.filter(BaldeLimite.atualizado < limite).delete(synchronize_session=False)
+    db.session.commit()
+    if removidos:
+        print(f"🧹 {removidos} balde(s) de limite inativos removidos")
+    return removidos
+
+
+def limites_concorrencia(threads, conexoes):
+    """(vagas, vagas públicas) por worker.
+
+    Cada requisição em andamento pode segurar uma conexão do pool, então o
+    worker não atende mais requisições que conexões (DB_POOL_SIZE +
+    DB_MAX_OVERFLOW): com threads sobrando (gunicorn --threads), as
+    excedentes recebem 503 na hora em vez de esperar por uma conexão, e
+    workers x vagas limita as conexões abertas no banco. Um terço das vagas
+    fica reservado para as rotas não públicas.
+    """
+    maximo = max(1, min(threads, conexoes) if threads else conexoes)
+    return maximo, max(1, maximo - max(1, maximo // 3))
+
+
+class LimitadorConcorrencia:
+    """Descarte de carga: limita as requisições simultâneas do processo.
+
+    As rotas públicas só podem ocupar parte das vagas, então uma rajada de
+    envios não deixa a área administrativa sem conexões com o banco. Só tem
+    efeito com mais de uma thread por worker (gunicorn --threads).
+    """
+
+    def __init__(self, maximo, maximo_publico):
+        self.maximo = maximo
+        self.maximo_publico = min(maximo_publico, maximo)
+        self.ativos = 0
+        self.ativos_publicos = 0
+        self._lock = threading.Lock()
+
+    def entrar(self, publica):
+        with self._lock:
+            if self.ativos >= self.maximo or (publica and self.ativos_publicos >= self.maximo_publico):
+                return False
+            self.ativos += 1
+            if publica:
+                self.ativos_publicos += 1
+            return True
+
+    def sair(self, publica):
+        with self._lock:
+            self.ativos -= 1
+            if publica:
+                self.ativos_publicos -= 1
+
+
+def _resposta_limitada(mensagem, codigo, retry_after):
+    resposta = jsonify({'erro': mensagem})
+    resposta.headers['Retry-After'] = str(max(1, int(retry_after)))
+    return resposta, codigo
+
+
+def registrar_limites(app):
+    """Instala o descarte de carga e o limite por IP em todas as rotas da API"""
+    baldes = BaldesBanco() if app.config['LIMITES_BACKEND'] == 'banco' else BaldesMemoria()
+    concorrencia = LimitadorConcorrencia(app.config['LIMITE_CONCORRENCIA'], app.config['LIMITE_CONCORRENCIA_PUBLICA'])
+    app.limitador_concorrencia = concorrencia
+
+    @app.before_request
+    def aplicar_limites():
+        if not app.config['LIMITES_ATIVO'] or request.method == 'OPTIONS' or not request.path.startswith('/api/'):
+            return None
+
+        regra = REGRAS.get(request.endpoint)
+        publica = regra is not None
+        if not concorrencia.entrar(publica):
+            return _resposta_limitada('Servidor sobrecarregado. Tente novamente em instantes.', 503, 1)
+        g.vaga_concorrencia = publica
+
+        if regra:
+            try:
+                permitido, espera = baldes.consumir(f'{request.endpoint}|{ip_cliente(request)}', regra)
+            except Exception as e:
+                # Falha no backend compartilhado não deve derrubar a rota: deixar passar
+                print(f"❌ ERRO ao consultar limite de requisições: {str(e)}")
+                permitido, espera = True, 0
+            if not permitido:
+                return _resposta_limitada('Muitas requisições. Tente novamente mais tarde.', 429, espera)
+        return None
+
+    @app.teardown_request
+    def liberar_vaga(erro=None):
+        publica = g.pop('vaga_concorrencia', None)
+        if publica is not None:
+            concorrencia.sair(publica)
+
+    return app
@@ -0,0 +1,196 @@
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from flask import current_app
+
+# Arquivo padrão com palavras bloqueadas e tipos de dados pessoais a mascarar
+CONFIG_PADRAO = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'moderacao.json')
+
+# Intervalo mínimo entre verificações do arquivo (evita um stat por requisição)
+INTERVALO_VERIFICACAO = 5
+
+# Dados pessoais reconhecidos por expressão regular
+PADROES_DADOS_PESSOAIS = {
+    'cpf': re.compile(r'(?<!\d)\d{3}\.?\d{3}\.?\d{3}-?\d{2}(?!\d)'),
+    # Com DDD (fixo ou celular) ou celular sem DDD (9 + 8 dígitos); "1234 5678" sozinho é horário, valor ou linha
+    'telefone': re.compile(r'(?<!\d)(?:(?:\+?55[\s-]?)?\(?[1-9]\d\)?[\s-]?(?:9\s?)?\d{4}[\s-]?\d{4}|9\s?\d{4}[\s-]?\d{4})(?!\d)'),
+    'email': re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+'),
+}
+
+
+def _dobrar(caractere):
+    """Forma de comparação de um caractere: minúsculo e sem acento (pode ficar vazio)"""
+    decomposto = unicodedata.normalize('NFKD', caractere)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+# Tabela de str.translate com os caracteres não ASCII já vistos (cresce sob demanda)
+_TABELA_DOBRA = {}
+
+
+def dobrar_texto(texto):
+    """Retorna (texto dobrado, mapa de posições para o original ou None se as posições coincidem)"""
+    if texto.isascii():
+        return texto.lower(), None
+
+    novos = {c for c in texto if not c.isascii() and ord(c) not in _TABELA_DOBRA}
+    for c in novos:
+        _TABELA_DOBRA[ord(c)] = _dobrar(c)
+    dobrado = texto.lower().translate(_TABELA_DOBRA) if len(texto.lower()) == len(texto) else None
+    if dobrado is not None and len(dobrado) == len(texto):
+        return dobrado, None
+
+    # Algum caractere virou zero ou vários (ex.: "ß" -> "ss"): mapear posição a posição
+    partes, origem = [], []
+    for i, caractere in enumerate(texto):
+        for c in _TABELA_DOBRA.get(ord(caractere)) or caractere.lower():
+            partes.append(c)
+            origem.append(i)
+    return ''.join(partes), origem
+
+
+class AhoCorasick:
+    """Autômato de Aho–Corasick: encontra todas as palavras da lista em uma única passada pelo texto"""
+
+    def __init__(self, palavras):
+        self.transicoes = [{}]
+        self.falhas = [0]
+        self.saidas = [()]
+
+        for palavra in palavras:
+            estado = 0
+            for caractere in palavra:
+                proximo = self.transicoes[estado].get(caractere)
+                if proximo is None:
+                    proximo = len(self.transicoes)
+                    self.transicoes[estado][caractere] = proximo
+                    self.transicoes.append({})
+                    self.falhas.append(0)
+                    self.saidas.append(())
+                estado = proximo
+            self.saidas[estado] += (len(palavra),)
+
+        # Ligações de falha em largura: o maior sufixo próprio que também é prefixo
+        fila = list(self.transicoes[0].values())
+        while fila:
+            seguinte = []
+            for estado in fila:
+                for caractere, filho in self.transicoes[estado].items():
+                    falha = self.falhas[estado]
+                    while falha and caractere not in self.transicoes[falha]:
+                        falha = self.falhas[falha]
+                    destino = self.transicoes[falha].get(caractere, 0)
+                    self.falhas[filho] = destino if destino != filho else 0
+                    self.saidas[filho] += self.saidas[self.falhas[filho]]
+                    seguinte.append(filho)
+            fila = seguinte
+
+    def encontrar(self, texto):
+        """Gera (inicio, fim) de cada ocorrência, com fim exclusivo"""
+        transicoes, falhas, saidas = self.transicoes, self.falhas, self.saidas
+        estado = 0
+        for posicao, caractere in enumerate(texto):
+            while estado and caractere not in transicoes[estado]:
+                estado = falhas[estado]
+            estado = transicoes[estado].get(caractere, 0)
+            for tamanho in saidas[estado]:
+                yield posicao + 1 - tamanho, posicao + 1
+
+
+class Moderador:
+    """Moderação de observações: palavras bloqueadas e dados pessoais são mascarados.
+
+    A lista de palavras vem de um arquivo JSON, recarregado automaticamente
+    quando o arquivo muda (verificado no máximo a cada INTERVALO_VERIFICACAO
+    segundos), sem reiniciar a aplicação.
+    """
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or os.environ.get('MODERACAO_CONFIG', CONFIG_PADRAO)
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._verificado_em = 0
+        self._estado = (AhoCorasick([]), [], '*')
+
+    def _carregar(self):
+        with open(self.caminho, encoding='utf-8') as f:
+            config = json.load(f)
+
+        palavras = {''.join(_dobrar(c) for c in p.strip()) for p in config.get('palavras', [])}
+        padroes = [(nome, PADROES_DADOS_PESSOAIS[nome]) for nome in config.get('dados_pessoais', [])
+                   if nome in PADROES_DADOS_PESSOAIS]
+        mascara = config.get('mascara', '*')[:1] or '*'
+        return AhoCorasick(sorted(p for p in palavras if p)), padroes, mascara
+
+    def _verificar_recarga(self):
+        agora = time.monotonic()
+        if agora - self._verificado_em < INTERVALO_VERIFICACAO and self._mtime is not None:
+            return
+
+        with self._lock:
+            self._verificado_em = agora
+            try:
+                mtime = os.stat(self.caminho).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                self._estado = self._carregar()
+                self._mtime = mtime
+                print(f"🛡️ Moderação carregada de {self.caminho}")
+            except (ValueError, OSError) as e:
+                # Arquivo inválido: manter a configuração anterior
+                self._mtime = mtime
+                print(f"❌ ERRO ao carregar moderação de {self.caminho}: {str(e)}")
+
+    def moderar(self, texto):
+        """Retorna (texto mascarado, {categoria: ocorrências})"""
+        if not texto:
+            return texto, {}
+
+        self._verificar_recarga()
+        automato, padroes, mascara = self._estado
+
+        # Texto dobrado (sem acentos, minúsculo) e, se preciso, o mapa de volta para as posições originais
+        dobrado, origem = dobrar_texto(texto)
+
+        trechos = []
+        categorias = {}
+        for inicio, fim in automato.encontrar(dobrado):
+            # Só palavras inteiras: "cu" não deve casar dentro de "cuidado"
+            if (inicio > 0 and dobrado[inicio - 1].isalnum()) or (fim < len(dobrado) and dobrado[fim].isalnum()):
+                continue
+            trechos.append((origem[inicio], origem[fim - 1] + 1) if origem else (inicio, fim))
+            categorias['palavrao'] = categorias.get('palavrao', 0) + 1
+
+        for nome, padrao in padroes:
+            for ocorrencia in padrao.finditer(texto):
+                trechos.append(ocorrencia.span())
+                categorias[nome] = categorias.get(nome, 0) + 1
+
+        if not trechos:
+            return texto, {}
+
+        caracteres = list(texto)
+        for inicio, fim in trechos:
+            for i in range(inicio, fim):
+                if not caracteres[i].isspace():
+                    caracteres[i] = mascara
+        return ''.join(caracteres), categorias
+
+
+_moderador_lock = threading.Lock()
+
+
+def obter_moderador():
+    """Moderador da aplicação atual (cada instância do app carrega a sua configuração)"""
+    moderador = current_app.extensions.get('moderador')
+    if moderador is None:
+        with _moderador_lock:
+            moderador = current_app.extensions.setdefault('moderador', Moderador())
+    return moderador
@@ -0,0 +1,123 @@
+import os
+import threading
+
+from sqlalchemy import event
+
+# Espera por um lock do banco antes de "database is locked" (também a espera pela vez de escrever)
+BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+# Leitura do arquivo mapeada em memória e cache de páginas por conexão
+MMAP_MB = int(os.environ.get('SQLITE_MMAP_MB', 256))
+CACHE_MB = int(os.environ.get('SQLITE_CACHE_MB', 64))
+
+# Um escritor por vez no processo (TravaEscrita); false deixa só o WAL e o busy_timeout
+TRAVA_ESCRITA = os.environ.get('SQLITE_TRAVA_ESCRITA', 'true').lower() != 'false'
+
+_COMANDOS_ESCRITA = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'CREATE', 'DROP', 'ALTER')
+
+
+class TravaEscrita:
+    """Um escritor por vez no processo.
+
+    No SQLite só uma transação escreve de cada vez; sem a trava, as demais
+    threads disputam o lock do arquivo em espera ativa (busy_timeout). Com
+    ela, quem vai escrever espera a sua vez numa fila do processo, desde o
+    primeiro comando de escrita até o commit ou rollback. Entre processos
+    (vários workers) continua valendo o busy_timeout do SQLite.
+
+    A trava pertence à conexão que escreveu, não à thread: o pool pode
+    devolver (e fazer o rollback de) uma conexão a partir de outra thread,
+    por isso é um Lock simples, que qualquer thread pode liberar. A thread
+    que a adquiriu fica anotada só para um caso: se ela mesma for escrever
+    por uma segunda conexão (ex.: engine.begin() no meio de uma requisição
+    que já escreveu pela sessão), esperar seria esperar por si mesma, então
+    segue sem a trava na hora.
+    """
+
+    def __init__(self, espera_segundos=BUSY_TIMEOUT_MS / 1000):
+        self.espera_segundos = espera_segundos
+        self._lock = None
+        self._pid = None
+        self._dono = None
+
+    def _trava(self):
+        # Recriada em cada processo: um lock herdado num fork pode estar preso
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+            self._dono = None
+        return self._lock
+
+    def adquirir(self, info):
+        if info.get('trava_escrita'):
+            return
+        trava = self._trava()
+        if self._dono == threading.get_ident():
+            # Só esta thread grava _dono com o seu id: a trava é de outra conexão dela mesma
+            print("⚠️ SQLite: a thread já escreve por outra conexão, seguindo sem a trava")
+            return
+        if trava.acquire(timeout=self.espera_segundos):
+            self._dono = threading.get_ident()
+            info['trava_escrita'] = self._pid
+        else:
+            # Não esperar para sempre: o busy_timeout do SQLite decide daqui em diante
+            print("⚠️ SQLite: espera pela vez de escrever esgotada, seguindo sem a trava")
+
+    def liberar(self, info):
+        pid = info.pop('trava_escrita', None)
+        if pid is None or pid != self._pid:
+            return
+        # Só a conexão que adquiriu chega aqui: um lock já solto indica estado corrompido (RuntimeError)
+        self._dono = None
+        self._lock.release()
+
+
+def configurar_sqlite(engine, serializar=TRAVA_ESCRITA):
+    """PRAGMAs de desempenho em cada conexão e, com `serializar`, escritas serializadas no processo"""
+    memoria = engine.url.database in (None, '', ':memory:')
+
+    @event.listens_for(engine, 'connect')
+    def aplicar_pragmas(conexao_dbapi, registro):
+        cursor = conexao_dbapi.cursor()
+        if not memoria:
+            # WAL: leitores não bloqueiam o escritor nem são bloqueados por ele
+            cursor.execute('PRAGMA journal_mode=WAL')
+            # Com WAL, NORMAL só sincroniza no checkpoint: não corrompe, pode perder o último commit numa queda de energia
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute(f'PRAGMA mmap_size={MMAP_MB * 1024 * 1024}')
+        cursor.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        cursor.execute(f'PRAGMA cache_size={-CACHE_MB * 1024}')  # Negativo: em KiB
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+    if serializar:
+        _serializar_escritas(engine)
+
+    print(f"🗄️ SQLite: {'memória' if memoria else 'WAL, synchronous=NORMAL, mmap ' + str(MMAP_MB) + ' MB'}, "
+          f"cache {CACHE_MB} MB, busy_timeout {BUSY_TIMEOUT_MS} ms, foreign_keys"
+          f"{', um escritor por vez' if serializar else ''}")
+    return engine
+
+
+def _serializar_escritas(engine):
+    """Trava de escrita do processo, do primeiro comando de escrita até o fim da transação"""
+    trava = TravaEscrita()
+    engine.trava_escrita = trava
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def antes_de_executar(conexao, cursor, comando, parametros, contexto, executemany):
+        if comando.lstrip()[:7].upper().startswith(_COMANDOS_ESCRITA):
+            trava.adquirir(conexao.info)
+
+    @event.listens_for(engine, 'commit')
+    def depois_do_commit(conexao):
+        trava.liberar(conexao.info)
+
+    @event.listens_for(engine, 'rollback')
+    def depois_do_rollback(conexao):
+        trava.liberar(conexao.info)
+
+    @event.listens_for(engine, 'reset')
+    def ao_devolver(conexao_dbapi, registro, estado):
+        # Conexão devolvida ao pool sem commit/rollback explícito (ex.: DDL fora de transação)
+        trava.liberar(registro.info)
@@ -0,0 +1,217 @@
+from datetime import date, datetime
+
+from src.database import db, inserir_ou_ignorar
+from src.models.pesquisa import Pesquisa, ContadorLinha
+from src.models.politica_relatorio import PoliticaRelatorio, JanelaRelatorio, TIPOS_POLITICA
+from src.models.relatorio import Relatorio
+from src.utils.email import enfileirar_relatorio
+from src.utils.tendencias import GRANULARIDADES, inicio_periodo
+
+# Política usada para linhas sem configuração (comportamento original: a cada 10 pesquisas)
+TAMANHO_PADRAO = 10
+
+
+def validar_politica(dados):
+    """Valida os campos de uma política recebida pela API; retorna os campos normalizados"""
+    tipo = dados.get('tipo', 'contagem')
+    if tipo not in TIPOS_POLITICA:
+        raise ValueError(f'Tipo de política inválido. Use: {", ".join(TIPOS_POLITICA)}')
+
+    tamanho = dados.get('tamanho', TAMANHO_PADRAO)
+    if not isinstance(tamanho, int) or tamanho < 1 or tamanho > 10000:
+        raise ValueError('Tamanho deve ser um número entre 1 e 10000')
+
+    passo = dados.get('passo')
+    if tipo == 'janela':
+        passo = passo or tamanho
+        if not isinstance(passo, int) or passo < 1 or passo > tamanho:
+            raise ValueError('Passo da janela deve ser um número entre 1 e o tamanho')
+    else:
+        passo = None
+
+    periodo = dados.get('periodo')
+    if tipo == 'periodo':
+        if periodo not in GRANULARIDADES:
+            raise ValueError(f'Período inválido. Use: {", ".join(GRANULARIDADES)}')
+    else:
+        periodo = None
+
+    return {'tipo': tipo, 'tamanho': tamanho, 'passo': passo, 'periodo': periodo}
+
+
+def _inicializar_estado(politica, contador_anterior, pesquisa_pendente):
+    """Alinha uma política nova com os relatórios já gerados pelo gatilho antigo (a cada 10).
+
+    `pesquisa_pendente`: a transação já inseriu uma pesquisa que ainda não
+    está em `contador_anterior` (envio), e ela também fica fora da janela.
+    """
+    pendentes = contador_anterior % TAMANHO_PADRAO
+    politica.contador_base = contador_anterior - pendentes
+
+    # Última pesquisa coberta = a que vem antes das `pendentes` mais recentes (e da nova, se houver)
+    ultima = Pesquisa.query.with_entities(Pesquisa.id).filter_by(
+        linha_numero=politica.linha_numero
+    ).order_by(Pesquisa.id.desc()).offset(pendentes + (1 if pesquisa_pendente else 0)).first()
+    politica.ultimo_pesquisa_id = ultima.id if ultima else 0
+
+
+def incrementar_contador(linha_numero):
+    """Incrementa o contador da linha de forma atômica e retorna o registro atualizado.
+
+    O UPDATE ... SET contador = contador + 1 evita o ler-modificar-gravar entre
+    workers e mantém a linha do contador bloqueada até o commit, serializando as
+    pesquisas da mesma linha.
+    """
+    inserir_ou_ignorar(ContadorLinha.__table__, linha_numero=linha_numero, contador=0)
+    ContadorLinha.query.filter_by(linha_numero=linha_numero).update(
+        {'contador': ContadorLinha.contador + 1}, synchronize_session=False
+    )
+    return ContadorLinha.query.filter_by(linha_numero=linha_numero).execution_options(
+        populate_existing=True
+    ).one()
+
+
+def obter_politica(linha_numero, contador_anterior=0, bloquear=True, pesquisa_pendente=False):
+    """Busca (bloqueando a linha para atualização) ou cria a política da linha.
+
+    Ao criar, `pesquisa_pendente` indica se a transação já inseriu uma
+    pesquisa da linha que não entra em `contador_anterior`.
+    """
+    consulta = PoliticaRelatorio.query.filter_by(linha_numero=linha_numero)
+    if bloquear:
+        consulta = consulta.with_for_update()
+    politica = consulta.first()
+
+    if not politica:
+        politica = PoliticaRelatorio(linha_numero, tamanho=TAMANHO_PADRAO)
+        _inicializar_estado(politica, contador_anterior, pesquisa_pendente)
+        db.session.add(politica)
+        db.session.flush()
+
+    return politica
+
+
+def _janelas_contagem(politica, contador):
+    """Janelas consecutivas de `tamanho` pesquisas, por id, sem sobreposição nem lacunas"""
+    janelas = []
+    while politica.pesquisas_pendentes(contador) >= politica.tamanho:
+        pesquisas = Pesquisa.query.filter(
+            Pesquisa.linha_numero == politica.linha_numero,
+            Pesquisa.id > politica.ultimo_pesquisa_id
+        ).order_by(Pesquisa.id).limit(politica.tamanho).all()
+
+        if len(pesquisas) < politica.tamanho:
+            break
+
+        janelas.append(pesquisas)
+        politica.ultimo_pesquisa_id = pesquisas[-1].id
+        politica.contador_base += politica.tamanho
+    return janelas
+
+
+def _janelas_deslizantes(politica, contador, pesquisa):
+    """A cada `passo` pesquisas, uma janela com as últimas `tamanho` pesquisas"""
+    if politica.pesquisas_pendentes(contador) < (politica.passo or politica.tamanho):
+        return []
+
+    pesquisas = Pesquisa.query.filter(
+        Pesquisa.linha_numero == politica.linha_numero,
+        Pesquisa.id <= pesquisa.id
+    ).order_by(Pesquisa.id.desc()).limit(politica.tamanho).all()
+
+    politica.ultimo_pesquisa_id = pesquisa.id
+    politica.contador_base = contador
+    return [list(reversed(pesquisas))]
+
+
+def fechar_periodo(politica, limite):
+    """Fecha a janela com as pesquisas ainda não cobertas anteriores ao início de `limite`"""
+    pesquisas = Pesquisa.query.filter(
+        Pesquisa.linha_numero == politica.linha_numero,
+        Pesquisa.id > politica.ultimo_pesquisa_id,
+        Pesquisa.data_criacao < datetime.combine(limite, datetime.min.time())
+    ).order_by(Pesquisa.id).all()
+
+    politica.inicio_periodo_atual = limite
+    if not pesquisas:
+        return []
+
+    politica.ultimo_pesquisa_id = pesquisas[-1].id
+    politica.contador_base += len(pesquisas)
+    return [pesquisas]
+
+
+def _janelas_periodo(politica, pesquisa):
+    atual = inicio_periodo(pesquisa.data_criacao.date(), politica.periodo)
+    if politica.inicio_periodo_atual is None:
+        politica.inicio_periodo_atual = atual
+        return []
+    if atual <= politica.inicio_periodo_atual:
+        return []
+    return fechar_periodo(politica, atual)
+
+
+def _criar_relatorios(politica, janelas):
+    relatorios = []
+    for pesquisas in janelas:
+        politica.sequencia += 1
+        
+        # Reservar a chave da janela; se já existe, outro worker já gerou este relatório
+        if not inserir_ou_ignorar(JanelaRelatorio.__table__,
+                                  linha_numero=politica.linha_numero,
+                                  sequencia=politica.sequencia,
+                                  data_criacao=datetime.now()):
+            print(f"⚠️ Janela #{politica.sequencia} da linha {politica.linha_numero} já possui relatório")
+            continue
+        
+        relatorio = Relatorio(politica.linha_numero, pesquisas)
+        db.session.add(relatorio)
+        db.session.flush()
+        JanelaRelatorio.query.filter_by(
+            linha_numero=politica.linha_numero, sequencia=politica.sequencia
+        ).update({'relatorio_id': relatorio.id}, synchronize_session=False)
+        # O e-mail é montado e enviado pelo agendador, fora da transação da pesquisa
+        enfileirar_relatorio(relatorio)
+        relatorios.append(relatorio)
+
+        print(f"📊 Relatório #{politica.sequencia} ({politica.tipo}) criado para linha {politica.linha_numero}")
+        print(f"   📈 Média geral: {relatorio.media_geral:.1f}/10")
+        print(f"   📅 Período: {relatorio.periodo_inicio.strftime('%d/%m/%Y')} a {relatorio.periodo_fim.strftime('%d/%m/%Y')}")
+    return relatorios
+
+
+def avaliar_politica(contador, pesquisa):
+    """Avalia a política da linha após uma nova pesquisa (já adicionada à sessão).
+
+    Deve ser chamada na mesma transação que incrementou `contador` e inseriu a
+    pesquisa; não faz commit. Retorna a política e os relatórios criados.
+    """
+    politica = obter_politica(contador.linha_numero, contador.contador - 1, pesquisa_pendente=True)
+
+    if politica.tipo == 'periodo':
+        janelas = _janelas_periodo(politica, pesquisa)
+    elif politica.tipo == 'janela':
+        janelas = _janelas_deslizantes(politica, contador.contador, pesquisa)
+    else:
+        janelas = _janelas_contagem(politica, contador.contador)
+
+    return politica, _criar_relatorios(politica, janelas)
+
+
+def fechar_periodos_vencidos(hoje=None):
+    """Fecha as janelas de políticas por período já encerradas, mesmo sem novas pesquisas"""
+    hoje = hoje or date.today()
+    relatorios = []
+
+    politicas = PoliticaRelatorio.query.filter_by(tipo='periodo').all()
+    for politica in politicas:
+        atual = inicio_periodo(hoje, politica.periodo)
+        if politica.inicio_periodo_atual is None or politica.inicio_periodo_atual >= atual:
+            continue
+
+        politica = PoliticaRelatorio.query.filter_by(id=politica.id).with_for_update().first()
+        if politica.inicio_periodo_atual < atual:
+            relatorios += _criar_relatorios(politica, fechar_periodo(politica, atual))
+        db.session.commit()
+
+    return relatorios
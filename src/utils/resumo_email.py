@@ -0,0 +1,219 @@
+import re
+from datetime import datetime, timedelta
+
+from flask import current_app
+from markupsafe import escape
+
+from src.database import db, inserir_ou_ignorar
+from src.models.envio_email import EnvioEmail, GrupoEmail, RelatorioResumido
+from src.models.pesquisa import DIMENSOES
+from src.models.pesquisa_diaria import MarcadorProcessamento
+from src.models.relatorio import Relatorio
+from src.utils.email import classificar_nota, enfileirar_email
+
+MARCADOR = 'resumo_email'
+
+# Sem marca d'água (primeiro resumo), considerar só os relatórios recentes
+JANELA_INICIAL = timedelta(days=1)
+
+# Relatórios criados pouco antes do último resumo podem ter sido gravados depois dele;
+# a busca volta esta margem e os já incluídos são descartados pela tabela de resumidos
+MARGEM = timedelta(minutes=5)
+
+EMAIL_VALIDO = re.compile(r'^[^@\s,]+@[^@\s,]+\.[^@\s,]+$')
+
+
+def _lista(valor):
+    """Aceita lista ou texto separado por vírgulas"""
+    if isinstance(valor, str):
+        valor = valor.split(',')
+    return [str(v).strip() for v in (valor or []) if str(v).strip()]
+
+
+def validar_grupo(dados):
+    """Valida os campos de um grupo de e-mail recebido pela API; retorna os campos normalizados"""
+    nome = (dados.get('nome') or '').strip()
+    if not nome:
+        raise ValueError('Nome do grupo é obrigatório')
+
+    destinatarios = _lista(dados.get('destinatarios'))
+    if not destinatarios:
+        raise ValueError('Informe ao menos um destinatário')
+    invalidos = [d for d in destinatarios if not EMAIL_VALIDO.match(d)]
+    if invalidos:
+        raise ValueError(f'E-mails inválidos: {", ".join(invalidos)}')
+
+    return {
+        'nome': nome,
+        'linhas': ','.join(_lista(dados.get('linhas'))),
+        'destinatarios': ','.join(destinatarios),
+        'ativo': bool(dados.get('ativo', True))
+    }
+
+
+def relatorios_pendentes():
+    """Relatórios ainda não incluídos em nenhum resumo nem enviados individualmente"""
+    marca = MarcadorProcessamento.obter(MARCADOR)
+    query = Relatorio.query.filter(
+        ~Relatorio.id.in_(db.select(EnvioEmail.relatorio_id).where(EnvioEmail.relatorio_id.isnot(None))),
+        ~Relatorio.id.in_(db.select(RelatorioResumido.relatorio_id))
+    )
+    if marca and marca.isdigit():
+        # Marcador antigo: id do último relatório incluído
+        query = query.filter(Relatorio.id > int(marca))
+    elif marca:
+        query = query.filter(Relatorio.data_criacao >= datetime.fromisoformat(marca) - MARGEM)
+    else:
+        query = query.filter(Relatorio.data_criacao >= datetime.now() - JANELA_INICIAL)
+    return query.order_by(Relatorio.id).all()
+
+
+def _destinatarios_por_linha(linhas):
+    """Lista de destinatários de cada linha, segundo os grupos ativos (ou o padrão da configuração)"""
+    grupos = GrupoEmail.query.filter_by(ativo=True).all()
+    padrao = tuple(_lista(current_app.config['EMAIL_DESTINATARIOS']))
+
+    destinos = {}
+    for linha in linhas:
+        emails = sorted({e for g in grupos if g.abrange(linha) for e in g.get_destinatarios()})
+        destinos[linha] = tuple(emails) or padrao
+    return destinos
+
+
+def ranquear_linhas(relatorios):
+    """Consolida os relatórios por linha (médias ponderadas pelo nº de pesquisas), piores primeiro"""
+    linhas = {}
+    for r in relatorios:
+        item = linhas.setdefault(r.linha_numero, {
+            'linha_numero': r.linha_numero, 'relatorios': 0, 'total_pesquisas': 0,
+            'somas': {d: 0.0 for d in DIMENSOES}
+        })
+        item['relatorios'] += 1
+        item['total_pesquisas'] += r.total_pesquisas
+        for d in DIMENSOES:
+            item['somas'][d] += getattr(r, f'media_{d}') * r.total_pesquisas
+
+    ranking = []
+    for item in linhas.values():
+        total = item.pop('total_pesquisas')
+        somas = item.pop('somas')
+        medias = {d: somas[d] / total for d in DIMENSOES}
+        item.update({
+            'total_pesquisas': total,
+            'medias': medias,
+            'media_geral': sum(medias.values()) / len(DIMENSOES),
+            'pior_dimensao': min(DIMENSOES, key=medias.get)
+        })
+        ranking.append(item)
+
+    ranking.sort(key=lambda i: (i['media_geral'], i['linha_numero']))
+    return ranking
+
+
+def gerar_resumo_email(ranking, inicio, fim):
+    """Monta o assunto e o HTML do resumo com a tabela de linhas (piores primeiro)"""
+    total_pesquisas = sum(i['total_pesquisas'] for i in ranking)
+    total_relatorios = sum(i['relatorios'] for i in ranking)
+    media_rede = sum(i['media_geral'] * i['total_pesquisas'] for i in ranking) / total_pesquisas
+    periodo = f"{inicio.strftime('%d/%m/%Y')} a {fim.strftime('%d/%m/%Y')}"
+    cores = {'Excelente': '#d4edda', 'Bom': '#d1ecf1', 'Regular': '#fff3cd', 'Ruim': '#f8d7da'}
+
+    linhas_tabela = ''
+    for posicao, item in enumerate(ranking, 1):
+        classificacao = classificar_nota(item['media_geral'])
+        notas = ''.join(f'<td>{item["medias"][d]:.1f}</td>' for d in DIMENSOES)
+        linhas_tabela += f"""
+                    <tr style="background-color: {cores[classificacao]};">
+                        <td>{posicao}</td>
+                        <td><strong>{escape(item['linha_numero'])}</strong></td>
+                        <td><strong>{item['media_geral']:.1f}</strong> ({classificacao})</td>
+                        {notas}
+                        <td>{item['pior_dimensao'].capitalize()}</td>
+                        <td>{item['total_pesquisas']}</td>
+                        <td>{item['relatorios']}</td>
+                    </tr>"""
+
+    cabecalho_dimensoes = ''.join(f'<th>{d.capitalize()}</th>' for d in DIMENSOES)
+    html_content = f"""
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 0; padding: 0; background-color: #f4f4f4; }}
+            .container {{ max-width: 1000px; margin: 0 auto; background-color: white; }}
+            .header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; }}
+            .content {{ padding: 30px; }}
+            table {{ width: 100%; border-collapse: collapse; font-size: 13px; }}
+            th {{ background-color: #343a40; color: white; padding: 8px; }}
+            td {{ padding: 8px; border-bottom: 1px solid #dee2e6; text-align: center; }}
+            .footer {{ background-color: #343a40; color: white; padding: 20px; text-align: center; font-size: 12px; }}
+            h1 {{ margin: 0; font-size: 28px; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>🚌 Resumo de Satisfação por Linha</h1>
+                <p style="font-size: 16px;">Período: {periodo}</p>
+                <p style="font-size: 14px; opacity: 0.9;">{len(ranking)} linhas, {total_relatorios} relatórios, {total_pesquisas} pesquisas</p>
+                <p style="font-size: 20px;"><strong>Média da rede: {media_rede:.1f}/10</strong></p>
+            </div>
+            <div class="content">
+                <h2>📉 Linhas ordenadas da pior para a melhor</h2>
+                <table>
+                    <tr><th>#</th><th>Linha</th><th>Média geral</th>{cabecalho_dimensoes}<th>Pior aspecto</th><th>Pesquisas</th><th>Relatórios</th></tr>{linhas_tabela}
+                </table>
+            </div>
+            <div class="footer">
+                <p>📧 Resumo gerado automaticamente pelo Sistema de Pesquisa de Satisfação</p>
+                <p>🕐 Data de geração: {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+
+    pior = ranking[0]
+    assunto = (f"Resumo de Satisfação - {len(ranking)} linhas ({periodo}) - "
+               f"pior: linha {pior['linha_numero']} ({pior['media_geral']:.1f}/10)")
+    return assunto, html_content
+
+
+def enfileirar_resumos(forcar=False):
+    """Enfileira um resumo por lista de destinatários com os relatórios ainda não resumidos.
+
+    Só age no modo 'resumo' (EMAIL_MODO), a não ser que `forcar` seja verdadeiro.
+    Retorna os envios criados.
+    """
+    if not forcar and current_app.config.get('EMAIL_MODO') != 'resumo':
+        return []
+
+    inicio_execucao = datetime.now()
+    # Reservar cada relatório; um resumo simultâneo (agendador e rota manual) fica só com os que reservou
+    relatorios = [
+        r for r in relatorios_pendentes()
+        if inserir_ou_ignorar(RelatorioResumido.__table__, relatorio_id=r.id, data_criacao=inicio_execucao)
+    ]
+    if not relatorios:
+        db.session.rollback()
+        return []
+
+    # Agrupar as linhas por lista de destinatários: cada lista recebe uma única mensagem
+    destinos = _destinatarios_por_linha({r.linha_numero for r in relatorios})
+    por_lista = {}
+    for r in relatorios:
+        por_lista.setdefault(destinos[r.linha_numero], []).append(r)
+
+    inicio = min(r.periodo_inicio for r in relatorios)
+    fim = max(r.periodo_fim for r in relatorios)
+
+    envios = []
+    for destinatarios, grupo in por_lista.items():
+        # Renderizado uma única vez por lista de destinatários
+        assunto, html_content = gerar_resumo_email(ranquear_linhas(grupo), inicio, fim)
+        envios.append(enfileirar_email(list(destinatarios), assunto, html_content, tipo='resumo'))
+
+    MarcadorProcessamento.definir(MARCADOR, inicio_execucao.isoformat())
+    db.session.commit()
+
+    print(f"📧 Resumo de {len(relatorios)} relatórios enfileirado para {len(envios)} lista(s) de destinatários")
+    return envios
@@ -0,0 +1,116 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+try:
+    import bcrypt
+except ImportError:  # bcrypt é opcional: sem ele, PBKDF2 do Werkzeug
+    bcrypt = None
+
+ALGORITMOS = ('bcrypt', 'pbkdf2')
+
+# Custo padrão: rounds do bcrypt (2^n iterações) ou iterações do PBKDF2-SHA256
+CUSTO_PADRAO = {'bcrypt': 11, 'pbkdf2': 600000}
+
+# Espera máxima por uma vaga na fila antes de recusar o login
+ESPERA_MAXIMA_SEGUNDOS = 5
+
+_BCRYPT_CUSTO = re.compile(r'^\$2[aby]\$(\d{2})\$')
+_PBKDF2_CUSTO = re.compile(r'^pbkdf2:sha256:(\d+)\$')
+
+
+class ErroServicoSenhas(Exception):
+    """Fila de verificação de senhas cheia: o servidor está sobrecarregado"""
+
+
+class ServicoSenhas:
+    """Hash e verificação de senhas fora da thread da requisição.
+
+    O trabalho (bcrypt e PBKDF2 liberam o GIL) roda num pool de threads de
+    tamanho fixo, e a fila de espera também é limitada: num pico de logins o
+    processador não é disputado por dezenas de hashes ao mesmo tempo e, além
+    do limite, o login é recusado em vez de acumular requisições.
+    """
+
+    def __init__(self, algoritmo=None, custo=None, threads=None):
+        algoritmo = algoritmo or os.environ.get('SENHA_ALGORITMO') or ('bcrypt' if bcrypt else 'pbkdf2')
+        if algoritmo not in ALGORITMOS:
+            raise ValueError(f'Algoritmo de senha inválido: {algoritmo}. Use: {", ".join(ALGORITMOS)}')
+        if algoritmo == 'bcrypt' and bcrypt is None:
+            print("⚠️ bcrypt não instalado: usando PBKDF2 para as senhas")
+            algoritmo = 'pbkdf2'
+        self.algoritmo = algoritmo
+        self.custo = int(custo or os.environ.get('SENHA_CUSTO') or CUSTO_PADRAO[algoritmo])
+        self.threads = int(threads or os.environ.get('SENHA_THREADS') or max(2, os.cpu_count() or 1))
+        self._vagas = threading.BoundedSemaphore(self.threads * 8)
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+        # Hash de referência para usuários inexistentes (mesmo tempo de resposta)
+        self._hash_ficticio = None
+
+    def _executor(self):
+        # Criado no primeiro uso em cada processo: threads não sobrevivem a um fork
+        if self._pool_pid != os.getpid():
+            with self._pool_lock:
+                if self._pool_pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='senhas')
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def _executar(self, funcao, *args):
+        if not self._vagas.acquire(timeout=ESPERA_MAXIMA_SEGUNDOS):
+            raise ErroServicoSenhas('Muitas operações de senha simultâneas. Tente novamente em instantes.')
+        try:
+            return self._executor().submit(funcao, *args).result()
+        finally:
+            self._vagas.release()
+
+    def _gerar(self, senha):
+        if self.algoritmo == 'bcrypt':
+            return bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt(self.custo)).decode('ascii')
+        return generate_password_hash(senha, method=f'pbkdf2:sha256:{self.custo}')
+
+    @staticmethod
+    def _conferir(senha_hash, senha):
+        if senha_hash.startswith('$2'):
+            if bcrypt is None:
+                return False
+            return bcrypt.checkpw(senha.encode('utf-8'), senha_hash.encode('ascii'))
+        return check_password_hash(senha_hash, senha)
+
+    def gerar_hash(self, senha):
+        return self._executar(self._gerar, senha)
+
+    def verificar(self, senha_hash, senha):
+        """Confere a senha; sem hash (usuário inexistente) gasta o mesmo tempo e retorna False"""
+        if senha_hash is None:
+            if self._hash_ficticio is None:
+                self._hash_ficticio = self.gerar_hash(os.urandom(16).hex())
+            self._executar(self._conferir, self._hash_ficticio, senha)
+            return False
+        return self._executar(self._conferir, senha_hash, senha)
+
+    def precisa_rehash(self, senha_hash):
+        """True se o hash foi gerado com outro algoritmo ou outro custo"""
+        if self.algoritmo == 'bcrypt':
+            encontrado = _BCRYPT_CUSTO.match(senha_hash)
+        else:
+            encontrado = _PBKDF2_CUSTO.match(senha_hash)
+        return encontrado is None or int(encontrado.group(1)) != self.custo
+
+
+_servico_lock = threading.Lock()
+
+
+def obter_servico_senhas():
+    """Serviço da aplicação atual (cada instância do app tem o seu pool e a sua fila)"""
+    servico = current_app.extensions.get('servico_senhas')
+    if servico is None:
+        with _servico_lock:
+            servico = current_app.extensions.setdefault('servico_senhas', ServicoSenhas())
+    return servico
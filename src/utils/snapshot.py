@@ -0,0 +1,345 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from src.database import db
+from src.models.pesquisa import Pesquisa, DIMENSOES
+
+# NumPy é opcional: sem ele, não há snapshot e as análises leem do banco
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+# fcntl só existe em sistemas Unix; sem ele, a construção não é protegida contra concorrência
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - depende do sistema
+    fcntl = None
+
+# Colunas do snapshot: um arquivo binário por coluna, com tipo fixo
+COLUNAS = [('id', 'int64'), ('linha', 'int32')] + [(d, 'uint8') for d in DIMENSOES] + [('data', 'int64')]
+
+# Pesquisas mais novas que isto ficam fora do snapshot: uma transação ainda aberta
+# pode gravar um id menor que o maior já visível, e ele seria perdido
+MARGEM = timedelta(minutes=5)
+
+LOTE = 50000
+
+SEGUNDOS_DIA = 86400
+
+
+def _segundos(momento):
+    """Data/hora local (sem fuso) em segundos desde 1970-01-01"""
+    return int((momento - datetime(1970, 1, 1)).total_seconds())
+
+
+def _identificar_banco():
+    """Identifica o banco de origem, para descartar snapshots de outro banco"""
+    url = db.engine.url.render_as_string(hide_password=True)
+    return hashlib.sha1(url.encode()).hexdigest()[:12]
+
+
+class SnapshotPesquisas:
+    """Cópia colunar das pesquisas em arquivos mapeáveis em memória.
+
+    Cada coluna é um arquivo binário (id int64, linha int32, notas uint8 e
+    data/hora int64 em segundos). O meta.json aponta a geração atual e quantas
+    linhas são válidas; os arquivos só crescem por append, e o meta é trocado
+    atomicamente depois, então leitores nunca veem linhas pela metade. Os
+    workers abrem os arquivos com np.memmap e compartilham as mesmas páginas
+    do cache do sistema, sem cópia.
+    """
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self._assinatura = None
+        self._dados = None
+
+    @property
+    def caminho_meta(self):
+        return os.path.join(self.diretorio, 'meta.json')
+
+    def _ler_meta(self):
+        try:
+            with open(self.caminho_meta, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _gravar_meta(self, meta):
+        temporario = self.caminho_meta + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho_meta)
+
+    def _arquivo(self, geracao, coluna):
+        return os.path.join(self.diretorio, f'g{geracao}', f'{coluna}.bin')
+
+    # Leitura
+
+    def abrir(self):
+        """Retorna {coluna: array, 'linhas': [...], 'meta': {...}} ou None sem snapshot.
+
+        Os arrays são reabertos só quando o meta.json muda.
+        """
+        if np is None:
+            return None
+        try:
+            estado = os.stat(self.caminho_meta)
+        except FileNotFoundError:
+            self._dados = None
+            return None
+
+        assinatura = (estado.st_mtime_ns, estado.st_size)
+        if assinatura != self._assinatura:
+            meta = self._ler_meta()
+            if not meta:
+                return None
+            total = meta['total']
+            dados = {'meta': meta, 'linhas': meta['linhas']}
+            for coluna, tipo in COLUNAS:
+                if total:
+                    dados[coluna] = np.memmap(self._arquivo(meta['geracao'], coluna), dtype=tipo, mode='r', shape=(total,))
+                else:
+                    dados[coluna] = np.zeros(0, dtype=tipo)
+            self._dados, self._assinatura = dados, assinatura
+        return self._dados
+
+    # Construção
+
+    def _bloquear(self):
+        os.makedirs(self.diretorio, exist_ok=True)
+        trava = open(os.path.join(self.diretorio, '.lock'), 'w')
+        if fcntl is not None:
+            try:
+                fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                trava.close()
+                return None
+        return trava
+
+    def atualizar(self, reconstruir=False, lote=LOTE):
+        """Acrescenta as pesquisas novas (por id) ao snapshot; retorna quantas foram incluídas"""
+        if np is None:
+            return 0
+
+        trava = self._bloquear()
+        if trava is None:
+            print("⚠️ Snapshot de pesquisas já está sendo atualizado por outro processo")
+            return 0
+
+        try:
+            return self._atualizar(reconstruir, lote)
+        finally:
+            trava.close()
+
+    def _atualizar(self, reconstruir, lote):
+        inicio = time.perf_counter()
+        banco = _identificar_banco()
+        meta = self._ler_meta()
+        maior_id_banco = db.session.query(db.func.max(Pesquisa.id)).scalar() or 0
+
+        # Banco diferente ou reiniciado: começar uma nova geração do zero
+        if reconstruir or not meta or meta.get('banco') != banco or meta['ultimo_id'] > maior_id_banco:
+            geracao_antiga = meta['geracao'] if meta else None
+            meta = {
+                'geracao': (geracao_antiga or 0) + 1, 'banco': banco,
+                'total': 0, 'ultimo_id': 0, 'linhas': []
+            }
+        else:
+            geracao_antiga = None
+
+        pasta = os.path.join(self.diretorio, f"g{meta['geracao']}")
+        os.makedirs(pasta, exist_ok=True)
+
+        # Descartar restos de uma atualização interrompida, além do total publicado
+        arquivos = {}
+        for coluna, tipo in COLUNAS:
+            caminho = self._arquivo(meta['geracao'], coluna)
+            arquivo = open(caminho, 'r+b' if os.path.exists(caminho) else 'w+b')
+            arquivo.truncate(meta['total'] * np.dtype(tipo).itemsize)
+            arquivo.seek(0, os.SEEK_END)
+            arquivos[coluna] = arquivo
+
+        codigos = {linha: i for i, linha in enumerate(meta['linhas'])}
+        limite_id = db.session.query(db.func.max(Pesquisa.id)).filter(
+            Pesquisa.data_criacao < datetime.now() - MARGEM
+        ).scalar() or 0
+
+        novas = 0
+        try:
+            while meta['ultimo_id'] < limite_id:
+                registros = db.session.query(
+                    Pesquisa.id, Pesquisa.linha_numero, *[getattr(Pesquisa, d) for d in DIMENSOES], Pesquisa.data_criacao
+                ).filter(
+                    Pesquisa.id > meta['ultimo_id'], Pesquisa.id <= limite_id
+                ).order_by(Pesquisa.id).limit(lote).all()
+                if not registros:
+                    break
+
+                colunas = list(zip(*registros))
+                linhas = []
+                for linha in colunas[1]:
+                    if linha not in codigos:
+                        codigos[linha] = len(meta['linhas'])
+                        meta['linhas'].append(linha)
+                    linhas.append(codigos[linha])
+
+                valores = [colunas[0], linhas] + list(colunas[2:2 + len(DIMENSOES)]) + [
+                    [_segundos(d) for d in colunas[-1]]
+                ]
+                for (coluna, tipo), valor in zip(COLUNAS, valores):
+                    arquivos[coluna].write(np.asarray(valor, dtype=tipo).tobytes())
+
+                meta['total'] += len(registros)
+                meta['ultimo_id'] = colunas[0][-1]
+                novas += len(registros)
+
+            for arquivo in arquivos.values():
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+        finally:
+            for arquivo in arquivos.values():
+                arquivo.close()
+            db.session.rollback()
+
+        meta['atualizado_em'] = datetime.now().isoformat()
+        self._gravar_meta(meta)
+
+        # Leitores da geração antiga mantêm os arquivos abertos até reabrirem (unlink é seguro)
+        if geracao_antiga is not None:
+            shutil.rmtree(os.path.join(self.diretorio, f'g{geracao_antiga}'), ignore_errors=True)
+
+        duracao = (time.perf_counter() - inicio) * 1000
+        if novas:
+            print(f"🗂️ Snapshot de pesquisas: +{novas} ({meta['total']} no total, até id {meta['ultimo_id']}) em {duracao:.0f} ms")
+        return novas
+
+
+def obter_snapshot():
+    """Snapshot da aplicação atual, num subdiretório de SNAPSHOT_DIR próprio do banco.
+
+    Os workers de um mesmo banco compartilham os arquivos; instâncias do app
+    ligadas a bancos diferentes não leem as pesquisas uma da outra.
+    """
+    snapshot = current_app.extensions.get('snapshot_pesquisas')
+    if snapshot is None:
+        url = db.engine.url.render_as_string(hide_password=True)
+        diretorio = os.path.join(current_app.config['SNAPSHOT_DIR'], hashlib.sha256(url.encode('utf-8')).hexdigest()[:12])
+        snapshot = current_app.extensions.setdefault('snapshot_pesquisas', SnapshotPesquisas(diretorio))
+    return snapshot
+
+
+def atualizar_snapshot():
+    """Tarefa agendada: acrescenta as pesquisas novas ao snapshot"""
+    return obter_snapshot().atualizar()
+
+
+def _selecionar(dados, linhas, inicio, fim):
+    """Máscara das pesquisas do snapshot que atendem aos filtros (ou None para todas)"""
+    mascara = None
+    if linhas:
+        selecionadas = set(linhas)
+        codigos = [i for i, linha in enumerate(dados['linhas']) if linha in selecionadas]
+        mascara = np.isin(dados['linha'], np.asarray(codigos, dtype='int32'))
+    if inicio:
+        condicao = dados['data'] >= _segundos(datetime.combine(inicio, datetime.min.time()))
+        mascara = condicao if mascara is None else mascara & condicao
+    if fim:
+        condicao = dados['data'] < _segundos(datetime.combine(fim + timedelta(days=1), datetime.min.time()))
+        mascara = condicao if mascara is None else mascara & condicao
+    return mascara
+
+
+def _agregar_por_chave(chaves, notas, quantidade):
+    """Total, somas e histogramas por chave inteira (0..quantidade-1) com bincount"""
+    totais = np.bincount(chaves, minlength=quantidade)
+    histogramas = {
+        d: np.bincount(chaves * 10 + (notas[d].astype('int64') - 1), minlength=quantidade * 10).reshape(quantidade, 10)
+        for d in DIMENSOES
+    }
+    somas = {d: histogramas[d] @ np.arange(1, 11) for d in DIMENSOES}
+    return totais, somas, histogramas
+
+
+def _agregado(i, totais, somas, histogramas):
+    return {
+        'total': int(totais[i]),
+        'somas': {d: int(somas[d][i]) for d in DIMENSOES},
+        'histogramas': {d: histogramas[d][i].tolist() for d in DIMENSOES}
+    }
+
+
+def agregados_snapshot(linhas=None, inicio=None, fim=None):
+    """Agregados por linha calculados do snapshot; retorna (resultado, último id coberto) ou None"""
+    dados = obter_snapshot().abrir()
+    if dados is None:
+        return None
+
+    mascara = _selecionar(dados, linhas, inicio, fim)
+    chaves = dados['linha'] if mascara is None else dados['linha'][mascara]
+    notas = {d: dados[d] if mascara is None else dados[d][mascara] for d in DIMENSOES}
+    totais, somas, histogramas = _agregar_por_chave(chaves.astype('int64'), notas, len(dados['linhas']))
+
+    resultado = {
+        linha: _agregado(i, totais, somas, histogramas)
+        for i, linha in enumerate(dados['linhas']) if totais[i]
+    }
+    return resultado, dados['meta']['ultimo_id']
+
+
+def agregados_diarios_snapshot(linhas, inicio, fim):
+    """Agregados por (linha, dia) calculados do snapshot; retorna (resultado, último id coberto) ou None.
+
+    As chaves cobrem só as linhas pedidas e os dias que têm pesquisas no
+    intervalo, então a memória não cresce com o total de linhas do snapshot
+    nem com um intervalo pedido muito maior que os dados.
+    """
+    dados = obter_snapshot().abrir()
+    if dados is None:
+        return None
+
+    mascara = _selecionar(dados, linhas, inicio, fim)
+    codigos_snapshot = dados['linha'] if mascara is None else dados['linha'][mascara]
+    dias_pesquisas = (dados['data'] if mascara is None else dados['data'][mascara]) // SEGUNDOS_DIA
+    if not len(dias_pesquisas):
+        return {}, dados['meta']['ultimo_id']
+
+    # Linhas renumeradas entre as presentes na seleção; dias limitados ao primeiro e último com pesquisas
+    codigos, linhas_locais = np.unique(codigos_snapshot, return_inverse=True)
+    primeiro_dia, ultimo_dia = int(dias_pesquisas.min()), int(dias_pesquisas.max())
+    dias = ultimo_dia - primeiro_dia + 1
+
+    chaves = linhas_locais.astype('int64') * dias + (dias_pesquisas - primeiro_dia)
+    notas = {d: dados[d] if mascara is None else dados[d][mascara] for d in DIMENSOES}
+    totais, somas, histogramas = _agregar_por_chave(chaves, notas, len(codigos) * dias)
+
+    base = date.fromordinal(date(1970, 1, 1).toordinal() + primeiro_dia)
+    resultado = {}
+    for chave in np.flatnonzero(totais):
+        local, dia = divmod(int(chave), dias)
+        linha = dados['linhas'][codigos[local]]
+        resultado[(linha, base + timedelta(days=dia))] = _agregado(chave, totais, somas, histogramas)
+    return resultado, dados['meta']['ultimo_id']
+
+
+@click.command('snapshot-pesquisas')
+@click.option('--reconstruir', is_flag=True, help='Descarta o snapshot atual e exporta tudo de novo')
+@with_appcontext
+def comando_snapshot(reconstruir):
+    """Atualiza o snapshot colunar das pesquisas usado pelas análises"""
+    if np is None:
+        click.echo("❌ NumPy não está instalado; o snapshot não está disponível")
+        return
+    novas = obter_snapshot().atualizar(reconstruir=reconstruir)
+    click.echo(f"✅ {novas} pesquisa(s) incluídas no snapshot")
@@ -0,0 +1,44 @@
+from src.models.usuario import SessaoUsuario
+from src.utils.compactacao import compactar_pendentes
+from src.utils.politicas_relatorio import fechar_periodos_vencidos
+from src.utils.email import processar_fila_email
+from src.utils.resumo_email import enfileirar_resumos
+from src.utils.snapshot import atualizar_snapshot
+from src.utils.termos import podar_cauda_longa
+from src.utils.antispam import limpar_quarentena
+from src.utils.idempotencia import limpar_chaves_expiradas
+from src.utils.limites import limpar_baldes_inativos
+
+
+def registrar_tarefas(agendador):
+    """Registra as tarefas periódicas da aplicação no agendador"""
+    # Consolidação diária: roda de hora em hora, mas só processa dias novos
+    agendador.registrar('compactacao_diaria', '5 * * * *', compactar_pendentes)
+    
+    # Relatórios de políticas por período para linhas sem pesquisas novas
+    agendador.registrar('fechar_periodos_relatorio', '10 * * * *', fechar_periodos_vencidos)
+    
+    # Fila de e-mails: um lote por minuto, numa única conexão SMTP
+    agendador.registrar('enviar_emails', '* * * * *', processar_fila_email)
+    
+    # Resumo do período (só tem efeito com EMAIL_MODO=resumo)
+    agendador.registrar('resumo_email', agendador.app.config['EMAIL_RESUMO_CRON'], enfileirar_resumos)
+    
+    # Snapshot colunar para as análises: só acrescenta as pesquisas novas
+    agendador.registrar('snapshot_pesquisas', '*/5 * * * *', atualizar_snapshot)
+    
+    # Contadores de termos: descartar a cauda longa antiga
+    agendador.registrar('podar_termos', '45 3 * * *', podar_cauda_longa)
+    
+    # Envios marcados como spam: guardados só por DIAS_QUARENTENA
+    agendador.registrar('limpar_quarentena', '40 3 * * *', limpar_quarentena)
+    
+    # Idempotency-Key vencidas: um DELETE por execução, pelo índice de expira_em
+    agendador.registrar('limpar_chaves_idempotencia', '20 * * * *', limpar_chaves_expiradas)
+    
+    # Limite de requisições com LIMITES_BACKEND=banco: buckets de clientes que sumiram
+    agendador.registrar('limpar_baldes_limite', '50 3 * * *', limpar_baldes_inativos)
+    
+    agendador.registrar('limpar_sessoes_expiradas', '30 3 * * *', SessaoUsuario.limpar_sessoes_expiradas)
+    
+    return agendador
@@ -0,0 +1,140 @@
+from datetime import date, datetime, timedelta
+from src.database import db
+from src.models.pesquisa import DIMENSOES
+
+GRANULARIDADES = ('dia', 'semana', 'mes')
+
+# Limite de pontos (períodos x linhas) que uma única requisição pode pedir
+MAX_PONTOS = 5000
+
+# Janela padrão quando o início não é informado
+PERIODOS_PADRAO = {'dia': 30, 'semana': 12, 'mes': 12}
+
+
+class ErroTendencia(ValueError):
+    """Parâmetros inválidos para o cálculo de tendências"""
+
+
+def inicio_periodo(dia, granularidade):
+    """Retorna o primeiro dia do período (dia, semana ISO ou mês) que contém `dia`"""
+    if granularidade == 'semana':
+        return dia - timedelta(days=dia.weekday())
+    if granularidade == 'mes':
+        return dia.replace(day=1)
+    return dia
+
+
+def proximo_periodo(dia, granularidade):
+    """Retorna o início do período seguinte"""
+    if granularidade == 'semana':
+        return dia + timedelta(days=7)
+    if granularidade == 'mes':
+        if dia.month == 12:
+            return dia.replace(year=dia.year + 1, month=1)
+        return dia.replace(month=dia.month + 1)
+    return dia + timedelta(days=1)
+
+
+def contar_periodos(inicio, fim, granularidade):
+    """Quantidade de períodos entre `inicio` e `fim` (inclusive), sem listá-los"""
+    primeiro, ultimo = inicio_periodo(inicio, granularidade), inicio_periodo(fim, granularidade)
+    if granularidade == 'mes':
+        return (ultimo.year - primeiro.year) * 12 + ultimo.month - primeiro.month + 1
+    return (ultimo - primeiro).days // (7 if granularidade == 'semana' else 1) + 1
+
+
+def listar_periodos(inicio, fim, granularidade):
+    """Lista os inícios de todos os períodos entre `inicio` e `fim` (inclusive)"""
+    periodos = []
+    atual = inicio_periodo(inicio, granularidade)
+    while atual <= fim:
+        periodos.append(atual)
+        atual = proximo_periodo(atual, granularidade)
+    return periodos
+
+
+def expressao_periodo(coluna, granularidade):
+    """Expressão SQL que trunca `coluna` para o início do período, conforme o banco"""
+    dialeto = db.engine.dialect.name
+
+    if dialeto == 'postgresql':
+        unidade = {'dia': 'day', 'semana': 'week', 'mes': 'month'}[granularidade]
+        return db.func.date_trunc(unidade, coluna)
+
+    # SQLite: a semana começa na segunda-feira, como no date_trunc do PostgreSQL
+    if granularidade == 'semana':
+        return db.func.date(coluna, 'weekday 0', '-6 days')
+    if granularidade == 'mes':
+        return db.func.strftime('%Y-%m-01', coluna)
+    return db.func.strftime('%Y-%m-%d', coluna)
+
+
+def converter_periodo(valor):
+    """Converte o valor retornado pelo banco para date"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def validar_parametros(linhas, granularidade, inicio=None, fim=None):
+    """Valida e completa os parâmetros, aplicando o limite de pontos"""
+    if granularidade not in GRANULARIDADES:
+        raise ErroTendencia(f'Granularidade inválida. Use: {", ".join(GRANULARIDADES)}')
+    if not linhas:
+        raise ErroTendencia('Informe ao menos uma linha')
+
+    fim = fim or date.today()
+    if not inicio:
+        inicio = fim
+        for _ in range(PERIODOS_PADRAO[granularidade] - 1):
+            inicio = inicio_periodo(inicio, granularidade) - timedelta(days=1)
+        inicio = inicio_periodo(inicio, granularidade)
+    if inicio > fim:
+        raise ErroTendencia('Data inicial deve ser anterior à data final')
+
+    # Limite conferido pela conta, antes de montar a lista de períodos
+    quantidade = contar_periodos(inicio, fim, granularidade)
+    if quantidade * len(linhas) > MAX_PONTOS:
+        raise ErroTendencia(
+            f'Consulta muito grande: {quantidade} períodos x {len(linhas)} linhas '
+            f'excede o limite de {MAX_PONTOS} pontos'
+        )
+
+    return inicio, fim, listar_periodos(inicio, fim, granularidade)
+
+
+def calcular_tendencias(linhas, granularidade='dia', inicio=None, fim=None):
+    """Tendências por linha e período, a partir da consolidação diária, preenchendo períodos vazios"""
+    from src.utils.compactacao import agregados_diarios, agregado_vazio, somar_agregado
+
+    inicio, fim, periodos = validar_parametros(linhas, granularidade, inicio, fim)
+
+    # Dias encerrados vêm de pesquisa_diaria; só o que passou da marca d'água é lido das pesquisas
+    agregados = {}
+    for (linha, dia), agregado in agregados_diarios(linhas, inicio, fim).items():
+        chave = (linha, inicio_periodo(dia, granularidade))
+        somar_agregado(agregados.setdefault(chave, agregado_vazio()), agregado)
+
+    series = []
+    for linha in linhas:
+        pontos = []
+        for p in periodos:
+            agregado = agregados.get((linha, p))
+            total = agregado['total'] if agregado else 0
+            ponto = {'periodo': p.isoformat(), 'total_pesquisas': total}
+            medias = [agregado['somas'][d] / total if total else None for d in DIMENSOES]
+            for dimensao, media in zip(DIMENSOES, medias):
+                ponto[f'media_{dimensao}'] = round(media, 2) if media is not None else None
+            ponto['media_geral'] = round(sum(medias) / len(medias), 2) if total else None
+            pontos.append(ponto)
+        series.append({'linha': linha, 'pontos': pontos})
+
+    return {
+        'granularidade': granularidade,
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'total_periodos': len(periodos),
+        'series': series
+    }
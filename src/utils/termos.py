@@ -0,0 +1,197 @@
+import heapq
+import re
+from functools import total_ordering
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+
+from src.database import db, somar_ou_inserir
+from src.models.pesquisa import Pesquisa
+from src.models.termo_diario import TermoDiario
+from src.utils.indice_linhas import normalizar_texto
+
+# Palavras sem conteúdo em português (já sem acentos, como saem de normalizar_texto)
+STOPWORDS = frozenset('''
+    a ao aos aquela aquelas aquele aqueles aquilo as ate bem com como da das de dela delas dele deles
+    depois do dos e ela elas ele eles em entre era eram essa essas esse esses esta estao estas estava
+    estavam este estes estou eu foi foram ha isso isto ja la lhe lhes mais mas me mesmo meu meus minha
+    minhas muito muita muitos muitas na nas nem no nos nossa nossas nosso nossos num numa o os ou para
+    pela pelas pelo pelos por pra pro qual quando que quem se sem ser seu seus so sua suas tambem te tem
+    tinha tinham to tu tua tuas um uma umas uns vai vao voce voces vez sao fica ficou todo toda
+    todos todas sempre nada tudo aqui ali ai assim entao dia hoje ontem
+'''.split())
+
+# Negações mudam o sentido da reclamação ("nao passa", "nunca chega"), então ficam nos bigramas
+NEGACOES = frozenset({'nao', 'nunca', 'sem'})
+
+TAMANHO_MINIMO = 2
+TAMANHO_MAXIMO = 40
+
+# Poda da cauda longa: termos citados uma única vez em um dia somem depois deste prazo
+DIAS_CAUDA_LONGA = 30
+CONTADOR_MINIMO_ANTIGOS = 2
+
+MAX_K = 100
+
+
+def tokenizar(texto):
+    """Palavras normalizadas (minúsculas, sem acentos), sem stopwords nem números"""
+    tokens = []
+    for palavra in re.findall(r'[a-z0-9]+', normalizar_texto(texto)):
+        if palavra in NEGACOES:
+            tokens.append(palavra)
+        elif palavra not in STOPWORDS and not palavra.isdigit() and TAMANHO_MINIMO <= len(palavra) <= TAMANHO_MAXIMO:
+            tokens.append(palavra)
+    return tokens
+
+
+def extrair_termos(texto):
+    """Palavras e bigramas (pares consecutivos após remover stopwords) de um texto, sem repetição.
+
+    Cada termo conta uma vez por pesquisa: o contador mede quantas pesquisas citaram o termo.
+    """
+    termos = set()
+    # Bigramas não atravessam pontuação ("funciona. motorista" não vira um par)
+    for trecho in re.split(r'[.,;:!?()\n]+', texto or ''):
+        tokens = tokenizar(trecho)
+        termos.update(t for t in tokens if t not in NEGACOES)
+        termos.update(f'{a} {b}' for a, b in zip(tokens, tokens[1:]) if a != b and b not in NEGACOES)
+    return termos
+
+
+def contar_termos(pesquisa):
+    """Atualiza os contadores de termos da linha no dia da pesquisa (sem commit)"""
+    termos = extrair_termos(pesquisa.observacoes)
+    if not termos:
+        return 0
+
+    dia = (pesquisa.data_criacao or datetime.now()).date()
+    somar_ou_inserir(
+        TermoDiario.__table__,
+        [{'linha_numero': pesquisa.linha_numero, 'dia': dia, 'termo': termo, 'contador': 1} for termo in termos],
+        chaves=['linha_numero', 'dia', 'termo'],
+        colunas_soma=['contador']
+    )
+    return len(termos)
+
+
+@total_ordering
+class _Invertido:
+    """Inverte a comparação de strings para desempatar termos em ordem alfabética no heap"""
+    __slots__ = ('valor',)
+
+    def __init__(self, valor):
+        self.valor = valor
+
+    def __lt__(self, outro):
+        return self.valor > outro.valor
+
+    def __eq__(self, outro):
+        return self.valor == outro.valor
+
+
+def top_termos(k=20, linhas=None, inicio=None, fim=None, tipo='todos', por_linha=False):
+    """Os k termos mais citados no período, no geral ou por linha.
+
+    Os totais por termo são lidos em fluxo do banco e passam por um heap de
+    tamanho k, então a memória não cresce com a quantidade de termos raros.
+    """
+    k = max(1, min(k, MAX_K))
+    fim = fim or date.today()
+    inicio = inicio or fim - timedelta(days=6)
+
+    total = db.func.sum(TermoDiario.contador).label('total')
+    colunas = [TermoDiario.linha_numero, TermoDiario.termo] if por_linha else [TermoDiario.termo]
+    consulta = db.session.query(*colunas, total).filter(
+        TermoDiario.dia >= inicio, TermoDiario.dia <= fim
+    )
+    if linhas:
+        consulta = consulta.filter(TermoDiario.linha_numero.in_(linhas))
+    if tipo == 'palavras':
+        consulta = consulta.filter(~TermoDiario.termo.contains(' '))
+    elif tipo == 'bigramas':
+        consulta = consulta.filter(TermoDiario.termo.contains(' '))
+    consulta = consulta.group_by(*colunas)
+
+    heaps = {}
+    for registro in consulta.yield_per(5000):
+        chave = registro.linha_numero if por_linha else None
+        heap = heaps.setdefault(chave, [])
+        # Desempate alfabético: o menor termo fica na frente
+        item = (registro.total, _Invertido(registro.termo))
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def ordenar(heap):
+        return [{'termo': i[1].valor, 'pesquisas': int(i[0])} for i in sorted(heap, reverse=True)]
+
+    resultado = {'inicio': inicio.isoformat(), 'fim': fim.isoformat(), 'k': k, 'tipo': tipo}
+    if por_linha:
+        resultado['linhas'] = {linha: ordenar(heap) for linha, heap in sorted(heaps.items())}
+    else:
+        resultado['termos'] = ordenar(heaps.get(None, []))
+    return resultado
+
+
+def podar_cauda_longa(hoje=None):
+    """Remove contadores antigos de termos raros para limitar o crescimento da tabela"""
+    hoje = hoje or date.today()
+    removidos = TermoDiario.query.filter(
+        TermoDiario.dia < hoje - timedelta(days=DIAS_CAUDA_LONGA),
+        TermoDiario.contador < CONTADOR_MINIMO_ANTIGOS
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    if removidos:
+        print(f"🧹 {removidos} contador(es) de termos raros removidos")
+    return removidos
+
+
+def recontar_termos(inicio, fim, lote=2000):
+    """Refaz os contadores de termos a partir das pesquisas do intervalo"""
+    TermoDiario.query.filter(TermoDiario.dia >= inicio, TermoDiario.dia <= fim).delete(synchronize_session=False)
+
+    ultimo_id, total = 0, 0
+    while True:
+        pesquisas = Pesquisa.query.filter(
+            Pesquisa.id > ultimo_id,
+            Pesquisa.data_criacao >= datetime.combine(inicio, datetime.min.time()),
+            Pesquisa.data_criacao < datetime.combine(fim + timedelta(days=1), datetime.min.time())
+        ).order_by(Pesquisa.id).limit(lote).all()
+        if not pesquisas:
+            break
+
+        # Somar em memória e gravar um upsert por lote
+        contagens = {}
+        for pesquisa in pesquisas:
+            dia = pesquisa.data_criacao.date()
+            for termo in extrair_termos(pesquisa.observacoes):
+                chave = (pesquisa.linha_numero, dia, termo)
+                contagens[chave] = contagens.get(chave, 0) + 1
+        somar_ou_inserir(
+            TermoDiario.__table__,
+            [{'linha_numero': l, 'dia': d, 'termo': t, 'contador': c} for (l, d, t), c in contagens.items()],
+            chaves=['linha_numero', 'dia', 'termo'],
+            colunas_soma=['contador']
+        )
+        db.session.commit()
+        ultimo_id = pesquisas[-1].id
+        total += len(pesquisas)
+
+    # Sem pesquisas no intervalo, o DELETE acima ainda não foi confirmado
+    db.session.commit()
+    return total
+
+
+@click.command('recontar-termos')
+@click.option('--inicio', required=True, help='Primeiro dia (AAAA-MM-DD)')
+@click.option('--fim', default=None, help='Último dia (AAAA-MM-DD), padrão: hoje')
+@with_appcontext
+def comando_recontar_termos(inicio, fim):
+    """Refaz os contadores de termos das observações para um intervalo de dias"""
+    inicio = date.fromisoformat(inicio)
+    fim = date.fromisoformat(fim) if fim else date.today()
+    total = recontar_termos(inicio, fim)
+    click.echo(f"✅ Termos recontados a partir de {total} pesquisa(s)")